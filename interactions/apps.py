@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class InteractionsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "interactions"
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .bookings import ensure_overlap_guard
+        post_migrate.connect(ensure_overlap_guard, sender=self)
@@ -0,0 +1,201 @@
+"""
+Booking dashboard statistics
+
+Stats for one scope (a tenant's bookings, a landlord's bookings, or all of
+them for admins) come from a single conditional-aggregation query. With
+``BOOKING_STATS_ROLLUP`` enabled, tenant and landlord stats are instead read
+from a ``BookingStats`` row that booking creation, transitions and deletion
+adjust in the same transaction, so the dashboard costs one primary-key read
+however many bookings the user has.
+
+Either way the formatted result is cached until a booking in that scope
+changes; the cache entries are dropped after commit.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Value
+from django.db.models.functions import Greatest
+
+from .models import BookingRequest, BookingStats
+
+STATUSES = [status for status, _ in BookingRequest.STATUS_CHOICES]
+COUNT_FIELDS = ['total', *STATUSES, 'properties']
+
+CACHE_KEY = 'booking_stats:{scope}'
+ALL_SCOPE = 'all'
+
+
+def rollup_enabled():
+    return getattr(settings, 'BOOKING_STATS_ROLLUP', False)
+
+
+def cache_timeout():
+    return getattr(settings, 'BOOKING_STATS_CACHE_TIMEOUT', 300)
+
+
+def scope_key(user_id=None, role=None):
+    return CACHE_KEY.format(scope=f'{role}:{user_id}' if role else ALL_SCOPE)
+
+
+def scoped_bookings(user_id, role):
+    if role == 'tenant':
+        return BookingRequest.objects.filter(tenant_id=user_id)
+    if role == 'landlord':
+        return BookingRequest.objects.filter(rental_property__owner_id=user_id)
+    return BookingRequest.objects.all()
+
+
+def aggregate_counts(queryset):
+    """Every counter in one conditional-aggregation query"""
+    aggregates = {
+        'total': Count('id'),
+        'properties': Count('rental_property', distinct=True),
+    }
+    for status in STATUSES:
+        aggregates[status] = Count('id', filter=Q(status=status))
+    return queryset.order_by().aggregate(**aggregates)
+
+
+def format_stats(counts, role):
+    stats = {field: counts[field] for field in ['total', *STATUSES]}
+
+    # Add role-specific stats
+    if role == 'landlord':
+        stats['properties_with_bookings'] = counts['properties']
+        stats['active_bookings'] = sum(counts[status] for status in BookingRequest.BLOCKING_STATUSES)
+    elif role == 'tenant':
+        stats['properties_booked'] = counts['properties']
+        stats['active_bookings'] = sum(counts[status] for status in BookingRequest.BLOCKING_STATUSES)
+    return stats
+
+
+def _seed_rollup(user_id, role):
+    """Create the rollup row from the bookings; returns (counts, created)"""
+    counts = aggregate_counts(scoped_bookings(user_id, role))
+    try:
+        with transaction.atomic():
+            BookingStats.objects.create(user_id=user_id, role=role, **counts)
+        return counts, True
+    except IntegrityError:
+        # A concurrent writer seeded it first
+        return BookingStats.objects.filter(user_id=user_id, role=role).values(*COUNT_FIELDS).get(), False
+
+
+def rollup_counts(user_id, role):
+    row = BookingStats.objects.filter(user_id=user_id, role=role).values(*COUNT_FIELDS).first()
+    if row is None:
+        row, _ = _seed_rollup(user_id, role)
+    return row
+
+
+def get_booking_stats(user):
+    """Dashboard stats for ``user``, from the cache, the rollup row or one aggregate query"""
+    if user.role in ('tenant', 'landlord'):
+        role = user.role
+    elif user.role == 'admin':
+        role = None
+    else:
+        return format_stats(dict.fromkeys(COUNT_FIELDS, 0), user.role)
+
+    key = scope_key(user.pk, role)
+    stats = cache.get(key)
+    if stats is None:
+        if role and rollup_enabled():
+            counts = rollup_counts(user.pk, role)
+        else:
+            counts = aggregate_counts(scoped_bookings(user.pk, role))
+        stats = format_stats(counts, role)
+        cache.set(key, stats, cache_timeout())
+    return stats
+
+
+# ---- maintenance ----
+
+def _adjust(user_id, role, deltas):
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    expressions = {field: Greatest(F(field) + delta, Value(0)) for field, delta in deltas.items()}
+    if BookingStats.objects.filter(user_id=user_id, role=role).update(**expressions):
+        return
+    # A freshly seeded row already counts this change
+    _, created = _seed_rollup(user_id, role)
+    if not created:
+        BookingStats.objects.filter(user_id=user_id, role=role).update(**expressions)
+
+
+def _participants(booking):
+    """(tenant_id, landlord_id) of a booking"""
+    return booking.tenant_id, booking.rental_property.owner_id
+
+
+def invalidate_booking_stats(bookings):
+    """Drop cached stats for everyone who can see ``bookings``, after commit"""
+    keys = {scope_key()}
+    for booking in bookings:
+        tenant_id, landlord_id = _participants(booking)
+        keys.add(scope_key(tenant_id, 'tenant'))
+        keys.add(scope_key(landlord_id, 'landlord'))
+    transaction.on_commit(lambda: cache.delete_many(list(keys)))
+
+
+def _first_or_last_for_property(booking):
+    """Whether ``booking`` is the tenant's / landlord's only booking of its property"""
+    others = BookingRequest.objects.filter(rental_property_id=booking.rental_property_id).exclude(pk=booking.pk)
+    return (
+        not others.filter(tenant_id=booking.tenant_id).exists(),
+        not others.exists(),
+    )
+
+
+def _record_membership(booking, sign):
+    if rollup_enabled():
+        tenant_id, landlord_id = _participants(booking)
+        tenant_only, landlord_only = _first_or_last_for_property(booking)
+        with transaction.atomic():
+            _adjust(tenant_id, 'tenant', {'total': sign, booking.status: sign, 'properties': sign * tenant_only})
+            _adjust(landlord_id, 'landlord', {'total': sign, booking.status: sign, 'properties': sign * landlord_only})
+    invalidate_booking_stats([booking])
+
+
+def record_booking_created(booking):
+    _record_membership(booking, 1)
+
+
+def record_booking_deleted(booking):
+    _record_membership(booking, -1)
+
+
+def record_booking_transition(booking, previous_status):
+    """Move one booking between status counters (called inside the transition's transaction)"""
+    if rollup_enabled():
+        tenant_id, landlord_id = _participants(booking)
+        deltas = {previous_status: -1, booking.status: 1}
+        _adjust(tenant_id, 'tenant', deltas)
+        _adjust(landlord_id, 'landlord', deltas)
+    invalidate_booking_stats([booking])
+
+
+def rebuild_booking_stats(stdout=None):
+    """Recreate every rollup row with two GROUP BY queries; returns rows written"""
+    aggregates = {
+        'total': Count('id'),
+        'properties': Count('rental_property', distinct=True),
+        **{status: Count('id', filter=Q(status=status)) for status in STATUSES},
+    }
+    rows = []
+    for role, user_field in (('tenant', 'tenant_id'), ('landlord', 'rental_property__owner_id')):
+        for counts in BookingRequest.objects.order_by().values(user_field).annotate(**aggregates):
+            user_id = counts.pop(user_field)
+            rows.append(BookingStats(user_id=user_id, role=role, **counts))
+
+    with transaction.atomic():
+        BookingStats.objects.all().delete()
+        BookingStats.objects.bulk_create(rows, batch_size=1000)
+        keys = [scope_key(row.user_id, row.role) for row in rows] + [scope_key()]
+        transaction.on_commit(lambda: cache.delete_many(keys))
+    if stdout:
+        stdout.write(f"  wrote {len(rows)} rollup rows")
+    return len(rows)
@@ -0,0 +1,306 @@
+"""
+Booking state machine and overlap-safe approval
+
+Every status change is one conditional ``UPDATE ... WHERE status IN
+(<allowed sources>)`` that also stamps the matching timestamp, so a stale
+or concurrent request simply matches no row and is reported as a 409.
+Side effects (notifications, emails, realtime broadcasts) hang off the
+``bookings_transitioned`` signal, sent once per transition (or once per
+bulk batch) inside the transaction, where receivers write notification and
+outbox rows that commit or roll back with the status change.
+
+Two approvals racing for the same dates must never both win, so the rule
+"no two approved/checked-in bookings of one property overlap" lives in the
+database rather than in a read-then-write check:
+
+* PostgreSQL: an exclusion constraint over ``daterange(check_in, check_out)``
+  (needs ``btree_gist`` for the property id equality). Creating that
+  extension needs a superuser, or on PostgreSQL 13+ a role with CREATE on
+  the database; it is skipped if a DBA already installed it. The constraint
+  cannot be added while approved stays already overlap, so the install
+  reports those rows first (also ``python manage.py report_booking_overlaps``).
+* SQLite: BEFORE INSERT/UPDATE triggers; SQLite runs one writer at a time,
+  so the check and the write cannot interleave.
+* Other backends: approvals lock the property row with
+  ``SELECT ... FOR UPDATE``, serializing approvals per property.
+
+Date ranges are half-open, so a stay may start on the day another ends.
+"""
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import OuterRef, Subquery
+from django.dispatch import Signal
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from properties.models import Property
+from .booking_stats import record_booking_transition, rollup_enabled
+from .models import BLOCKING_STATUSES, BookingRequest
+
+BOOKING_TABLE = 'interactions_bookingrequest'
+OVERLAP_GUARD = 'booking_no_overlap'
+
+BLOCKING_SQL = ', '.join(f"'{value}'" for value in BLOCKING_STATUSES)
+
+POSTGRES_CONSTRAINT = f"""
+    ALTER TABLE {BOOKING_TABLE} ADD CONSTRAINT {OVERLAP_GUARD}
+    EXCLUDE USING gist (
+        rental_property_id WITH =,
+        daterange(check_in_date, check_out_date, '[)') WITH &&
+    ) WHERE (
+        status IN ({BLOCKING_SQL})
+        AND check_in_date IS NOT NULL AND check_out_date IS NOT NULL
+    )
+"""
+
+SQLITE_OVERLAP_CHECK = f"""
+    SELECT RAISE(ABORT, '{OVERLAP_GUARD}') WHERE EXISTS (
+        SELECT 1 FROM {BOOKING_TABLE} AS other
+        WHERE other.rental_property_id = new.rental_property_id
+          AND other.id IS NOT new.id
+          AND other.status IN ({BLOCKING_SQL})
+          AND other.check_in_date < new.check_out_date
+          AND other.check_out_date > new.check_in_date
+    );
+"""
+
+SQLITE_GUARD_CONDITION = (
+    f"new.status IN ({BLOCKING_SQL}) "
+    f"AND new.check_in_date IS NOT NULL AND new.check_out_date IS NOT NULL"
+)
+
+SQLITE_TRIGGERS = {
+    f'{OVERLAP_GUARD}_bi': f"""
+        CREATE TRIGGER IF NOT EXISTS {OVERLAP_GUARD}_bi BEFORE INSERT ON {BOOKING_TABLE}
+        WHEN {SQLITE_GUARD_CONDITION} BEGIN {SQLITE_OVERLAP_CHECK} END
+    """,
+    f'{OVERLAP_GUARD}_bu': f"""
+        CREATE TRIGGER IF NOT EXISTS {OVERLAP_GUARD}_bu
+        BEFORE UPDATE OF status, check_in_date, check_out_date, rental_property_id ON {BOOKING_TABLE}
+        WHEN {SQLITE_GUARD_CONDITION} BEGIN {SQLITE_OVERLAP_CHECK} END
+    """,
+}
+
+
+# target status -> (statuses it can be entered from, timestamp stamped on entry)
+TRANSITIONS = {
+    'approved': (['pending'], 'approved_at'),
+    'declined': (['pending'], None),
+    'checked_in': (['approved'], 'checked_in_at'),
+    'completed': (['checked_in'], 'completed_at'),
+    'cancelled': (['pending', 'approved', 'checked_in'], None),
+}
+
+# Landlord-facing action names accepted by the bulk endpoint
+ACTIONS = {
+    'approve': 'approved',
+    'decline': 'declined',
+    'check_in': 'checked_in',
+    'complete': 'completed',
+    'cancel': 'cancelled',
+}
+
+# Sent inside the transition's transaction with ``bookings``, a list already
+# carrying their new status; receivers must only write rows (no network I/O)
+bookings_transitioned = Signal()
+
+
+class BookingOverlapError(Exception):
+    """The booking's dates overlap another approved or checked-in booking"""
+
+
+class BookingConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "The booking conflicts with its current state or another booking."
+    default_code = 'conflict'
+
+
+def overlap_conflicts(BookingRequest=BookingRequest):
+    """
+    ``(booking id, clashing booking id, property id)`` for approved/checked-in
+    stays that already overlap, each pair once
+
+    Pass the historical model when calling from a migration.
+    """
+    blocking = BookingRequest.objects.filter(
+        status__in=BLOCKING_STATUSES, check_in_date__isnull=False, check_out_date__isnull=False,
+    )
+    clash = blocking.filter(
+        rental_property_id=OuterRef('rental_property_id'),
+        pk__gt=OuterRef('pk'),
+        check_in_date__lt=OuterRef('check_out_date'),
+        check_out_date__gt=OuterRef('check_in_date'),
+    ).order_by('pk')
+    return (
+        blocking.annotate(clashes_with=Subquery(clash.values('pk')[:1]))
+        .filter(clashes_with__isnull=False)
+        .order_by('rental_property_id', 'pk')
+        .values_list('pk', 'clashes_with', 'rental_property_id')
+    )
+
+
+def install_overlap_guard(conn=None, BookingRequest=BookingRequest):
+    """Create the vendor-specific overlap guard (idempotent)"""
+    conn = conn or connection
+    with conn.cursor() as cursor:
+        if conn.vendor == 'postgresql':
+            cursor.execute("SELECT 1 FROM pg_constraint WHERE conname = %s", [OVERLAP_GUARD])
+            if cursor.fetchone() is not None:
+                return
+            conflicts = list(overlap_conflicts(BookingRequest)[:20])
+            if conflicts:
+                listed = ', '.join(f"#{pk} and #{other} (property {prop})" for pk, other, prop in conflicts)
+                raise BookingOverlapError(
+                    f"Cannot add {OVERLAP_GUARD}: approved/checked-in bookings already overlap: {listed}. "
+                    "Run `python manage.py report_booking_overlaps` for the full list, resolve them, then migrate again."
+                )
+            cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'btree_gist'")
+            if cursor.fetchone() is None:
+                # Needs a superuser (or CREATE on the database for PostgreSQL 13+)
+                cursor.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+            cursor.execute(POSTGRES_CONSTRAINT)
+        elif conn.vendor == 'sqlite':
+            for sql in SQLITE_TRIGGERS.values():
+                cursor.execute(sql)
+
+
+def uninstall_overlap_guard(conn=None):
+    """Drop the vendor-specific overlap guard"""
+    conn = conn or connection
+    with conn.cursor() as cursor:
+        if conn.vendor == 'postgresql':
+            cursor.execute(f"ALTER TABLE {BOOKING_TABLE} DROP CONSTRAINT IF EXISTS {OVERLAP_GUARD}")
+        elif conn.vendor == 'sqlite':
+            for name in SQLITE_TRIGGERS:
+                cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+
+def ensure_overlap_guard(sender, using='default', **kwargs):
+    """post_migrate hook that restores SQLite triggers lost to table remakes"""
+    from django.db import connections
+
+    conn = connections[using]
+    if conn.vendor == 'sqlite' and BOOKING_TABLE in conn.introspection.table_names():
+        install_overlap_guard(conn)
+
+
+def overlapping_bookings(property_id, check_in, check_out, exclude_pk=None):
+    """Approved/checked-in bookings of ``property_id`` overlapping [check_in, check_out)"""
+    queryset = BookingRequest.objects.filter(
+        rental_property_id=property_id,
+        status__in=BookingRequest.BLOCKING_STATUSES,
+        check_in_date__lt=check_out,
+        check_out_date__gt=check_in,
+    )
+    if exclude_pk is not None:
+        queryset = queryset.exclude(pk=exclude_pk)
+    return queryset
+
+
+def _conditional_update(booking, sources, changes):
+    """
+    Apply ``changes`` if the booking is in one of ``sources``; returns the
+    status it left, or None if it matched no row.
+
+    Without the stats rollup this is one ``UPDATE ... WHERE status IN
+    (sources)`` (the loaded status is returned unchecked; nothing reads it).
+    The rollup needs the exact source, so it updates from the loaded status
+    and, if that was stale, re-checks the current one and retries once.
+    """
+    queryset = BookingRequest.objects.filter(pk=booking.pk)
+    if not rollup_enabled():
+        return booking.status if queryset.filter(status__in=sources).update(**changes) else None
+    if booking.status in sources and queryset.filter(status=booking.status).update(**changes):
+        return booking.status
+    current = queryset.values_list('status', flat=True).first()
+    if current != booking.status and current in sources and queryset.filter(status=current).update(**changes):
+        return current
+    return None
+
+
+def transition_booking(booking, new_status, landlord_response=None, notify=True):
+    """
+    Move ``booking`` to ``new_status`` with one conditional UPDATE.
+
+    Raises ``BookingConflict`` if the booking is no longer in a status the
+    transition may start from, and ``BookingOverlapError`` if an approval
+    clashes with another approved/checked-in stay. On success ``booking`` is
+    updated in place and, unless ``notify`` is False, ``bookings_transitioned``
+    fires inside the same transaction.
+    """
+    sources, timestamp_field = TRANSITIONS[new_status]
+    now = timezone.now()
+    changes = {'status': new_status, 'updated_at': now}
+    if timestamp_field:
+        changes[timestamp_field] = now
+    if landlord_response is not None:
+        changes['landlord_response'] = landlord_response
+
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                if new_status == 'approved':
+                    # Serializes approvals per property where there is no DB-level guard
+                    list(Property.objects.select_for_update().filter(pk=booking.rental_property_id).values_list('pk'))
+                    if booking.check_in_date and booking.check_out_date and overlapping_bookings(
+                        booking.rental_property_id, booking.check_in_date, booking.check_out_date, exclude_pk=booking.pk
+                    ).exists():
+                        raise BookingOverlapError(f"Booking {booking.pk} overlaps an approved booking")
+
+                previous_status = _conditional_update(booking, sources, changes)
+                if previous_status is None:
+                    current = BookingRequest.objects.filter(pk=booking.pk).values_list('status', flat=True).first()
+                    raise BookingConflict(f"Cannot change booking from '{current}' to '{new_status}'.")
+
+                for field, value in changes.items():
+                    setattr(booking, field, value)
+                record_booking_transition(booking, previous_status)
+        except IntegrityError as exc:
+            # The database guard caught a race the locked check could not see
+            raise BookingOverlapError(f"Booking {booking.pk} overlaps an approved booking") from exc
+        if notify:
+            # Side effects are queued in this same transaction (see interactions.outbox)
+            bookings_transitioned.send(sender=BookingRequest, bookings=[booking])
+    return booking
+
+
+def approve_booking(booking_id, landlord_response=None):
+    """Approve a pending booking by id (see ``transition_booking``)"""
+    booking = BookingRequest.objects.select_related('tenant', 'rental_property__owner').get(pk=booking_id)
+    return transition_booking(booking, 'approved', landlord_response)
+
+
+def bulk_transition_bookings(queryset, booking_ids, new_status, landlord_response=None):
+    """
+    Apply one transition to many bookings in a single transaction.
+
+    ``queryset`` scopes what the caller may touch, so ownership is checked by
+    the one query that loads the bookings. Each item runs in its own
+    savepoint, so a conflict rolls back only that item. Returns one dict per
+    id in request order; ``result`` is ``ok`` (with the new ``status``) or
+    ``not_found``/``conflict``/``overlap`` (with a ``detail`` message).
+    """
+    bookings = queryset.select_related('tenant', 'rental_property__owner').in_bulk(booking_ids)
+    results, applied = [], []
+    with transaction.atomic():
+        for booking_id in booking_ids:
+            booking = bookings.get(booking_id)
+            if booking is None:
+                results.append({'id': booking_id, 'result': 'not_found', 'detail': "Booking not found."})
+                continue
+            try:
+                transition_booking(booking, new_status, landlord_response, notify=False)
+            except BookingConflict as exc:
+                results.append({'id': booking_id, 'result': 'conflict', 'detail': str(exc.detail)})
+            except BookingOverlapError:
+                results.append({
+                    'id': booking_id, 'result': 'overlap',
+                    'detail': "These dates overlap another approved booking for this property.",
+                })
+            else:
+                results.append({'id': booking_id, 'result': 'ok', 'status': booking.status})
+                applied.append(booking)
+        if applied:
+            bookings_transitioned.send(sender=BookingRequest, bookings=applied)
+    return results
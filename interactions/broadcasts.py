@@ -0,0 +1,93 @@
+"""
+Mass notification broadcasts
+
+``broadcast_notification`` notifies every user matched by an audience query
+without materializing it: recipient ids are streamed with ``.iterator()``
+(a server-side cursor on PostgreSQL) and handled ``chunk_size`` at a time.
+Each chunk costs one ``bulk_create`` of notifications, one UPDATE of the
+unread counters and one ``bulk_create`` of realtime outbox rows in its own
+transaction; the ``process_outbox`` worker does the channel-layer sends. So
+memory stays flat however large the audience is, the request never talks to
+the channel layer, and a failure part-way leaves every completed chunk
+queued.
+"""
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from properties.models import Property
+from .models import BookingRequest, Notification
+from .outbox import enqueue_many, realtime_items
+from .unread import adjust_unread_many
+from .utils import notification_payload
+
+User = get_user_model()
+
+CHUNK_SIZE = 1000
+# The API runs broadcasts in the request; larger audiences use the management command
+BROADCAST_API_MAX_RECIPIENTS = 10_000
+
+
+def audience_queryset(role=None, city=None):
+    """
+    Active users, optionally narrowed to one role and/or one city
+
+    Users have no address of their own, so a user is "in" a city if they own
+    or have booked a listing whose location mentions it.
+    """
+    users = User.objects.filter(is_active=True)
+    if role:
+        users = users.filter(role=role)
+    if city:
+        owns = Property.objects.filter(owner=OuterRef('pk'), location__icontains=city)
+        booked = BookingRequest.objects.filter(tenant=OuterRef('pk'), rental_property__location__icontains=city)
+        users = users.filter(Exists(owns) | Exists(booked))
+    return users
+
+
+def _send_chunk(user_ids, title, body, notification_type, data):
+    with transaction.atomic():
+        notifications = Notification.objects.bulk_create([
+            Notification(user_id=user_id, title=title, body=body, notification_type=notification_type, data=data)
+            for user_id in user_ids
+        ])
+        # bulk_create skips post_save; users without a counter row are seeded on first read
+        adjust_unread_many({user_id: 1 for user_id in user_ids}, seed_missing=False)
+        queued = enqueue_many(realtime_items(
+            (
+                f"user_{notification.user_id}",
+                notification_payload(title, body, notification_type, data, notification.id),
+            )
+            for notification in notifications
+        ))
+    return len(queued)
+
+
+def broadcast_notification(audience, title, body, notification_type='general', data=None,
+                           chunk_size=CHUNK_SIZE, progress=None):
+    """
+    Notify every user in ``audience`` (a User queryset)
+
+    ``progress(done, total)`` is called after each chunk. Returns
+    ``{'recipients': n, 'queued': m}`` where ``queued`` counts realtime events
+    written to the outbox.
+    """
+    data = data or {}
+    total = audience.count()
+    recipients = queued = 0
+    chunk = []
+    for user_id in audience.order_by().values_list('pk', flat=True).iterator(chunk_size=chunk_size):
+        chunk.append(user_id)
+        if len(chunk) == chunk_size:
+            queued += _send_chunk(chunk, title, body, notification_type, data)
+            recipients += len(chunk)
+            chunk = []
+            if progress:
+                progress(recipients, total)
+    if chunk:
+        queued += _send_chunk(chunk, title, body, notification_type, data)
+        recipients += len(chunk)
+        if progress:
+            progress(recipients, total)
+    return {'recipients': recipients, 'queued': queued}
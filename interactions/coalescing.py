@@ -0,0 +1,148 @@
+"""
+Notification coalescing and email digests
+
+Bursty events (favorites, reviews) go through ``coalesce_notification``
+instead of ``create_notification``. Events for one user that share a
+``group_key`` (e.g. ``favorite:<property id>``) within
+``NOTIFICATION_COALESCE_WINDOW`` seconds of the first one fold into a single
+unread notification: the first event INSERTs it, later ones UPDATE its count
+and text ("37 people favorited X") in place, so the user's unread count goes
+up once per burst. Realtime pushes of the updated notification are throttled
+to one per ``NOTIFICATION_COALESCE_PUSH_INTERVAL`` seconds; the client
+replaces the notification with the same ``notification_id``. An update that
+falls inside the interval queues one deferred outbox push (per notification
+and interval) that renders the notification when it is delivered, so the
+client always ends up with the final count.
+
+Concurrent first events for the same user would both find no open
+notification, so the lookup is serialized on the user's row.
+
+``queue_notification_digests`` is meant to run on a schedule: it queues one
+outbox email per user summarizing unread notifications not yet digested,
+and stamps them so the next run only reports what is new.
+"""
+
+import datetime
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from users.email_utils import build_notification_digest_email
+from .models import Notification
+from .outbox import enqueue_emails, enqueue_many, enqueue_realtime
+from .utils import stored_notification_payload
+
+User = get_user_model()
+
+PUSH_CACHE_KEY = 'notification_push:{notification_id}'
+TRAILING_PUSH_CACHE_KEY = 'notification_push:{notification_id}:trailing'
+
+
+def coalesce_window():
+    return datetime.timedelta(seconds=getattr(settings, 'NOTIFICATION_COALESCE_WINDOW', 3600))
+
+
+def push_interval():
+    return getattr(settings, 'NOTIFICATION_COALESCE_PUSH_INTERVAL', 60)
+
+
+def _push(notification):
+    enqueue_realtime([(f"user_{notification.user_id}", stored_notification_payload(notification))])
+
+
+def _push_later(notification, now):
+    """Queue one push at the end of the interval, rendered from the row at delivery"""
+    interval = push_interval()
+    if cache.add(TRAILING_PUSH_CACHE_KEY.format(notification_id=notification.id), 1, interval):
+        enqueue_many(
+            [('realtime', {'group': f"user_{notification.user_id}", 'notification_id': notification.id})],
+            available_at=now + datetime.timedelta(seconds=interval),
+        )
+
+
+def coalesce_notification(user, group_key, title, body_for, notification_type='general', data=None):
+    """
+    Create or fold into the user's open notification for ``group_key``
+
+    ``body_for(count)`` renders the text for ``count`` events. Returns
+    ``(notification, created)``.
+    """
+    data = data or {}
+    now = timezone.now()
+    with transaction.atomic():
+        # Two first events would otherwise both insert; the lock is held until commit
+        User.objects.select_for_update().filter(pk=user.pk).values_list('pk', flat=True).first()
+        existing = (
+            Notification.objects.select_for_update()
+            .filter(user=user, group_key=group_key, is_read=False, created_at__gte=now - coalesce_window())
+            .order_by('-created_at')
+            .first()
+        )
+        if existing is None:
+            notification = Notification.objects.create(
+                user=user, title=title, body=body_for(1), notification_type=notification_type,
+                data={**data, 'count': 1}, group_key=group_key,
+            )
+            cache.set(PUSH_CACHE_KEY.format(notification_id=notification.id), 1, push_interval())
+            _push(notification)
+            return notification, True
+
+        existing.count += 1
+        existing.body = body_for(existing.count)
+        existing.data = {**data, 'count': existing.count}
+        existing.updated_at = now
+        # A new event makes it worth another digest line
+        existing.digested_at = None
+        Notification.objects.filter(pk=existing.pk).update(
+            count=existing.count, body=existing.body, data=existing.data,
+            updated_at=now, digested_at=None,
+        )
+        if cache.add(PUSH_CACHE_KEY.format(notification_id=existing.id), 1, push_interval()):
+            _push(existing)
+        else:
+            _push_later(existing, now)
+        return existing, False
+
+
+def queue_notification_digests(types=None, batch_size=500, max_items=20, stdout=None):
+    """Queue one digest email per user with undigested unread notifications; returns emails queued"""
+    started = timezone.now()
+    pending = Notification.objects.filter(is_read=False, digested_at__isnull=True, created_at__lte=started)
+    if types:
+        pending = pending.filter(notification_type__in=types)
+    # Rows coalesced after we start are left for the next digest
+    pending = pending.filter(Q(updated_at__isnull=True) | Q(updated_at__lte=started))
+
+    user_ids = list(
+        pending.exclude(user__email='').order_by('user_id').values_list('user_id', flat=True).distinct()
+    )
+    queued = 0
+    for start in range(0, len(user_ids), batch_size):
+        batch = user_ids[start:start + batch_size]
+        users = User.objects.in_bulk(batch)
+        by_user = {}
+        for row in pending.filter(user_id__in=batch).order_by('user_id', '-created_at').values(
+            'id', 'user_id', 'title', 'body', 'notification_type', 'count'
+        ):
+            by_user.setdefault(row['user_id'], []).append(row)
+
+        with transaction.atomic():
+            enqueue_emails(
+                build_notification_digest_email(users[user_id], rows, max_items)
+                for user_id, rows in by_user.items()
+            )
+            Notification.objects.filter(
+                pk__in=[row['id'] for rows in by_user.values() for row in rows]
+            ).filter(
+                Q(updated_at__isnull=True) | Q(updated_at__lte=started)
+            ).update(digested_at=started)
+        queued += len(by_user)
+        if stdout:
+            stdout.write(f"  queued {queued}/{len(user_ids)} digests", ending='\r')
+    if stdout:
+        stdout.write('')
+    return queued
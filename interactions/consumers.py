@@ -148,27 +148,30 @@ class NotificationConsumer(AsyncWebsocketConsumer):
 
     @database_sync_to_async
     def get_unread_count(self):
-        from .models import Notification
-        return Notification.objects.filter(user=self.user, is_read=False).count()
+        from .unread import get_unread_notification_count
+        return get_unread_notification_count(self.user.id)
 
     @database_sync_to_async
     def mark_notification_read(self, notification_id):
         from .models import Notification
+        from .unread import set_notification_read
         try:
             notification = Notification.objects.get(id=notification_id, user=self.user)
-                id=notification_id,
-                user_id=self.user_id
-            )
-            notification.is_read = True
-            notification.save()
+            set_notification_read(notification, True)
             return True
         except Notification.DoesNotExist:
             return False
 
+    @database_sync_to_async
+    def mark_all_notifications_read(self):
+        from .unread import mark_notifications_read
+        return mark_notifications_read(self.user.id)
+
     @database_sync_to_async
     def get_user_notifications(self):
+        from .models import Notification
         notifications = Notification.objects.filter(
-            user_id=self.user_id
+            user_id=self.user.id
         ).order_by('-created_at')[:20]  # Last 20 notifications
         
         return [
@@ -0,0 +1,96 @@
+"""
+Denormalized conversation inbox
+
+``Conversation`` keeps one row per (user, counterpart). Every new message
+touches exactly two rows: the sender's (latest message only) and the
+receiver's (latest message plus one unread). Reading a thread resets the
+reader's counter; user-wide totals live in ``interactions.unread``.
+``rebuild_conversations`` recomputes everything from ``Message`` with two
+GROUP BY queries.
+"""
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max
+
+from .models import Conversation, Message
+from .unread import adjust_unread
+
+
+def _touch(user_id, counterpart_id, message, unread):
+    changes = {'last_message': message, 'last_activity': message.timestamp}
+    updated = Conversation.objects.filter(user_id=user_id, counterpart_id=counterpart_id).update(
+        unread_count=F('unread_count') + unread, **changes
+    )
+    if updated:
+        return
+    try:
+        with transaction.atomic():
+            Conversation.objects.create(
+                user_id=user_id, counterpart_id=counterpart_id, unread_count=unread, **changes
+            )
+    except IntegrityError:
+        # Another message created the row first; fold this one in
+        Conversation.objects.filter(user_id=user_id, counterpart_id=counterpart_id).update(
+            unread_count=F('unread_count') + unread, **changes
+        )
+
+
+def record_message(message):
+    """Fold a newly created message into both participants' inbox rows"""
+    with transaction.atomic():
+        _touch(message.sender_id, message.receiver_id, message, unread=0)
+        if message.receiver_id != message.sender_id:
+            unread = 0 if message.is_read else 1
+            _touch(message.receiver_id, message.sender_id, message, unread=unread)
+            adjust_unread(message.receiver_id, messages=unread)
+
+
+def mark_conversation_read(conversation):
+    """Mark every message from the counterpart as read and reset the counter"""
+    with transaction.atomic():
+        marked = Message.objects.filter(
+            sender_id=conversation.counterpart_id, receiver_id=conversation.user_id, is_read=False
+        ).update(is_read=True)
+        Conversation.objects.filter(pk=conversation.pk).update(unread_count=0)
+        adjust_unread(conversation.user_id, messages=-marked)
+    conversation.unread_count = 0
+    return marked
+
+
+def rebuild_conversations(batch_size=1000, stdout=None):
+    """Recreate every inbox row from Message (latest id per pair, unread per receiver)"""
+    latest = {}
+    for row in Message.objects.values('sender_id', 'receiver_id').annotate(last_id=Max('id')).order_by():
+        for pair in ((row['sender_id'], row['receiver_id']), (row['receiver_id'], row['sender_id'])):
+            latest[pair] = max(latest.get(pair, 0), row['last_id'])
+
+    unread = {
+        (row['receiver_id'], row['sender_id']): row['unread']
+        for row in Message.objects.filter(is_read=False)
+        .values('receiver_id', 'sender_id').annotate(unread=Count('id')).order_by()
+    }
+
+    created = 0
+    pairs = list(latest.items())
+    with transaction.atomic():
+        Conversation.objects.all().delete()
+        for start in range(0, len(pairs), batch_size):
+            batch = pairs[start:start + batch_size]
+            timestamps = dict(
+                Message.objects.filter(pk__in=[last_id for _, last_id in batch]).values_list('pk', 'timestamp')
+            )
+            created += len(Conversation.objects.bulk_create([
+                Conversation(
+                    user_id=user_id,
+                    counterpart_id=counterpart_id,
+                    last_message_id=last_id,
+                    last_activity=timestamps[last_id],
+                    unread_count=0 if user_id == counterpart_id else unread.get((user_id, counterpart_id), 0),
+                )
+                for (user_id, counterpart_id), last_id in batch
+            ]))
+            if stdout:
+                stdout.write(f"  created {created} conversations", ending='\r')
+    if stdout:
+        stdout.write('')
+    return created
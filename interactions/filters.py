@@ -19,15 +19,15 @@ class MessageFilter(django_filters.FilterSet):
 class BookingRequestFilter(django_filters.FilterSet):
     """Filter for booking requests with comprehensive search options"""
     status = django_filters.ChoiceFilter(choices=BookingRequest.STATUS_CHOICES)
-    property_title = django_filters.CharFilter(field_name='property__title', lookup_expr='icontains')
-    property_location = django_filters.CharFilter(field_name='property__location', lookup_expr='icontains')
-    property_type = django_filters.CharFilter(field_name='property__property_type')
+    property_title = django_filters.CharFilter(field_name='rental_property__title', lookup_expr='icontains')
+    property_location = django_filters.CharFilter(field_name='rental_property__location', lookup_expr='icontains')
+    property_type = django_filters.CharFilter(field_name='rental_property__property_type')
     tenant_username = django_filters.CharFilter(field_name='tenant__username', lookup_expr='icontains')
-    landlord_username = django_filters.CharFilter(field_name='property__owner__username', lookup_expr='icontains')
+    landlord_username = django_filters.CharFilter(field_name='rental_property__owner__username', lookup_expr='icontains')
     date_from = django_filters.DateTimeFilter(field_name='created_at', lookup_expr='gte')
     date_to = django_filters.DateTimeFilter(field_name='created_at', lookup_expr='lte')
-    price_min = django_filters.NumberFilter(field_name='property__price', lookup_expr='gte')
-    price_max = django_filters.NumberFilter(field_name='property__price', lookup_expr='lte')
+    price_min = django_filters.NumberFilter(field_name='rental_property__price', lookup_expr='gte')
+    price_max = django_filters.NumberFilter(field_name='rental_property__price', lookup_expr='lte')
     
     class Meta:
         model = BookingRequest
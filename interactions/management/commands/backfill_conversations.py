@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from interactions.conversations import rebuild_conversations
+
+
+class Command(BaseCommand):
+    help = "Rebuild the Conversation inbox rows (latest message, unread counts) from existing messages"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        created = rebuild_conversations(batch_size=options['batch_size'], stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {created} conversations"))
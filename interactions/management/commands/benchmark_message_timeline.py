@@ -0,0 +1,107 @@
+import datetime
+import random
+from types import SimpleNamespace
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from interactions.models import Message
+from properties.benchmarks import BenchmarkRollback, time_call
+from smarthunt.pagination import MessageTimelinePagination
+
+
+def seed_mailbox(owner, counterparts, count, start, batch_size=5000, seed=42, stdout=None):
+    """Insert ``count`` messages to/from ``owner``, one second apart going back from ``start``"""
+    rng = random.Random(seed)
+    timestamp_field = Message._meta.get_field('timestamp')
+    created = 0
+    # auto_now_add would stamp every row with the same instant
+    timestamp_field.auto_now_add = False
+    try:
+        while created < count:
+            batch = []
+            for offset in range(created, min(created + batch_size, count)):
+                other = rng.choice(counterparts)
+                sender, receiver = (other, owner) if rng.random() < 0.5 else (owner, other)
+                batch.append(Message(
+                    sender=sender, receiver=receiver, content=f"message {offset}",
+                    timestamp=start - datetime.timedelta(seconds=offset),
+                    is_read=rng.random() < 0.8,
+                ))
+            Message.objects.bulk_create(batch, batch_size=batch_size)
+            created += len(batch)
+            if stdout:
+                stdout.write(f"  seeded {created}/{count}", ending='\r')
+    finally:
+        timestamp_field.auto_now_add = True
+    if stdout:
+        stdout.write('')
+    return created
+
+
+class Command(BaseCommand):
+    help = "Show message list latency staying flat as one user's mailbox grows"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[1_000, 10_000, 100_000, 1_000_000])
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--page-size', type=int, default=20)
+
+    def handle(self, *args, **options):
+        page_size = options['page_size']
+        factory = APIRequestFactory()
+
+        def legacy(owner, offset):
+            qs = (Message.objects.filter(receiver=owner) | Message.objects.filter(sender=owner)).order_by('-timestamp')
+            return lambda: (qs.count(), list(qs[offset:offset + page_size]))
+
+        def merged(owner, cursor_message):
+            paginator = MessageTimelinePagination()
+            paginator.page_size = page_size
+            params = {'cursor': paginator.encode_cursor(cursor_message) if cursor_message else ''}
+            request = Request(factory.get('/', params))
+            base = Message.objects.filter(Q(receiver=owner) | Q(sender=owner))
+            view = SimpleNamespace(get_keyset_branches=lambda qs: [
+                qs.filter(receiver=owner), qs.filter(sender=owner).exclude(receiver=owner),
+            ])
+            return lambda: paginator.paginate_queryset(base, request, view)
+
+        self.stdout.write(f"Backend: {connection.vendor}")
+        User = get_user_model()
+        try:
+            with transaction.atomic():
+                suffix = random.randint(0, 10**9)
+                owner = User.objects.create(username=f'bench_mailbox_{suffix}', role='tenant')
+                counterparts = User.objects.bulk_create([
+                    User(username=f'bench_contact_{suffix}_{i}', role='landlord') for i in range(50)
+                ])
+                start = timezone.now()
+                seeded = 0
+                self.stdout.write(
+                    f"{'messages':>10} {'OR first ms':>12} {'merged first ms':>16} "
+                    f"{'OR deep ms':>11} {'merged deep ms':>15}"
+                )
+                for size in sorted(options['sizes']):
+                    seeded += seed_mailbox(
+                        owner, counterparts, size - seeded, start - datetime.timedelta(seconds=seeded),
+                        seed=size, stdout=self.stdout,
+                    )
+                    # "Deep" page: halfway back through the mailbox
+                    middle = Message.objects.filter(
+                        Q(receiver=owner) | Q(sender=owner)
+                    ).order_by('-timestamp', '-id')[size // 2]
+                    old_first, _ = time_call(legacy(owner, 0), options['repeat'])
+                    new_first, _ = time_call(merged(owner, None), options['repeat'])
+                    old_deep, _ = time_call(legacy(owner, size // 2), options['repeat'])
+                    new_deep, _ = time_call(merged(owner, middle), options['repeat'])
+                    self.stdout.write(
+                        f"{size:>10} {old_first:>12.1f} {new_first:>16.1f} {old_deep:>11.1f} {new_deep:>15.1f}"
+                    )
+                raise BenchmarkRollback
+        except BenchmarkRollback:
+            self.stdout.write(self.style.SUCCESS("Benchmark finished, seeded data rolled back"))
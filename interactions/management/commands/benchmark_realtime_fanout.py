@@ -0,0 +1,68 @@
+import asyncio
+
+from asgiref.sync import async_to_sync
+from channels.layers import InMemoryChannelLayer
+from django.core.management.base import BaseCommand
+
+from interactions.utils import group_send_many
+from properties.benchmarks import time_call
+
+
+class LatencyChannelLayer(InMemoryChannelLayer):
+    """In-memory layer that waits one simulated network round trip per group_send (a Redis stand-in)"""
+
+    def __init__(self, latency, **kwargs):
+        super().__init__(**kwargs)
+        self.latency = latency
+
+    async def group_send(self, group, message):
+        await asyncio.sleep(self.latency)
+        await super().group_send(group, message)
+
+
+class Command(BaseCommand):
+    help = "Compare per-user group_send with the batched fan-out when notifying many users"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10_000)
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--latency-ms', type=float, default=0.5,
+                            help="Round trip simulated by the Redis stand-in")
+        parser.add_argument('--redis-host', help="Also run against a real Redis channel layer at host[:port]")
+
+    def handle(self, *args, **options):
+        users = options['users']
+        groups = [f"user_{user_id}" for user_id in range(users)]
+        event = {"type": "notify", "title": "Benchmark", "body": "Fan-out", "data": {}}
+        messages = [(group, event) for group in groups]
+
+        layers = [
+            ('in-memory', InMemoryChannelLayer()),
+            (f"redis stand-in ({options['latency_ms']}ms)", LatencyChannelLayer(options['latency_ms'] / 1000)),
+        ]
+        if options['redis_host']:
+            from channels_redis.core import RedisChannelLayer
+
+            host, _, port = options['redis_host'].partition(':')
+            layers.append((f"redis {options['redis_host']}", RedisChannelLayer(hosts=[(host, int(port or 6379))])))
+
+        async def subscribe(layer):
+            # One connected socket per user, as if everyone were online
+            for index, group in enumerate(groups):
+                await layer.group_add(group, f"bench_fanout.{index}")
+
+        self.stdout.write(f"Fan-out of one event to {users} users")
+        self.stdout.write(f"{'layer':<28} {'per-user ms':>12} {'batched ms':>11} {'speedup':>8}")
+        for name, layer in layers:
+            async_to_sync(subscribe)(layer)
+            try:
+                legacy, _ = time_call(
+                    lambda: [async_to_sync(layer.group_send)(group, payload) for group, payload in messages],
+                    options['repeat'],
+                )
+                batched, _ = time_call(lambda: async_to_sync(group_send_many)(layer, messages), options['repeat'])
+            finally:
+                async_to_sync(layer.flush)()
+            self.stdout.write(f"{name:<28} {legacy:>12.1f} {batched:>11.1f} {legacy / batched:>7.1f}x")
+
+        self.stdout.write(self.style.SUCCESS("Benchmark finished"))
@@ -0,0 +1,46 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from interactions.broadcasts import CHUNK_SIZE, audience_queryset, broadcast_notification
+from interactions.models import Notification
+
+
+class Command(BaseCommand):
+    help = "Send one notification to every user in an audience (role and/or city), in chunks"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--title', required=True)
+        parser.add_argument('--body', required=True)
+        parser.add_argument('--type', dest='notification_type', default='general',
+                            choices=[choice for choice, _ in Notification.NOTIFICATION_TYPES])
+        parser.add_argument('--data', help="JSON object attached to every notification")
+        parser.add_argument('--role', choices=['tenant', 'landlord', 'admin'])
+        parser.add_argument('--city', help="Users owning or having booked a listing in this city")
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help="Only count the audience")
+
+    def handle(self, *args, **options):
+        try:
+            data = json.loads(options['data']) if options['data'] else None
+        except ValueError as exc:
+            raise CommandError(f"--data is not valid JSON: {exc}")
+        if data is not None and not isinstance(data, dict):
+            raise CommandError("--data must be a JSON object")
+
+        audience = audience_queryset(role=options['role'], city=options['city'])
+        if options['dry_run']:
+            self.stdout.write(f"{audience.count()} recipients")
+            return
+
+        def progress(done, total):
+            self.stdout.write(f"  notified {done}/{total}", ending='\r')
+
+        summary = broadcast_notification(
+            audience, options['title'], options['body'], options['notification_type'], data,
+            chunk_size=options['chunk_size'], progress=progress,
+        )
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS(
+            f"Notified {summary['recipients']} users, queued {summary['queued']} realtime events"
+        ))
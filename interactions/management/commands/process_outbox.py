@@ -0,0 +1,52 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from interactions.outbox import process_batch, purge_sent, requeue_dead
+
+# Seconds between sweeps of delivered rows past their retention
+PURGE_INTERVAL = 3600
+
+
+class Command(BaseCommand):
+    help = "Deliver queued emails, SMS and realtime events from the outbox (runs until stopped)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=getattr(settings, 'OUTBOX_BATCH_SIZE', 100))
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help="Seconds to sleep when nothing is due")
+        parser.add_argument('--once', action='store_true', help="Exit once nothing is due")
+        parser.add_argument('--requeue-dead', action='store_true',
+                            help="Give dead-lettered messages a fresh set of attempts first")
+
+    def handle(self, *args, **options):
+        if options['requeue_dead']:
+            self.stdout.write(f"Requeued {requeue_dead()} dead messages")
+
+        totals = {'sent': 0, 'retried': 0, 'dead': 0}
+        last_purge = None
+        try:
+            while True:
+                # A long-running worker must not hold on to a dropped connection
+                close_old_connections()
+                summary = process_batch(options['batch_size'])
+                for key, value in summary.items():
+                    totals[key] += value
+                if any(summary.values()):
+                    self.stdout.write(
+                        f"  sent {summary['sent']}, retried {summary['retried']}, dead {summary['dead']}"
+                    )
+                    continue
+                if options['once']:
+                    break
+                if last_purge is None or time.monotonic() - last_purge > PURGE_INTERVAL:
+                    purge_sent()
+                    last_purge = time.monotonic()
+                time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(
+            f"Outbox worker stopped: sent {totals['sent']}, retried {totals['retried']}, dead {totals['dead']}"
+        ))
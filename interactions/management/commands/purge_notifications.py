@@ -0,0 +1,40 @@
+import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from interactions.retention import MODES, expired_notifications, prune_archive, purge_expired, retention_days
+
+
+class Command(BaseCommand):
+    help = "Archive or delete notifications past their per-type retention, in short batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', choices=MODES, default=getattr(settings, 'NOTIFICATION_RETENTION_MODE', 'archive'))
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--max-rows', type=int, help="Stop after this many rows (run again to continue)")
+        parser.add_argument('--pause', type=float, default=0, help="Seconds to sleep between batches")
+        parser.add_argument('--archive-dir', help="Directory for --mode jsonl files")
+        parser.add_argument('--dry-run', action='store_true', help="Only count expired notifications")
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            for notification_type, days in retention_days().items():
+                expired = expired_notifications(notification_type, days).count() if days is not None else 0
+                kept = 'forever' if days is None else f'{days} days'
+                self.stdout.write(f"  {notification_type:<12} keep {kept:<10} expired {expired}")
+            return
+
+        removed = purge_expired(
+            mode=options['mode'], batch_size=options['batch_size'], max_rows=options['max_rows'],
+            pause=options['pause'], archive_dir=options['archive_dir'], stdout=self.stdout,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Removed {sum(removed.values())} expired notifications ({options['mode']})"
+        ))
+
+        archive_days = getattr(settings, 'NOTIFICATION_ARCHIVE_RETENTION_DAYS', None)
+        if options['mode'] == 'archive' and archive_days is not None:
+            pruned = prune_archive(timezone.now() - datetime.timedelta(days=archive_days))
+            self.stdout.write(f"Pruned archive older than {archive_days} days ({pruned} removed)")
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from interactions.booking_stats import rebuild_booking_stats
+
+
+class Command(BaseCommand):
+    help = "Recompute the per-user booking stats rollup (BOOKING_STATS_ROLLUP) from the bookings"
+
+    def handle(self, *args, **options):
+        written = rebuild_booking_stats(stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} booking stats rows"))
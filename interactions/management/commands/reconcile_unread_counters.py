@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from interactions.unread import reconcile_unread_counters
+
+
+class Command(BaseCommand):
+    help = "Repair drift in the per-user unread notification/message counters"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        repaired = reconcile_unread_counters(batch_size=options['batch_size'], stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(f"Repaired {repaired} unread counters"))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from interactions.bookings import overlap_conflicts
+
+
+class Command(BaseCommand):
+    help = "List approved/checked-in bookings whose dates overlap (they block the overlap guard migration)"
+
+    def handle(self, *args, **options):
+        conflicts = list(overlap_conflicts())
+        for pk, other, property_id in conflicts:
+            self.stdout.write(f"property {property_id}: booking #{pk} overlaps #{other}")
+        if conflicts:
+            raise CommandError(
+                f"{len(conflicts)} overlapping pairs; decline or cancel one booking of each, then migrate again"
+            )
+        self.stdout.write(self.style.SUCCESS("No overlapping approved bookings"))
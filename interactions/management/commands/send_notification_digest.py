@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from interactions.coalescing import queue_notification_digests
+from interactions.models import Notification
+
+
+class Command(BaseCommand):
+    help = "Queue one email per user summarizing unread notifications since their last digest (run on a schedule)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--types', nargs='+', choices=[choice for choice, _ in Notification.NOTIFICATION_TYPES],
+                            help="Only include these notification types")
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--max-items', type=int, default=20, help="Notifications listed per email")
+
+    def handle(self, *args, **options):
+        queued = queue_notification_digests(
+            types=options['types'], batch_size=options['batch_size'],
+            max_items=options['max_items'], stdout=self.stdout,
+        )
+        self.stdout.write(self.style.SUCCESS(f"Queued {queued} digest emails (delivered by process_outbox)"))
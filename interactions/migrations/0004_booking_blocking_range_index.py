@@ -0,0 +1,38 @@
+from django.db import migrations, models
+
+# MySQL ignores the partial index's condition (it silently skips creating
+# it), so there the availability anti-join gets a plain index that leads
+# with status instead
+MYSQL_INDEX = "booking_blocking_range_mysql_idx"
+
+
+def add_mysql_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "mysql":
+        schema_editor.execute(
+            f"CREATE INDEX {MYSQL_INDEX} ON interactions_bookingrequest "
+            "(rental_property_id, status, check_in_date, check_out_date)"
+        )
+
+
+def drop_mysql_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "mysql":
+        schema_editor.execute(f"DROP INDEX {MYSQL_INDEX} ON interactions_bookingrequest")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("interactions", "0003_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="bookingrequest",
+            index=models.Index(
+                condition=models.Q(("status__in", ["approved", "checked_in"])),
+                fields=["rental_property", "check_in_date", "check_out_date"],
+                name="booking_blocking_range_idx",
+            ),
+        ),
+        migrations.RunPython(add_mysql_index, drop_mysql_index),
+    ]
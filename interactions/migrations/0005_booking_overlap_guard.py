@@ -0,0 +1,22 @@
+from django.db import migrations
+
+
+def install(apps, schema_editor):
+    from interactions.bookings import install_overlap_guard
+    install_overlap_guard(schema_editor.connection, apps.get_model("interactions", "BookingRequest"))
+
+
+def uninstall(apps, schema_editor):
+    from interactions.bookings import uninstall_overlap_guard
+    uninstall_overlap_guard(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("interactions", "0004_booking_blocking_range_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(install, uninstall),
+    ]
@@ -0,0 +1,56 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def install(apps, schema_editor):
+    from interactions.retention import install_archive_partitioning
+    install_archive_partitioning(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("interactions", "0010_outboxmessage"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                fields=["notification_type", "created_at"], name="interaction_notific_541585_idx"
+            ),
+        ),
+        migrations.CreateModel(
+            name="ArchivedNotification",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("title", models.CharField(max_length=255)),
+                ("body", models.TextField()),
+                ("notification_type", models.CharField(max_length=20)),
+                ("is_read", models.BooleanField(default=False)),
+                ("data", models.JSONField(blank=True, null=True)),
+                ("created_at", models.DateTimeField()),
+                ("archived_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        db_constraint=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="archived_notifications",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["user", "-created_at"], name="archived_notification_user_idx"
+                    )
+                ],
+            },
+        ),
+        # PostgreSQL: recreate the archive as a table partitioned by month
+        migrations.RunPython(install, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("interactions", "0012_notification_coalescing"),
+    ]
+
+    operations = [
+        # Expression index: MySQL needs 8.0.13+ for functional key parts
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                models.F("user"), Coalesce("updated_at", "created_at"), name="notification_user_activity_idx"
+            ),
+        ),
+    ]
@@ -1,5 +1,8 @@
 from django.db import models
+from django.db.models import F
+from django.db.models.functions import Coalesce
 from django.conf import settings
+from django.utils import timezone
 
 class Message(models.Model):
     sender = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='sent_messages', on_delete=models.CASCADE)
@@ -8,11 +11,49 @@ class Message(models.Model):
     timestamp = models.DateTimeField(auto_now_add=True)
     is_read = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            # Received and sent timelines are read as two index-ordered streams
+            models.Index(fields=['receiver', 'timestamp']),
+            models.Index(fields=['sender', 'timestamp']),
+            models.Index(fields=['receiver', 'is_read']),
+        ]
+
     def __str__(self):
         return f"From {self.sender} to {self.receiver} - {self.content[:30]}"
 
+class Conversation(models.Model):
+    """
+    One user's inbox entry for the thread with ``counterpart``.
+
+    Each pair of users has two rows, one per participant, kept current on
+    every message insert, so an inbox is an index range scan over ``user``
+    rather than a scan of ``Message``.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='conversations', on_delete=models.CASCADE)
+    counterpart = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='+', on_delete=models.CASCADE)
+    last_message = models.ForeignKey(Message, related_name='+', null=True, blank=True, on_delete=models.SET_NULL)
+    last_activity = models.DateTimeField()
+    unread_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-last_activity', '-id']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'counterpart'], name='conversation_user_counterpart_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-last_activity', '-id'], name='conversation_inbox_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} <-> {self.counterpart} ({self.unread_count} unread)"
+
 from properties.models import Property
 
+# Booking statuses that occupy the property for their date range
+BLOCKING_STATUSES = ['approved', 'checked_in']
+
+
 class BookingRequest(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -23,6 +64,8 @@ class BookingRequest(models.Model):
         ('cancelled', 'Cancelled'),
     ]
     
+    BLOCKING_STATUSES = BLOCKING_STATUSES
+    
     tenant = models.ForeignKey(
         settings.AUTH_USER_MODEL, 
         related_name='booking_requests', 
@@ -53,6 +96,13 @@ class BookingRequest(models.Model):
             models.Index(fields=['tenant', 'status']),
             models.Index(fields=['rental_property', 'status']),
             models.Index(fields=['status', 'created_at']),
+            # Availability anti-join: only blocking bookings are indexed by date range
+            # (MySQL has no partial indexes; migration 0004 gives it a plain one)
+            models.Index(
+                fields=['rental_property', 'check_in_date', 'check_out_date'],
+                name='booking_blocking_range_idx',
+                condition=models.Q(status__in=BLOCKING_STATUSES),
+            ),
         ]
 
     def __str__(self):
@@ -76,7 +126,35 @@ class BookingRequest(models.Model):
     @property
     def is_active(self):
         """Check if booking is in active state"""
-        return self.status in ['approved', 'checked_in']
+        return self.status in self.BLOCKING_STATUSES
+
+class BookingStats(models.Model):
+    """Per-user booking counts by status (see interactions.booking_stats)"""
+    ROLE_CHOICES = [
+        ('tenant', 'Tenant'),
+        ('landlord', 'Landlord'),
+    ]
+    
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='booking_stats', on_delete=models.CASCADE)
+    role = models.CharField(max_length=10, choices=ROLE_CHOICES)
+    total = models.PositiveIntegerField(default=0)
+    pending = models.PositiveIntegerField(default=0)
+    approved = models.PositiveIntegerField(default=0)
+    declined = models.PositiveIntegerField(default=0)
+    checked_in = models.PositiveIntegerField(default=0)
+    completed = models.PositiveIntegerField(default=0)
+    cancelled = models.PositiveIntegerField(default=0)
+    # Distinct properties with at least one booking
+    properties = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'role'], name='booking_stats_user_role_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} ({self.role}): {self.total} bookings"
 
 class MaintenanceRequest(models.Model):
     tenant = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='maintenance_requests', on_delete=models.CASCADE)
@@ -110,17 +188,69 @@ class Notification(models.Model):
     is_read = models.BooleanField(default=False)
     data = models.JSONField(blank=True, null=True)  # Store additional context data
     created_at = models.DateTimeField(auto_now_add=True)
+    # Coalescing (see interactions.coalescing): events sharing a group_key within
+    # the window fold into one row, counting them
+    group_key = models.CharField(max_length=100, blank=True, default='')
+    count = models.PositiveIntegerField(default=1)
+    updated_at = models.DateTimeField(null=True, blank=True)
+    # When this notification (at its current count) went out in an email digest
+    digested_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['user', '-created_at']),
             models.Index(fields=['user', 'is_read']),
+            # Retention sweeps: expired rows of one type, oldest first
+            models.Index(fields=['notification_type', 'created_at']),
+            models.Index(fields=['user', 'group_key']),
+            # Stats ?since=: created or coalesced into after a point (see interactions.notification_stats)
+            models.Index(
+                F('user'), Coalesce('updated_at', 'created_at'), name='notification_user_activity_idx',
+            ),
         ]
 
     def __str__(self):
         return f"{self.title} - {self.user.username}"
 
+class ArchivedNotification(models.Model):
+    """A notification past its retention TTL, moved out of the hot table (see interactions.retention)"""
+    # The original notification id. On PostgreSQL the table is partitioned by
+    # month of created_at, so its real primary key is (id, created_at) and the
+    # user column carries no FK constraint.
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, related_name='archived_notifications',
+        on_delete=models.CASCADE, db_constraint=False
+    )
+    title = models.CharField(max_length=255)
+    body = models.TextField()
+    notification_type = models.CharField(max_length=20)
+    is_read = models.BooleanField(default=False)
+    data = models.JSONField(blank=True, null=True)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='archived_notification_user_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.title} (archived)"
+
+class UnreadCounter(models.Model):
+    """Per-user unread notification/message counts, maintained incrementally (see interactions.unread)"""
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL, primary_key=True, related_name='unread_counter', on_delete=models.CASCADE
+    )
+    notifications = models.PositiveIntegerField(default=0)
+    messages = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.notifications} notifications, {self.messages} messages unread"
+
 class Review(models.Model):
     tenant = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -162,4 +292,35 @@ class Favorite(models.Model):
         unique_together = ('tenant', 'property')  # avoid duplicate favorites
 
     def __str__(self):
-        return f"{self.tenant.username} favorited {self.property.title}"
\ No newline at end of file
+        return f"{self.tenant.username} favorited {self.property.title}"
+
+class OutboxMessage(models.Model):
+    """An email, SMS or realtime event awaiting delivery by the outbox worker (see interactions.outbox)"""
+    CHANNEL_CHOICES = [
+        ('email', 'Email'),
+        ('sms', 'SMS'),
+        ('realtime', 'Realtime'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('dead', 'Dead'),
+    ]
+
+    channel = models.CharField(max_length=10, choices=CHANNEL_CHOICES)
+    payload = models.JSONField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    # Next time a worker may claim the row (retry backoff or an in-flight lease)
+    available_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'available_at'], name='outbox_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.channel} #{self.pk} ({self.status})"
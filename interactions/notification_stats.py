@@ -0,0 +1,49 @@
+"""
+Notification statistics
+
+``notification_stats`` answers total and per-type (total and unread) counts
+from one ``GROUP BY notification_type, is_read`` over the user's
+notifications; the overall unread count comes from the maintained
+``UnreadCounter``. Passing ``since`` restricts the breakdown to
+notifications created or coalesced into after that instant (their
+``last_activity``), which the ``(user, last_activity)`` expression index
+serves as a short range scan, and adds the overall unread total from the
+counter, so a client refreshing its badges reads only what is new. The
+returned ``as_of`` is the value to send as ``since`` next time.
+"""
+
+from django.db.models import Count
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Notification
+from .unread import get_unread_notification_count
+
+
+def last_activity():
+    """When a notification was created or last had an event coalesced into it"""
+    return Coalesce('updated_at', 'created_at')
+
+
+def notification_stats(user_id, since=None):
+    as_of = timezone.now()
+    queryset = Notification.objects.filter(user_id=user_id)
+    if since is not None:
+        queryset = queryset.alias(last_activity=last_activity()).filter(last_activity__gt=since)
+
+    stats = {'total': 0, 'unread': 0, 'by_type': {}, 'unread_by_type': {}}
+    rows = queryset.order_by().values_list('notification_type', 'is_read').annotate(n=Count('id'))
+    for notification_type, is_read, count in rows:
+        stats['total'] += count
+        stats['by_type'][notification_type] = stats['by_type'].get(notification_type, 0) + count
+        if not is_read:
+            stats['unread'] += count
+            stats['unread_by_type'][notification_type] = count
+
+    if since is not None:
+        stats['since'] = since
+        stats['unread_total'] = get_unread_notification_count(user_id)
+    else:
+        stats['unread'] = get_unread_notification_count(user_id)
+    stats['as_of'] = as_of
+    return stats
@@ -0,0 +1,236 @@
+"""
+Transactional outbox for notification side effects
+
+Signal handlers no longer talk to SMTP, the SMS gateway or the channel layer
+from the request thread. They write ``OutboxMessage`` rows in the same
+transaction as the change that triggered them, so a side effect exists if
+and only if its change committed. The ``process_outbox`` worker drains the
+table:
+
+* ``claim_batch`` locks up to ``batch_size`` due rows (``SKIP LOCKED`` where
+  the database supports it, so several workers can run), bumps their attempt
+  count and leases them for ``OUTBOX_LEASE_SECONDS``; a worker that dies
+  mid-batch simply lets the lease run out and the rows are claimed again.
+* Each channel is delivered in bulk: one SMTP connection per batch, one
+  event-loop round trip for all channel-layer sends, one gateway call per SMS.
+* Failures are retried with exponential backoff (``OUTBOX_BACKOFF_SECONDS``
+  doubling up to ``OUTBOX_BACKOFF_MAX_SECONDS``); after
+  ``OUTBOX_MAX_ATTEMPTS`` a row is marked ``dead`` and left for inspection or
+  ``requeue_dead``.
+
+Delivery is at-least-once. Realtime events need a channel layer shared with
+the web process (Redis in production); the in-memory layer only reaches
+consumers in the worker's own process. A realtime row may carry a
+``notification_id`` instead of an ``event``; it is rendered from the
+notification as it stands at delivery time (see interactions.coalescing).
+"""
+
+import logging
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from utils.sms_utils import send_sms
+from .models import Notification, OutboxMessage
+from .utils import group_send_many, stored_notification_payload
+
+logger = logging.getLogger(__name__)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+# ---- enqueueing (call inside the triggering write's transaction) ----
+
+def enqueue_many(items, available_at=None):
+    """Queue ``(channel, payload)`` pairs with one INSERT, optionally not before ``available_at``"""
+    extra = {'available_at': available_at} if available_at is not None else {}
+    return OutboxMessage.objects.bulk_create([
+        OutboxMessage(channel=channel, payload=payload, **extra) for channel, payload in items
+    ])
+
+
+def email_items(messages):
+    return [
+        ('email', {
+            'subject': message.subject,
+            'body': message.body,
+            'from_email': message.from_email,
+            'to': list(message.to),
+        })
+        for message in messages if message is not None
+    ]
+
+
+def realtime_items(messages):
+    return [('realtime', {'group': group, 'event': event}) for group, event in messages]
+
+
+def enqueue_emails(messages):
+    """Queue built ``EmailMessage`` objects (``None`` entries are skipped)"""
+    return enqueue_many(email_items(messages))
+
+
+def enqueue_realtime(messages):
+    """Queue ``(group, event)`` channel-layer sends"""
+    return enqueue_many(realtime_items(messages))
+
+
+def enqueue_sms(phone_number, message):
+    return enqueue_many([('sms', {'to': phone_number, 'message': message})])
+
+
+# ---- delivery ----
+
+def deliver_email(messages):
+    """Send every email over one SMTP connection; returns ``{id: error or None}``"""
+    results = {}
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as exc:
+        return {message.pk: f"SMTP connection failed: {exc}" for message in messages}
+    try:
+        for message in messages:
+            try:
+                connection.send_messages([EmailMessage(**message.payload)])
+                results[message.pk] = None
+            except Exception as exc:
+                results[message.pk] = str(exc)
+    finally:
+        connection.close()
+    return results
+
+
+def deliver_sms(messages):
+    results = {}
+    for message in messages:
+        # send_sms logs and swallows gateway errors, returning None
+        response = send_sms(message.payload['to'], message.payload['message'])
+        results[message.pk] = None if response is not None else "SMS gateway returned no response"
+    return results
+
+
+def deliver_realtime(messages):
+    """All channel-layer sends in one event-loop round trip"""
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return {message.pk: "Channel layer not configured" for message in messages}
+
+    # Deferred notification pushes are rendered from the row as it is now
+    current = Notification.objects.in_bulk([
+        message.payload['notification_id'] for message in messages if 'event' not in message.payload
+    ])
+    results, sends = {}, []
+    for message in messages:
+        event = message.payload.get('event')
+        if event is None:
+            notification = current.get(message.payload['notification_id'])
+            if notification is None or notification.is_read:
+                # Read or deleted since: nothing left to refresh
+                results[message.pk] = None
+                continue
+            event = stored_notification_payload(notification)
+        sends.append((message, message.payload['group'], event))
+
+    sent = async_to_sync(group_send_many)(channel_layer, [(group, event) for _, group, event in sends])
+    for (message, _, _), result in zip(sends, sent):
+        results[message.pk] = str(result) if isinstance(result, Exception) else None
+    return results
+
+
+HANDLERS = {
+    'email': deliver_email,
+    'sms': deliver_sms,
+    'realtime': deliver_realtime,
+}
+
+
+def backoff(attempts):
+    """Delay before retry number ``attempts`` (1-based): base * 2**(n-1), capped"""
+    base = _setting('OUTBOX_BACKOFF_SECONDS', 30)
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), _setting('OUTBOX_BACKOFF_MAX_SECONDS', 3600)))
+
+
+def claim_batch(batch_size):
+    """Lease up to ``batch_size`` due rows to this worker"""
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            OutboxMessage.objects.select_for_update(skip_locked=True)
+            .filter(status='pending', available_at__lte=now)
+            .order_by('available_at', 'id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return []
+        OutboxMessage.objects.filter(pk__in=ids).update(
+            attempts=F('attempts') + 1,
+            available_at=now + timedelta(seconds=_setting('OUTBOX_LEASE_SECONDS', 300)),
+        )
+    return list(OutboxMessage.objects.filter(pk__in=ids).order_by('id'))
+
+
+def process_batch(batch_size=100):
+    """Claim and deliver one batch; returns ``{'sent': n, 'retried': n, 'dead': n}``"""
+    messages = claim_batch(batch_size)
+    by_channel = {}
+    for message in messages:
+        by_channel.setdefault(message.channel, []).append(message)
+
+    results = {}
+    for channel, batch in by_channel.items():
+        handler = HANDLERS.get(channel)
+        if handler is None:
+            results.update({message.pk: f"Unknown channel '{channel}'" for message in batch})
+            continue
+        try:
+            results.update(handler(batch))
+        except Exception as exc:
+            logger.exception(f"Outbox {channel} delivery failed")
+            results.update({message.pk: str(exc) for message in batch})
+
+    now = timezone.now()
+    summary = {'sent': 0, 'retried': 0, 'dead': 0}
+    sent = [pk for pk, error in results.items() if error is None]
+    if sent:
+        summary['sent'] = OutboxMessage.objects.filter(pk__in=sent).update(status='sent', sent_at=now, last_error='')
+
+    max_attempts = _setting('OUTBOX_MAX_ATTEMPTS', 8)
+    for message in messages:
+        error = results.get(message.pk)
+        if error is None:
+            continue
+        if message.attempts >= max_attempts:
+            OutboxMessage.objects.filter(pk=message.pk).update(status='dead', last_error=error)
+            logger.error(f"Outbox {message.channel} #{message.pk} dead after {message.attempts} attempts: {error}")
+            summary['dead'] += 1
+        else:
+            OutboxMessage.objects.filter(pk=message.pk).update(
+                available_at=now + backoff(message.attempts), last_error=error
+            )
+            summary['retried'] += 1
+    return summary
+
+
+def requeue_dead(ids=None):
+    """Give dead-lettered rows (all, or ``ids``) a fresh set of attempts"""
+    queryset = OutboxMessage.objects.filter(status='dead')
+    if ids is not None:
+        queryset = queryset.filter(pk__in=ids)
+    return queryset.update(status='pending', attempts=0, available_at=timezone.now())
+
+
+def purge_sent(older_than=None):
+    """Delete delivered rows older than ``older_than`` (default ``OUTBOX_SENT_RETENTION_DAYS``)"""
+    if older_than is None:
+        older_than = timedelta(days=_setting('OUTBOX_SENT_RETENTION_DAYS', 7))
+    deleted, _ = OutboxMessage.objects.filter(status='sent', sent_at__lt=timezone.now() - older_than).delete()
+    return deleted
@@ -13,6 +13,8 @@ from django.contrib.auth import get_user_model
 import json
 import logging
 
+from .utils import send_group_messages
+
 logger = logging.getLogger(__name__)
 User = get_user_model()
 
@@ -47,12 +49,15 @@ class RealtimeNotificationManager:
             return False
     
     def send_to_multiple_users(self, user_ids, event_type, payload):
-        """Send event to multiple users"""
-        success_count = 0
-        for user_id in user_ids:
-            if self.send_to_user(user_id, event_type, payload):
-                success_count += 1
-        return success_count
+        """Send event to multiple users concurrently in one async context; returns how many succeeded"""
+        if not self.is_available():
+            logger.warning("Channel layer not configured - real-time disabled")
+            return 0
+        
+        event = {"type": event_type, **payload}
+        return send_group_messages(
+            [(f"user_{user_id}", event) for user_id in user_ids], channel_layer=self.channel_layer
+        )
     
     def broadcast_notification(self, user_id, title, body, notification_type='general', data=None, notification_id=None):
         """Broadcast notification to user"""
@@ -0,0 +1,246 @@
+"""
+Notification retention and archival
+
+Each notification type has a time to live (``NOTIFICATION_RETENTION_DAYS``,
+``None`` meaning keep forever). ``purge_expired`` walks the expired rows of
+each type oldest first over the ``(notification_type, created_at)`` index,
+``batch_size`` rows per short transaction, so a sweep never holds locks for
+long and can be stopped and resumed at any point. Expired rows are either
+
+* ``archive``: copied to ``ArchivedNotification``, a cold table that on
+  PostgreSQL is range-partitioned by month, so whole months of archive can
+  later be dropped instantly with ``prune_archive``;
+* ``jsonl``: appended to a gzip-compressed JSON Lines file under
+  ``NOTIFICATION_ARCHIVE_DIR``; or
+* ``delete``: removed outright.
+
+The hot ``Notification`` table itself is not partitioned: PostgreSQL needs
+the partition key in the primary key, which Django models cannot express
+for an existing integer-keyed table.
+
+Unread notifications that expire are first marked read and taken off the
+users' unread counters in bulk, so the per-row delete signal has nothing to
+adjust.
+"""
+
+import datetime
+import gzip
+import json
+import logging
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+from .models import ArchivedNotification, Notification
+from .unread import adjust_unread_many
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_TABLE = ArchivedNotification._meta.db_table
+ARCHIVE_FIELDS = ['id', 'user_id', 'title', 'body', 'notification_type', 'is_read', 'data', 'created_at']
+MODES = ['archive', 'jsonl', 'delete']
+
+DEFAULT_RETENTION_DAYS = {
+    'default': 180,
+}
+
+
+def retention_days():
+    """``{notification_type: days or None}`` for every type"""
+    policy = {**DEFAULT_RETENTION_DAYS, **getattr(settings, 'NOTIFICATION_RETENTION_DAYS', {})}
+    return {
+        notification_type: policy.get(notification_type, policy['default'])
+        for notification_type, _ in Notification.NOTIFICATION_TYPES
+    }
+
+
+def expired_notifications(notification_type, days, now=None):
+    cutoff = (now or timezone.now()) - datetime.timedelta(days=days)
+    return Notification.objects.filter(notification_type=notification_type, created_at__lt=cutoff)
+
+
+# ---- partitioned archive (PostgreSQL) ----
+
+def _is_partitioned(cursor):
+    cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", [ARCHIVE_TABLE])
+    row = cursor.fetchone()
+    return row is not None and row[0] == 'p'
+
+
+def install_archive_partitioning(conn=None):
+    """Recreate the archive as ``PARTITION BY RANGE (created_at)`` with a default partition (idempotent)"""
+    conn = conn or connection
+    if conn.vendor != 'postgresql':
+        return
+    with conn.cursor() as cursor:
+        if _is_partitioned(cursor):
+            return
+        cursor.execute(f"ALTER TABLE {ARCHIVE_TABLE} RENAME TO {ARCHIVE_TABLE}_old")
+        cursor.execute(
+            f"CREATE TABLE {ARCHIVE_TABLE} (LIKE {ARCHIVE_TABLE}_old INCLUDING DEFAULTS) "
+            f"PARTITION BY RANGE (created_at)"
+        )
+        cursor.execute(f"ALTER TABLE {ARCHIVE_TABLE} ADD PRIMARY KEY (id, created_at)")
+        cursor.execute(f"CREATE TABLE {ARCHIVE_TABLE}_default PARTITION OF {ARCHIVE_TABLE} DEFAULT")
+        cursor.execute(f"INSERT INTO {ARCHIVE_TABLE} SELECT * FROM {ARCHIVE_TABLE}_old")
+        cursor.execute(f"DROP TABLE {ARCHIVE_TABLE}_old")
+        cursor.execute(
+            f"CREATE INDEX archived_notification_user_idx ON {ARCHIVE_TABLE} (user_id, created_at DESC)"
+        )
+
+
+def _month_start(moment):
+    return datetime.datetime(moment.year, moment.month, 1, tzinfo=datetime.timezone.utc)
+
+
+def _next_month(month):
+    return month.replace(year=month.year + month.month // 12, month=month.month % 12 + 1)
+
+
+def partition_name(month):
+    return f"{ARCHIVE_TABLE}_p{month:%Y%m}"
+
+
+def ensure_archive_partitions(first, last, conn=None):
+    """Create the monthly partitions covering ``first``..``last`` (PostgreSQL only)"""
+    conn = conn or connection
+    if conn.vendor != 'postgresql':
+        return
+    month = _month_start(first.astimezone(datetime.timezone.utc))
+    end = _month_start(last.astimezone(datetime.timezone.utc))
+    with conn.cursor() as cursor:
+        while month <= end:
+            try:
+                with transaction.atomic(using=conn.alias):
+                    cursor.execute(
+                        f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF {ARCHIVE_TABLE} "
+                        f"FOR VALUES FROM (%s) TO (%s)",
+                        [month, _next_month(month)],
+                    )
+            except DatabaseError as exc:
+                # Rows for this month already sit in the default partition; keep using it
+                logger.warning(f"Could not create archive partition {partition_name(month)}: {exc}")
+            month = _next_month(month)
+
+
+def prune_archive(before, batch_size=1000, conn=None):
+    """
+    Remove archived notifications created before ``before``; returns rows or partitions dropped
+
+    On PostgreSQL every monthly partition that ends on or before ``before`` is
+    dropped whole; elsewhere rows are deleted in batches.
+    """
+    conn = conn or connection
+    if conn.vendor == 'postgresql':
+        dropped = 0
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = to_regclass(%s)", [ARCHIVE_TABLE]
+            )
+            for (name,) in cursor.fetchall():
+                suffix = name.rsplit('_p', 1)[-1]
+                if not suffix.isdigit() or len(suffix) != 6:
+                    continue  # the default partition
+                month = datetime.datetime(int(suffix[:4]), int(suffix[4:]), 1, tzinfo=datetime.timezone.utc)
+                if _next_month(month) <= before:
+                    cursor.execute(f"DROP TABLE {name}")
+                    dropped += 1
+        return dropped
+
+    deleted = 0
+    while True:
+        ids = list(
+            ArchivedNotification.objects.filter(created_at__lt=before)
+            .order_by('created_at').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return deleted
+        deleted += ArchivedNotification.objects.filter(pk__in=ids).delete()[0]
+
+
+# ---- sweeping the hot table ----
+
+class JsonlArchive:
+    """Appends rows to one gzip-compressed JSON Lines file per sweep"""
+
+    def __init__(self, directory):
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        self.path = directory / f"notifications-{timezone.now():%Y%m%dT%H%M%S}.jsonl.gz"
+
+    def write(self, rows):
+        with gzip.open(self.path, 'at', encoding='utf-8') as handle:
+            for row in rows:
+                handle.write(json.dumps(row, cls=DjangoJSONEncoder) + '\n')
+
+
+def _sweep_batch(queryset, batch_size, mode, jsonl):
+    rows = list(queryset.order_by('created_at', 'id').values(*ARCHIVE_FIELDS)[:batch_size])
+    if not rows:
+        return 0
+    ids = [row['id'] for row in rows]
+    with transaction.atomic():
+        if mode == 'archive':
+            ensure_archive_partitions(rows[0]['created_at'], rows[-1]['created_at'])
+            # ignore_conflicts makes a re-run after a crash between copy and delete harmless
+            ArchivedNotification.objects.bulk_create(
+                [ArchivedNotification(**row) for row in rows], ignore_conflicts=True
+            )
+        elif mode == 'jsonl':
+            # Written before the delete commits: a crash can duplicate a line, never lose one
+            jsonl.write(rows)
+
+        unread = {}
+        for row in rows:
+            if not row['is_read']:
+                unread[row['user_id']] = unread.get(row['user_id'], 0) - 1
+        if unread:
+            Notification.objects.filter(pk__in=ids, is_read=False).update(is_read=True)
+            adjust_unread_many(unread)
+        Notification.objects.filter(pk__in=ids).delete()
+    return len(rows)
+
+
+def purge_expired(mode='archive', batch_size=1000, max_rows=None, pause=0, archive_dir=None,
+                  now=None, stdout=None):
+    """
+    Archive or delete every notification past its type's TTL
+
+    Stops after ``max_rows`` (for incremental runs) and sleeps ``pause``
+    seconds between batches to leave room for other writers. Returns
+    ``{notification_type: rows removed}``.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown retention mode '{mode}'")
+    now = now or timezone.now()
+    jsonl = None
+    if mode == 'jsonl':
+        jsonl = JsonlArchive(archive_dir or getattr(settings, 'NOTIFICATION_ARCHIVE_DIR', 'archive/notifications'))
+
+    removed = {}
+    total = 0
+    for notification_type, days in retention_days().items():
+        if days is None:
+            continue
+        queryset = expired_notifications(notification_type, days, now)
+        while max_rows is None or total < max_rows:
+            size = batch_size if max_rows is None else min(batch_size, max_rows - total)
+            swept = _sweep_batch(queryset, size, mode, jsonl)
+            if not swept:
+                break
+            removed[notification_type] = removed.get(notification_type, 0) + swept
+            total += swept
+            if stdout:
+                stdout.write(f"  {notification_type}: {removed[notification_type]} removed", ending='\r')
+            if pause:
+                time.sleep(pause)
+        if stdout and notification_type in removed:
+            stdout.write('')
+    if jsonl and total:
+        logger.info(f"Archived {total} notifications to {jsonl.path}")
+    return removed
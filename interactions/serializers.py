@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from .models import Message, BookingRequest, Review, Favorite, Notification, MaintenanceRequest
+from .models import Message, Conversation, BookingRequest, Review, Favorite, Notification, MaintenanceRequest
+from .bookings import ACTIONS, overlapping_bookings
 
 class MessageSerializer(serializers.ModelSerializer):
     class Meta:
@@ -8,14 +9,25 @@ class MessageSerializer(serializers.ModelSerializer):
         read_only_fields = ['sender', 'timestamp']
 
 
+class ConversationSerializer(serializers.ModelSerializer):
+    """Inbox entry: the counterpart, the latest message and this user's unread count"""
+    counterpart_username = serializers.CharField(source='counterpart.username', read_only=True)
+    last_message = MessageSerializer(read_only=True)
+    
+    class Meta:
+        model = Conversation
+        fields = ['id', 'counterpart', 'counterpart_username', 'last_message', 'last_activity', 'unread_count']
+        read_only_fields = fields
+
+
 class BookingRequestSerializer(serializers.ModelSerializer):
     tenant_name = serializers.CharField(source='tenant.username', read_only=True)
     tenant_email = serializers.CharField(source='tenant.email', read_only=True)
-    property_title = serializers.CharField(source='property.title', read_only=True)
-    property_location = serializers.CharField(source='property.location', read_only=True)
-    property_price = serializers.DecimalField(source='property.price', max_digits=10, decimal_places=2, read_only=True)
-    landlord_name = serializers.CharField(source='property.owner.username', read_only=True)
-    landlord_email = serializers.CharField(source='property.owner.email', read_only=True)
+    property_title = serializers.CharField(source='rental_property.title', read_only=True)
+    property_location = serializers.CharField(source='rental_property.location', read_only=True)
+    property_price = serializers.DecimalField(source='rental_property.price', max_digits=10, decimal_places=2, read_only=True)
+    landlord_name = serializers.CharField(source='rental_property.owner.username', read_only=True)
+    landlord_email = serializers.CharField(source='rental_property.owner.email', read_only=True)
     
     # Status properties
     can_be_approved = serializers.ReadOnlyField()
@@ -26,7 +38,7 @@ class BookingRequestSerializer(serializers.ModelSerializer):
     class Meta:
         model = BookingRequest
         fields = [
-            'id', 'tenant', 'tenant_name', 'tenant_email', 'property', 'property_title', 
+            'id', 'tenant', 'tenant_name', 'tenant_email', 'rental_property', 'property_title', 
             'property_location', 'property_price', 'landlord_name', 'landlord_email',
             'message', 'status', 'check_in_date', 'check_out_date', 'landlord_response',
             'created_at', 'updated_at', 'approved_at', 'checked_in_at', 'completed_at',
@@ -41,7 +53,7 @@ class BookingRequestCreateSerializer(serializers.ModelSerializer):
     """Simplified serializer for creating booking requests"""
     class Meta:
         model = BookingRequest
-        fields = ['property', 'message', 'check_in_date', 'check_out_date']
+        fields = ['rental_property', 'message', 'check_in_date', 'check_out_date']
         
     def validate(self, data):
         """Validate booking request data"""
@@ -53,9 +65,13 @@ class BookingRequestCreateSerializer(serializers.ModelSerializer):
                 raise serializers.ValidationError("Check-out date must be after check-in date")
                 
         # Check if property is available
-        property_obj = data.get('property')
+        property_obj = data.get('rental_property')
         if property_obj and property_obj.status != 'available':
             raise serializers.ValidationError("Property is not available for booking")
+        
+        # Early feedback only; approval re-checks under a lock and the DB guard
+        if property_obj and check_in and check_out and overlapping_bookings(property_obj.pk, check_in, check_out).exists():
+            raise serializers.ValidationError("Property is already booked for these dates")
             
         return data
 
@@ -90,6 +106,21 @@ class BookingRequestUpdateSerializer(serializers.ModelSerializer):
         return value
 
 
+class BookingBulkActionSerializer(serializers.Serializer):
+    """Payload for applying one action to many booking requests"""
+    MAX_IDS = 100
+    
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=MAX_IDS
+    )
+    action = serializers.ChoiceField(choices=list(ACTIONS))
+    landlord_response = serializers.CharField(required=False, allow_blank=True)
+    
+    def validate_ids(self, value):
+        # Keep request order, drop repeats
+        return list(dict.fromkeys(value))
+
+
 class ReviewSerializer(serializers.ModelSerializer):
     class Meta:
         model = Review
@@ -107,14 +138,31 @@ class FavoriteSerializer(serializers.ModelSerializer):
 class NotificationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Notification
-        fields = ['id', 'title', 'body', 'notification_type', 'is_read', 'data', 'created_at']
-        read_only_fields = ['created_at']
+        fields = ['id', 'title', 'body', 'notification_type', 'is_read', 'data', 'count', 'created_at', 'updated_at']
+        read_only_fields = ['count', 'created_at', 'updated_at']
 
 class NotificationListSerializer(serializers.ModelSerializer):
     """Simplified serializer for notification lists"""
     class Meta:
         model = Notification
-        fields = ['id', 'title', 'body', 'notification_type', 'is_read', 'created_at']
+        fields = ['id', 'title', 'body', 'notification_type', 'is_read', 'count', 'created_at', 'updated_at']
+
+
+class NotificationBroadcastSerializer(serializers.Serializer):
+    """One notification for every user matching the audience filters"""
+    title = serializers.CharField(max_length=255)
+    body = serializers.CharField()
+    notification_type = serializers.ChoiceField(choices=Notification.NOTIFICATION_TYPES, default='general')
+    data = serializers.JSONField(required=False)
+    role = serializers.ChoiceField(choices=['tenant', 'landlord', 'admin'], required=False)
+    city = serializers.CharField(required=False, allow_blank=False)
+    dry_run = serializers.BooleanField(default=False)
+
+    def validate_data(self, value):
+        # Stored on every notification and read by clients as an object
+        if not isinstance(value, dict):
+            raise serializers.ValidationError("Expected a JSON object.")
+        return value
 
 
 class MaintenanceRequestSerializer(serializers.ModelSerializer):
@@ -1,19 +1,19 @@
 # interactions/signals.py
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_save, post_delete, pre_save
 from django.dispatch import receiver
 from .models import BookingRequest, Message, MaintenanceRequest, Review, Favorite, Notification
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
-from .utils import send_notification_to_user, send_chat_message_to_participants, broadcast_booking_update
-from users.email_utils import (
-    send_booking_notification_email, 
-    send_maintenance_notification_email,
-    send_welcome_email
-)
-from datetime import datetime
+from .bookings import bookings_transitioned
+from .booking_stats import record_booking_created, record_booking_deleted
+from .coalescing import coalesce_notification
+from .conversations import record_message
+from .unread import adjust_unread, adjust_unread_many
+from .outbox import email_items, enqueue_emails, enqueue_many, enqueue_realtime, realtime_items
+from .utils import booking_update_messages, chat_message_messages, notification_payload
+from properties.counters import refresh_review_stats, adjust_favorite_count
+from users.email_utils import build_booking_notification_email, build_maintenance_notification_email
 
 def create_notification(user, title, body, notification_type='general', data=None):
-    """Helper function to create notification and send real-time update"""
+    """Helper function to create notification and queue its real-time update"""
     notification = Notification.objects.create(
         user=user,
         title=title,
@@ -22,107 +22,120 @@ def create_notification(user, title, body, notification_type='general', data=Non
         data=data or {}
     )
     
-    # Send real-time notification with enhanced payload
-    send_notification_to_user(
-        user_id=user.id,
-        title=title,
-        body=body,
-        notification_type=notification_type,
-        data=data or {},
-        notification_id=notification.id
-    )
+    # Queue real-time notification with enhanced payload
+    enqueue_realtime([(
+        f"user_{user.id}",
+        notification_payload(title, body, notification_type, data or {}, notification.id)
+    )])
     
     return notification
 
 @receiver(post_save, sender=BookingRequest)
 def booking_request_notification(sender, instance, created, **kwargs):
-    """Handle booking request creation and status updates"""
-    from django.utils import timezone
-    
+    """Handle booking request creation (status changes go through bookings_transitioned)"""
     if created:
+        record_booking_created(instance)
+
         # Notify landlord of new booking request
         create_notification(
-            user=instance.property.owner,
+            user=instance.rental_property.owner,
             title="New Booking Request",
-            body=f"{instance.tenant.username} requested to book {instance.property.title}",
+            body=f"{instance.tenant.username} requested to book {instance.rental_property.title}",
             notification_type='booking',
             data={
                 'booking_id': instance.id,
-                'property_id': instance.property.id,
+                'property_id': instance.rental_property.id,
                 'tenant_id': instance.tenant.id,
                 'status': instance.status,
                 'check_in_date': instance.check_in_date.isoformat() if instance.check_in_date else None,
                 'check_out_date': instance.check_out_date.isoformat() if instance.check_out_date else None
             }
         )
-        # Send email notification
-        send_booking_notification_email(instance, 'created')
-        
-        # Broadcast booking update
-        broadcast_booking_update(instance, 'created')
-    else:
-        # Handle status changes and update timestamps
-        if instance.status == 'approved' and not instance.approved_at:
-            instance.approved_at = timezone.now()
-            instance.save(update_fields=['approved_at'])
-        elif instance.status == 'checked_in' and not instance.checked_in_at:
-            instance.checked_in_at = timezone.now()
-            instance.save(update_fields=['checked_in_at'])
-        elif instance.status == 'completed' and not instance.completed_at:
-            instance.completed_at = timezone.now()
-            instance.save(update_fields=['completed_at'])
-        
-        # Status change notifications
-        status_messages = {
-            'approved': f"Great news! Your booking request for {instance.property.title} has been approved!",
-            'declined': f"Your booking request for {instance.property.title} was declined.",
-            'checked_in': f"You have successfully checked in to {instance.property.title}. Enjoy your stay!",
-            'completed': f"Your booking at {instance.property.title} has been completed. Thank you for choosing us!",
-            'cancelled': f"Your booking for {instance.property.title} has been cancelled."
-        }
-        
+        # Queue email notification and booking update broadcast
+        enqueue_many(
+            email_items([build_booking_notification_email(instance, 'created')])
+            + realtime_items(booking_update_messages(instance, 'created'))
+        )
+
+BOOKING_STATUS_MESSAGES = {
+    'approved': "Great news! Your booking request for {title} has been approved!",
+    'declined': "Your booking request for {title} was declined.",
+    'checked_in': "You have successfully checked in to {title}. Enjoy your stay!",
+    'completed': "Your booking at {title} has been completed. Thank you for choosing us!",
+    'cancelled': "Your booking for {title} has been cancelled."
+}
+
+@receiver(bookings_transitioned)
+def booking_status_notification(sender, bookings, **kwargs):
+    """
+    Notify the other party of each status transition (timestamps are set by
+    the transition itself). Runs inside the transition's transaction; a bulk
+    action arrives as one batch, so its notifications and its queued emails
+    and realtime events are each inserted in bulk.
+    """
+    notifications, emails, realtime_messages = [], [], []
+    for booking in bookings:
         # Determine notification recipient based on status
-        if instance.status in ['approved', 'declined']:
+        if booking.status in ['approved', 'declined']:
             # Notify tenant of landlord's decision
-            recipient = instance.tenant
-        elif instance.status in ['checked_in', 'completed', 'cancelled']:
+            recipient = booking.tenant
+        elif booking.status in ['checked_in', 'completed', 'cancelled']:
             # Notify landlord of tenant's action
-            recipient = instance.property.owner
+            recipient = booking.rental_property.owner
         else:
-            recipient = None
-            
-        if recipient and instance.status in status_messages:
-            create_notification(
-                user=recipient,
-                title="Booking Update",
-                body=status_messages[instance.status],
-                notification_type='booking',
-                data={
-                    'booking_id': instance.id,
-                    'property_id': instance.property.id,
-                    'status': instance.status,
-                    'tenant_id': instance.tenant.id,
-                    'landlord_id': instance.property.owner.id
-                }
+            continue
+        
+        notifications.append(Notification(
+            user=recipient,
+            title="Booking Update",
+            body=BOOKING_STATUS_MESSAGES[booking.status].format(title=booking.rental_property.title),
+            notification_type='booking',
+            data={
+                'booking_id': booking.id,
+                'property_id': booking.rental_property.id,
+                'status': booking.status,
+                'tenant_id': booking.tenant.id,
+                'landlord_id': booking.rental_property.owner.id
+            }
+        ))
+        
+        # Send email notification for key status changes
+        if booking.status in ['approved', 'declined', 'checked_in', 'completed']:
+            emails.append(build_booking_notification_email(booking, booking.status))
+        
+        # Broadcast booking status update
+        realtime_messages.extend(booking_update_messages(booking, booking.status))
+    
+    notifications = Notification.objects.bulk_create(notifications)
+    # bulk_create skips post_save, so bump the unread counters here
+    unread = {}
+    for notification in notifications:
+        unread[notification.user_id] = unread.get(notification.user_id, 0) + 1
+    adjust_unread_many(unread)
+    for notification in notifications:
+        realtime_messages.append((
+            f"user_{notification.user_id}",
+            notification_payload(
+                notification.title, notification.body, notification.notification_type,
+                notification.data, notification.id
             )
-            
-            # Send email notification for key status changes
-            if instance.status in ['approved', 'declined', 'checked_in', 'completed']:
-                send_booking_notification_email(instance, instance.status)
-            
-            # Broadcast booking status update
-            broadcast_booking_update(instance, instance.status)
+        ))
+    
+    enqueue_many(email_items(emails) + realtime_items(realtime_messages))
 
 @receiver(post_save, sender=Message)
 def message_notification(sender, instance, created, **kwargs):
     """Handle new message notifications and real-time chat"""
     if created:
-        # Send real-time chat message to participants
-        send_chat_message_to_participants(instance)
+        # Keep both participants' inbox rows current
+        record_message(instance)
+        
+        # Queue real-time chat message to participants
+        enqueue_realtime(chat_message_messages(instance))
         
         # Create notification for recipient
         create_notification(
-            user=instance.recipient,
+            user=instance.receiver,
             title="New Message",
             body=f"You have a new message from {instance.sender.username}",
             notification_type='message',
@@ -130,7 +143,6 @@ def message_notification(sender, instance, created, **kwargs):
                 'message_id': instance.id,
                 'sender_id': instance.sender.id,
                 'sender_name': instance.sender.username,
-                'property_id': instance.property.id if instance.property else None,
                 'content_preview': instance.content[:100] + '...' if len(instance.content) > 100 else instance.content
             }
         )
@@ -152,8 +164,8 @@ def maintenance_request_notification(sender, instance, created, **kwargs):
                 'status': instance.status
             }
         )
-        # Send email notification
-        send_maintenance_notification_email(instance, 'created')
+        # Queue email notification
+        enqueue_emails([build_maintenance_notification_email(instance, 'created')])
     else:
         # Status change - notify tenant
         status_messages = {
@@ -174,19 +186,27 @@ def maintenance_request_notification(sender, instance, created, **kwargs):
                     'status': instance.status
                 }
             )
-            # Send email notification for status changes
+            # Queue email notification for status changes
             if instance.status in ['in_progress', 'resolved']:
-                send_maintenance_notification_email(instance, instance.status)
+                enqueue_emails([build_maintenance_notification_email(instance, instance.status)])
 
 @receiver(post_save, sender=Review)
 def review_notification(sender, instance, created, **kwargs):
     """Handle new review notifications"""
+    # Keep Property.avg_rating/review_count in sync (covers rating edits too)
+    refresh_review_stats(instance.property_id)
+    
     if created:
-        # Notify landlord of new review
-        create_notification(
+        # Notify landlord of new review (a burst of reviews becomes one notification)
+        title = instance.property.title
+        coalesce_notification(
             user=instance.property.owner,
+            group_key=f"review:{instance.property_id}",
             title="New Property Review",
-            body=f"{instance.tenant.username} left a {instance.rating}-star review for {instance.property.title}",
+            body_for=lambda count: (
+                f"{instance.tenant.username} left a {instance.rating}-star review for {title}"
+                if count == 1 else f"{count} new reviews for {title}"
+            ),
             notification_type='review',
             data={
                 'review_id': instance.id,
@@ -200,14 +220,48 @@ def review_notification(sender, instance, created, **kwargs):
 def favorite_notification(sender, instance, created, **kwargs):
     """Handle property favorite notifications"""
     if created:
-        # Notify landlord when someone favorites their property
-        create_notification(
+        adjust_favorite_count(instance.property_id, 1)
+        
+        # Notify landlord when someone favorites their property (bursts are coalesced)
+        title = instance.property.title
+        coalesce_notification(
             user=instance.property.owner,
+            group_key=f"favorite:{instance.property_id}",
             title="Property Favorited",
-            body=f"{instance.tenant.username} added {instance.property.title} to their favorites",
+            body_for=lambda count: (
+                f"{instance.tenant.username} added {title} to their favorites"
+                if count == 1 else f"{count} people favorited {title}"
+            ),
             notification_type='property',
             data={
                 'property_id': instance.property.id,
                 'tenant_id': instance.tenant.id
             }
         )
+
+@receiver(post_delete, sender=BookingRequest)
+def booking_deleted(sender, instance, **kwargs):
+    """Take a removed booking out of the dashboard stats"""
+    record_booking_deleted(instance)
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    """Keep the property's rating counters in sync when a review is removed"""
+    refresh_review_stats(instance.property_id)
+
+@receiver(post_delete, sender=Favorite)
+def favorite_deleted(sender, instance, **kwargs):
+    """Keep the property's favorite counter in sync when a favorite is removed"""
+    adjust_favorite_count(instance.property_id, -1)
+
+@receiver(post_save, sender=Notification)
+def notification_created(sender, instance, created, **kwargs):
+    """Count new unread notifications (read-flag changes go through interactions.unread)"""
+    if created and not instance.is_read:
+        adjust_unread(instance.user_id, notifications=1)
+
+@receiver(post_delete, sender=Notification)
+def notification_deleted(sender, instance, **kwargs):
+    """Deleting an unread notification lowers the counter"""
+    if not instance.is_read:
+        adjust_unread(instance.user_id, notifications=-1)
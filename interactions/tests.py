@@ -1,3 +1,788 @@
-from django.test import TestCase
+import datetime
+import gzip
+import json
+import tempfile
+import unittest
+from unittest import mock
+from concurrent.futures import ThreadPoolExecutor
+from itertools import combinations
+from pathlib import Path
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from channels.layers import InMemoryChannelLayer
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.db.models import Q
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from properties.models import Property
+from .booking_stats import get_booking_stats, rebuild_booking_stats
+from .broadcasts import audience_queryset, broadcast_notification
+from .coalescing import queue_notification_digests
+from .bookings import (
+    BookingConflict, BookingOverlapError, approve_booking, install_overlap_guard, overlap_conflicts,
+    transition_booking, uninstall_overlap_guard
+)
+from .conversations import rebuild_conversations
+from .outbox import process_batch, requeue_dead
+from .realtime_manager import RealtimeNotificationManager
+from .retention import purge_expired
+from .models import (
+    ArchivedNotification, BookingRequest, Conversation, Favorite, Message, Notification, OutboxMessage,
+    UnreadCounter
+)
+from .unread import get_unread_counts, reconcile_unread_counters
+
+User = get_user_model()
+
+
+class BookingOverlapTests(TransactionTestCase):
+    """Concurrent approvals must never leave two overlapping stays approved"""
+
+    WORKERS = 8
+
+    def setUp(self):
+        landlord = User.objects.create_user(username='landlord', password='pass', role='landlord')
+        self.property = Property.objects.create(
+            owner=landlord,
+            title='Garden flat',
+            description='Two bedrooms near the park',
+            property_type='apartment',
+            price=25000,
+            location='Kilimani, Nairobi',
+        )
+        self.tenants = User.objects.bulk_create([
+            User(username=f'tenant{i}', role='tenant') for i in range(self.WORKERS * 2)
+        ])
+
+    def create_bookings(self, ranges):
+        # bulk_create skips the notification signals, which are not under test
+        return BookingRequest.objects.bulk_create([
+            BookingRequest(
+                tenant=self.tenants[i],
+                rental_property=self.property,
+                check_in_date=datetime.date(2025, 3, 1) + datetime.timedelta(days=start),
+                check_out_date=datetime.date(2025, 3, 1) + datetime.timedelta(days=end),
+            )
+            for i, (start, end) in enumerate(ranges)
+        ])
+
+    def approve_in_thread(self, booking_id):
+        try:
+            approve_booking(booking_id)
+            return 'approved'
+        except (BookingOverlapError, BookingConflict):
+            return 'rejected'
+        except DatabaseError:
+            # Lock timeouts and serialization failures also reject the approval
+            return 'rejected'
+        finally:
+            connection.close()
+
+    def assert_no_overlaps(self):
+        approved = list(
+            BookingRequest.objects.filter(
+                rental_property=self.property, status__in=BookingRequest.BLOCKING_STATUSES
+            ).values_list('check_in_date', 'check_out_date')
+        )
+        for (in_a, out_a), (in_b, out_b) in combinations(approved, 2):
+            self.assertFalse(in_a < out_b and in_b < out_a, f"{(in_a, out_a)} overlaps {(in_b, out_b)}")
+        return approved
+
+    def test_concurrent_approvals_of_the_same_dates(self):
+        bookings = self.create_bookings([(0, 5)] * self.WORKERS)
+        with ThreadPoolExecutor(max_workers=self.WORKERS) as pool:
+            results = list(pool.map(self.approve_in_thread, [b.pk for b in bookings]))
+
+        approved = self.assert_no_overlaps()
+        self.assertLessEqual(results.count('approved'), 1)
+        self.assertEqual(len(approved), results.count('approved'))
+
+    def test_concurrent_approvals_of_staggered_dates(self):
+        # Every stay overlaps its neighbours; back-to-back stays do not clash
+        ranges = [(i * 2, i * 2 + 3) for i in range(self.WORKERS * 2)]
+        bookings = self.create_bookings(ranges)
+        with ThreadPoolExecutor(max_workers=self.WORKERS) as pool:
+            list(pool.map(self.approve_in_thread, [b.pk for b in bookings]))
+
+        self.assert_no_overlaps()
+
+    def test_back_to_back_stays_are_allowed(self):
+        first, second = self.create_bookings([(0, 5), (5, 9)])
+        approve_booking(first.pk)
+        approve_booking(second.pk)
+        self.assertEqual(len(self.assert_no_overlaps()), 2)
+
+    def test_overlapping_approval_is_rejected(self):
+        first, second = self.create_bookings([(0, 5), (4, 9)])
+        approve_booking(first.pk)
+        with self.assertRaises(BookingOverlapError):
+            approve_booking(second.pk)
+        second.refresh_from_db()
+        self.assertEqual(second.status, 'pending')
+
+    @unittest.skipUnless(connection.vendor in ('sqlite', 'postgresql'), 'overlap guard is vendor specific')
+    def test_database_guard_rejects_writes_that_bypass_the_service(self):
+        first, second = self.create_bookings([(0, 5), (2, 7)])
+        approve_booking(first.pk)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            BookingRequest.objects.filter(pk=second.pk).update(status='approved')
+        self.assert_no_overlaps()
+
+    def test_existing_overlaps_are_reported_before_installing_the_guard(self):
+        # Data from before the guard existed
+        uninstall_overlap_guard()
+        try:
+            first, second, _ = self.create_bookings([(0, 5), (2, 7), (7, 9)])
+            BookingRequest.objects.update(status='approved')
+            self.assertEqual(list(overlap_conflicts()), [(first.pk, second.pk, self.property.pk)])
+            if connection.vendor == 'postgresql':
+                with self.assertRaisesMessage(BookingOverlapError, f"#{first.pk} and #{second.pk}"):
+                    install_overlap_guard()
+        finally:
+            BookingRequest.objects.update(status='pending')
+            install_overlap_guard()
+
+
+class BookingTransitionTests(TestCase):
+    """Transitions are one conditional UPDATE with side effects fired once"""
+
+    def setUp(self):
+        self.landlord = User.objects.create_user(username='landlord', password='pass', role='landlord')
+        self.tenant = User.objects.create_user(username='tenant', password='pass', role='tenant')
+        prop = Property.objects.create(
+            owner=self.landlord, title='Garden flat', description='Two bedrooms',
+            property_type='apartment', price=25000, location='Kilimani, Nairobi',
+        )
+        self.booking = BookingRequest.objects.bulk_create([
+            BookingRequest(
+                tenant=self.tenant, rental_property=prop,
+                check_in_date=datetime.date(2025, 3, 1), check_out_date=datetime.date(2025, 3, 5),
+            )
+        ])[0]
+        self.booking = BookingRequest.objects.select_related('tenant', 'rental_property__owner').get(pk=self.booking.pk)
+
+    def test_transition_stamps_timestamp_and_notifies_once(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            transition_booking(self.booking, 'approved', 'Welcome')
+
+        stored = BookingRequest.objects.get(pk=self.booking.pk)
+        self.assertEqual(stored.status, 'approved')
+        self.assertEqual(stored.landlord_response, 'Welcome')
+        self.assertIsNotNone(stored.approved_at)
+        self.assertEqual(Notification.objects.filter(user=self.tenant, notification_type='booking').count(), 1)
+
+    def test_stale_transition_is_a_conflict(self):
+        stale = BookingRequest.objects.select_related('tenant', 'rental_property__owner').get(pk=self.booking.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            transition_booking(self.booking, 'declined')
+        with self.assertRaises(BookingConflict), self.captureOnCommitCallbacks(execute=True):
+            transition_booking(stale, 'approved')
+
+        self.assertEqual(BookingRequest.objects.get(pk=self.booking.pk).status, 'declined')
+        self.assertEqual(Notification.objects.filter(user=self.tenant).count(), 1)
+
+    def test_transition_is_a_single_update(self):
+        BookingRequest.objects.filter(pk=self.booking.pk).update(status='approved')
+        self.booking.status = 'approved'
+        with CaptureQueriesContext(connection) as queries:
+            transition_booking(self.booking, 'checked_in', notify=False)
+
+        # Savepoint bookkeeping and the queued side effects aside, a check-in is just the conditional UPDATE
+        statements = [q['sql'] for q in queries.captured_queries if 'SAVEPOINT' not in q['sql'].upper()]
+        self.assertEqual(len(statements), 1)
+        self.assertTrue(statements[0].upper().startswith('UPDATE'))
+
+
+class BookingCreateTests(TestCase):
+    """POST /bookings/ creates a pending request for the tenant and rejects taken dates"""
+
+    def setUp(self):
+        landlord = User.objects.create_user(username='landlord', password='pass', role='landlord')
+        self.tenant = User.objects.create_user(username='tenant', password='pass', role='tenant')
+        self.property = Property.objects.create(
+            owner=landlord, title='Garden flat', description='Two bedrooms',
+            property_type='apartment', price=25000, location='Kilimani, Nairobi',
+        )
+        BookingRequest.objects.create(
+            tenant=self.tenant, rental_property=self.property, status='approved',
+            check_in_date=datetime.date(2025, 3, 1), check_out_date=datetime.date(2025, 3, 5),
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.tenant)
+
+    def create(self, check_in, check_out):
+        return self.client.post(reverse('booking-list-create'), {
+            'rental_property': self.property.pk, 'message': 'Hello',
+            'check_in_date': check_in, 'check_out_date': check_out,
+        })
+
+    def test_free_dates_create_a_pending_booking(self):
+        response = self.create('2025-03-05', '2025-03-08')
+        self.assertEqual(response.status_code, 201, response.data)
+        booking = BookingRequest.objects.get(check_in_date=datetime.date(2025, 3, 5))
+        self.assertEqual((booking.tenant, booking.status), (self.tenant, 'pending'))
+
+    def test_create_queues_the_tenant_sms(self):
+        self.tenant.phone_number = '+254700000000'
+        response = self.create('2025-03-05', '2025-03-08')
+        self.assertEqual(response.status_code, 201, response.data)
+        sms = OutboxMessage.objects.get(channel='sms')
+        self.assertEqual(sms.payload['to'], '+254700000000')
+
+    def test_overlapping_dates_are_rejected(self):
+        response = self.create('2025-03-03', '2025-03-08')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('already booked', str(response.data))
+        self.assertEqual(BookingRequest.objects.count(), 1)
+
+
+class KeysetListTests(TestCase):
+    """?cursor= pages of the booking and notification lists cover every row once, ties included"""
+
+    def setUp(self):
+        self.landlord = User.objects.create_user(username='landlord', password='pass', role='landlord')
+        self.tenant = User.objects.create_user(username='tenant', password='pass', role='tenant')
+        prop = Property.objects.create(
+            owner=self.landlord, title='Garden flat', description='Two bedrooms',
+            property_type='apartment', price=25000, location='Kilimani, Nairobi',
+        )
+        BookingRequest.objects.bulk_create([
+            BookingRequest(tenant=self.tenant, rental_property=prop, message=f'request {i}') for i in range(7)
+        ])
+        Notification.objects.bulk_create([
+            Notification(user=self.tenant, title=f'Notice {i}', body='Body') for i in range(7)
+        ])
+        # Most rows share one created_at, so paging relies on the id tie-breaker
+        for model in (BookingRequest, Notification):
+            first = model.objects.order_by('id').first()
+            model.objects.exclude(pk=first.pk).update(created_at=first.created_at + datetime.timedelta(minutes=1))
+        self.client = APIClient()
+
+    def pages(self, user, name):
+        self.client.force_authenticate(user)
+        seen, url = [], reverse(name) + '?cursor=&page_size=3'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, response.data)
+            seen.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+        return seen
+
+    def test_booking_list_cursor_round_trip(self):
+        expected = list(BookingRequest.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(self.pages(self.tenant, 'booking-list-create'), expected)
+        self.assertEqual(self.pages(self.landlord, 'booking-list-create'), expected)
+
+    def test_notification_list_cursor_round_trip(self):
+        expected = list(
+            Notification.objects.filter(user=self.tenant).order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual(len(expected), 7)
+        self.assertEqual(self.pages(self.tenant, 'notification-list'), expected)
+
+    def test_booking_filters_follow_rental_property(self):
+        self.client.force_authenticate(self.tenant)
+        url = reverse('booking-list-create')
+        for params, expected in (
+            ({'property_title': 'garden'}, 7), ({'property_title': 'villa'}, 0),
+            ({'search': 'kilimani'}, 7), ({'ordering': 'rental_property__price'}, 7),
+        ):
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200, params)
+            self.assertEqual(response.data['count'], expected, params)
+
+    def test_landlord_can_open_a_booking(self):
+        booking = BookingRequest.objects.first()
+        self.client.force_authenticate(self.landlord)
+        response = self.client.get(reverse('booking-detail', args=[booking.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['property_title'], 'Garden flat')
+
+
+class BookingBulkActionTests(TestCase):
+    """One request approves many bookings and reports per-item results"""
+
+    def setUp(self):
+        self.landlord = User.objects.create_user(username='landlord', password='pass', role='landlord')
+        other_landlord = User.objects.create_user(username='other', password='pass', role='landlord')
+        self.tenants = User.objects.bulk_create([
+            User(username=f'tenant{i}', role='tenant', email=f'tenant{i}@example.com') for i in range(4)
+        ])
+        own, foreign = Property.objects.bulk_create([
+            Property(owner=owner, title=title, description='Flat', property_type='apartment',
+                     price=25000, location='Kilimani, Nairobi')
+            for owner, title in ((self.landlord, 'Own flat'), (other_landlord, 'Foreign flat'))
+        ])
+        day = datetime.date(2025, 3, 1)
+        self.bookings = BookingRequest.objects.bulk_create([
+            BookingRequest(tenant=self.tenants[0], rental_property=own,
+                           check_in_date=day, check_out_date=day + datetime.timedelta(days=3)),
+            BookingRequest(tenant=self.tenants[1], rental_property=own,
+                           check_in_date=day + datetime.timedelta(days=3), check_out_date=day + datetime.timedelta(days=6)),
+            BookingRequest(tenant=self.tenants[2], rental_property=own,
+                           check_in_date=day + datetime.timedelta(days=1), check_out_date=day + datetime.timedelta(days=4)),
+            BookingRequest(tenant=self.tenants[3], rental_property=foreign,
+                           check_in_date=day, check_out_date=day + datetime.timedelta(days=3)),
+        ])
+        self.client = APIClient()
+        self.client.force_authenticate(self.landlord)
+
+    def test_bulk_approve_reports_per_item_results(self):
+        ids = [booking.pk for booking in self.bookings]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('booking-bulk-action'), {'ids': ids + [ids[0]], 'action': 'approve'}, format='json'
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(item['id'], item['result']) for item in response.data['results']],
+            [(ids[0], 'ok'), (ids[1], 'ok'), (ids[2], 'overlap'), (ids[3], 'not_found')],
+        )
+        self.assertEqual(response.data['succeeded'], 2)
+        self.assertEqual(
+            list(BookingRequest.objects.order_by('pk').values_list('status', flat=True)),
+            ['approved', 'approved', 'pending', 'pending'],
+        )
+        # One notification and one queued email per applied transition, delivered by the worker
+        self.assertEqual(Notification.objects.filter(notification_type='booking').count(), 2)
+        self.assertEqual(OutboxMessage.objects.filter(channel='email').count(), 2)
+        self.assertEqual(len(mail.outbox), 0)
+        process_batch()
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_tenants_cannot_approve(self):
+        self.client.force_authenticate(self.tenants[0])
+        response = self.client.post(
+            reverse('booking-bulk-action'), {'ids': [self.bookings[0].pk], 'action': 'approve'}, format='json'
+        )
+        self.assertEqual(response.data['results'][0]['result'], 'not_found')
+        self.assertEqual(BookingRequest.objects.get(pk=self.bookings[0].pk).status, 'pending')
+
+
+class ConversationInboxTests(TestCase):
+    """The inbox is maintained on insert and matches a rebuild from scratch"""
+
+    def setUp(self):
+        self.alice, self.bob, self.carol = User.objects.bulk_create([
+            User(username=name, role='tenant') for name in ('alice', 'bob', 'carol')
+        ])
+        for sender, receiver, content in [
+            (self.bob, self.alice, 'hi alice'),
+            (self.alice, self.bob, 'hi bob'),
+            (self.carol, self.alice, 'is the flat free?'),
+            (self.bob, self.alice, 'are you there?'),
+        ]:
+            Message.objects.create(sender=sender, receiver=receiver, content=content)
+        self.client = APIClient()
+        self.client.force_authenticate(self.alice)
+
+    def inbox_state(self):
+        return sorted(
+            Conversation.objects.values_list('user_id', 'counterpart_id', 'last_message_id', 'unread_count')
+        )
+
+    def test_inbox_is_newest_first_with_unread_counts(self):
+        response = self.client.get(reverse('conversation-list'))
+
+        self.assertEqual(response.status_code, 200)
+        rows = [(row['counterpart_username'], row['unread_count']) for row in response.data['results']]
+        self.assertEqual(rows, [('bob', 2), ('carol', 1)])
+        self.assertEqual(response.data['results'][0]['last_message']['content'], 'are you there?')
+        self.assertIsNone(response.data['next'])
+
+    def test_mark_read_resets_counter(self):
+        conversation = Conversation.objects.get(user=self.alice, counterpart=self.bob)
+        response = self.client.post(reverse('conversation-read', args=[conversation.pk]))
+
+        self.assertEqual(response.data['marked_read'], 2)
+        conversation.refresh_from_db()
+        self.assertEqual(conversation.unread_count, 0)
+        self.assertFalse(Message.objects.filter(receiver=self.alice, sender=self.bob, is_read=False).exists())
+
+    def test_backfill_matches_incremental_maintenance(self):
+        incremental = self.inbox_state()
+        self.assertEqual(rebuild_conversations(batch_size=2), len(incremental))
+        self.assertEqual(self.inbox_state(), incremental)
+
+
+class MessageTimelineTests(TestCase):
+    """Cursor pages merged from the received/sent branches match the OR ordering"""
+
+    def setUp(self):
+        self.alice, self.bob, self.carol = User.objects.bulk_create([
+            User(username=name, role='tenant') for name in ('alice', 'bob', 'carol')
+        ])
+        pairs = [(self.bob, self.alice), (self.alice, self.bob), (self.carol, self.alice), (self.bob, self.carol)]
+        Message.objects.bulk_create([
+            Message(sender=sender, receiver=receiver, content=f'message {i}')
+            for i, (sender, receiver) in enumerate(pairs * 15)
+        ])
+        self.client = APIClient()
+        self.client.force_authenticate(self.alice)
+
+    def test_cursor_pages_cover_the_mailbox_in_order(self):
+        expected = list(
+            Message.objects.filter(Q(receiver=self.alice) | Q(sender=self.alice))
+            .order_by('-timestamp', '-id').values_list('id', flat=True)
+        )
+        seen, url = [], reverse('message-list-create') + '?cursor='
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+
+        self.assertEqual(len(expected), 45)
+        self.assertEqual(seen, expected)
+
+    def test_cursor_rejects_another_ordering(self):
+        response = self.client.get(reverse('message-list-create'), {'cursor': '', 'ordering': 'is_read'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('cursor', response.data)
+
+
+class UnreadCounterTests(TestCase):
+    """Unread counts come from the maintained counter, not a COUNT per read"""
+
+    def setUp(self):
+        # Cached counters would outlive the rolled-back rows of earlier tests
+        cache.clear()
+        self.user, self.friend = User.objects.bulk_create([
+            User(username=name, role='tenant') for name in ('user', 'friend')
+        ])
+        for i in range(3):
+            Notification.objects.create(user=self.user, title=f'n{i}', body='body')
+        # The message also notifies its receiver, so there are 4 unread notifications
+        Message.objects.create(sender=self.friend, receiver=self.user, content='hello')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_counts_follow_creates_and_reads(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(get_unread_counts(self.user.pk), {'notifications': 4, 'messages': 1})
+
+        notification = Notification.objects.filter(user=self.user).first()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(reverse('notification-detail', args=[notification.pk]), {'is_read': True}, format='json')
+            # Marking it read twice must not decrement twice
+            self.client.patch(reverse('notification-detail', args=[notification.pk]), {'is_read': True}, format='json')
+        self.assertEqual(get_unread_counts(self.user.pk)['notifications'], 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('notification-mark-all-read'))
+        self.assertEqual(response.data['updated_count'], 3)
+        self.assertEqual(get_unread_counts(self.user.pk)['notifications'], 0)
+
+    def test_stats_read_the_counter(self):
+        get_unread_counts(self.user.pk)
+        # Only the counter says 42; the notification rows still hold 4 unread
+        UnreadCounter.objects.filter(user=self.user).update(notifications=42)
+        cache.clear()
+
+        response = self.client.get(reverse('notification-stats'))
+        self.assertEqual(response.data['unread'], 42)
+        response = self.client.get(reverse('notification-stats'), {'since': timezone.now().isoformat()})
+        self.assertEqual(response.data['unread_total'], 42)
+
+    def test_stats_group_by_type_in_one_query(self):
+        Notification.objects.create(user=self.user, title='b', body='body', notification_type='booking', is_read=True)
+        # The unread total is served from the (cached) counter
+        get_unread_counts(self.user.pk)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('notification-stats'))
+        self.assertEqual(len(queries), 1)
+        self.assertEqual((response.data['total'], response.data['unread']), (5, 4))
+        self.assertEqual(response.data['by_type'], {'general': 3, 'message': 1, 'booking': 1})
+        self.assertEqual(response.data['unread_by_type'], {'general': 3, 'message': 1})
+
+        as_of = response.data['as_of']
+        with self.captureOnCommitCallbacks(execute=True):
+            Notification.objects.create(user=self.user, title='m', body='body', notification_type='message')
+        response = self.client.get(reverse('notification-stats'), {'since': as_of.isoformat()})
+        self.assertEqual(response.data['by_type'], {'message': 1})
+        self.assertEqual(response.data['unread_total'], 5)
+
+    def test_since_includes_notifications_coalesced_into_later(self):
+        as_of = timezone.now()
+        older = Notification.objects.filter(user=self.user, notification_type='general').first()
+        # A later event folded into an existing row keeps its created_at
+        Notification.objects.filter(pk=older.pk).update(count=2, updated_at=as_of + datetime.timedelta(seconds=1))
+
+        response = self.client.get(reverse('notification-stats'), {'since': as_of.isoformat()})
+        self.assertEqual(response.data['by_type'], {'general': 1})
+
+    def test_reconcile_repairs_drift(self):
+        UnreadCounter.objects.filter(user=self.user).update(notifications=42, messages=0)
+        self.assertEqual(reconcile_unread_counters(), 1)
+        self.assertEqual(get_unread_counts(self.user.pk), {'notifications': 4, 'messages': 1})
+
+
+class BookingStatsTests(TestCase):
+    """Dashboard stats cost one query, or one row read with the rollup"""
+
+    def setUp(self):
+        cache.clear()
+        self.landlord = User.objects.create_user(username='landlord', password='pass', role='landlord')
+        self.tenant = User.objects.create_user(username='tenant', password='pass', role='tenant')
+        self.properties = [
+            Property.objects.create(
+                owner=self.landlord, title=f'Flat {i}', description='Two bedrooms',
+                property_type='apartment', price=25000, location='Kilimani, Nairobi',
+            )
+            for i in range(2)
+        ]
+        for prop, booking_status in zip(self.properties * 2, ['pending', 'approved', 'declined', 'pending']):
+            BookingRequest.objects.create(tenant=self.tenant, rental_property=prop, status=booking_status)
+        self.client = APIClient()
+
+    def test_stats_are_one_query(self):
+        self.client.force_authenticate(self.landlord)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('booking-stats'))
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(response.data['total'], 4)
+        self.assertEqual(response.data['pending'], 2)
+        self.assertEqual(response.data['properties_with_bookings'], 2)
+        self.assertEqual(response.data['active_bookings'], 1)
+
+    def test_rollup_follows_transitions_and_deletes(self):
+        with self.settings(BOOKING_STATS_ROLLUP=True):
+            self.assertEqual(get_booking_stats(self.tenant)['pending'], 2)
+            booking = BookingRequest.objects.select_related('rental_property').filter(status='pending').first()
+            with self.captureOnCommitCallbacks(execute=True):
+                transition_booking(booking, 'cancelled', notify=False)
+            with self.captureOnCommitCallbacks(execute=True):
+                BookingRequest.objects.filter(status='declined').delete()
+
+            stats = get_booking_stats(self.tenant)
+            self.assertEqual((stats['total'], stats['pending'], stats['cancelled']), (3, 1, 1))
+            self.assertEqual(rebuild_booking_stats(), 2)
+            self.assertEqual(get_booking_stats(self.tenant), stats)
+
+    def test_rollup_rechecks_a_stale_source_status(self):
+        with self.settings(BOOKING_STATS_ROLLUP=True):
+            get_booking_stats(self.tenant)
+            stale = BookingRequest.objects.select_related('rental_property').filter(status='pending').first()
+            fresh = BookingRequest.objects.select_related('rental_property').get(pk=stale.pk)
+            with self.captureOnCommitCallbacks(execute=True):
+                transition_booking(fresh, 'approved', notify=False)
+            with self.captureOnCommitCallbacks(execute=True):
+                transition_booking(stale, 'cancelled', notify=False)
+
+            stats = get_booking_stats(self.tenant)
+            self.assertEqual((stats['pending'], stats['approved'], stats['cancelled']), (1, 1, 1))
+            rebuild_booking_stats()
+            self.assertEqual(get_booking_stats(self.tenant), stats)
+
+
+class OutboxTests(TestCase):
+    """Side effects are queued with their write and delivered with retries"""
+
+    def setUp(self):
+        self.landlord = User.objects.create_user(
+            username='landlord', password='pass', role='landlord', email='landlord@example.com'
+        )
+        self.tenant = User.objects.create_user(username='tenant', password='pass', role='tenant')
+        self.property = Property.objects.create(
+            owner=self.landlord, title='Garden flat', description='Two bedrooms',
+            property_type='apartment', price=25000, location='Kilimani, Nairobi',
+        )
+
+    def test_side_effects_commit_with_the_booking(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            BookingRequest.objects.create(tenant=self.tenant, rental_property=self.property)
+            raise RuntimeError
+        self.assertFalse(OutboxMessage.objects.exists())
+
+        BookingRequest.objects.create(tenant=self.tenant, rental_property=self.property)
+        self.assertEqual(len(mail.outbox), 0)
+        summary = process_batch()
+        self.assertEqual(summary['sent'], OutboxMessage.objects.count())
+        self.assertEqual(mail.outbox[0].to, ['landlord@example.com'])
+
+    def test_failures_back_off_then_dead_letter(self):
+        message = OutboxMessage.objects.create(channel='fax', payload={})
+        with self.settings(OUTBOX_MAX_ATTEMPTS=2):
+            self.assertEqual(process_batch(), {'sent': 0, 'retried': 1, 'dead': 0})
+            message.refresh_from_db()
+            self.assertGreater(message.available_at, timezone.now())
+            # Not due again until the backoff has passed
+            self.assertEqual(process_batch(), {'sent': 0, 'retried': 0, 'dead': 0})
+
+            OutboxMessage.objects.filter(pk=message.pk).update(available_at=timezone.now())
+            self.assertEqual(process_batch(), {'sent': 0, 'retried': 0, 'dead': 1})
+        self.assertEqual(OutboxMessage.objects.get(pk=message.pk).status, 'dead')
+        self.assertEqual(requeue_dead(), 1)
+
+
+class RealtimeFanoutTests(TestCase):
+    """Fan-out sends every event from one async context"""
+
+    def test_send_to_multiple_users_reaches_each_group(self):
+        layer = InMemoryChannelLayer()
+        manager = RealtimeNotificationManager()
+        manager.channel_layer = layer
+
+        async def subscribe():
+            for user_id in range(3):
+                await layer.group_add(f"user_{user_id}", f"test.{user_id}")
+
+        async_to_sync(subscribe)()
+        self.assertEqual(manager.send_to_multiple_users(range(3), 'notify', {'title': 'Hello'}), 3)
+        received = [async_to_sync(layer.receive)(f"test.{user_id}") for user_id in range(3)]
+        self.assertEqual([event['title'] for event in received], ['Hello'] * 3)
+
+
+class NotificationBroadcastTests(TestCase):
+    """Broadcasts bulk-insert per chunk and keep unread counters right"""
+
+    def setUp(self):
+        cache.clear()
+        self.landlords = User.objects.bulk_create([
+            User(username=f'landlord{i}', role='landlord') for i in range(3)
+        ])
+        self.admin = User.objects.create_user(username='admin', password='pass', role='admin')
+        for landlord, location in zip(self.landlords, ['Kilimani, Nairobi', 'Karen, Nairobi', 'Nyali, Mombasa']):
+            Property.objects.create(
+                owner=landlord, title='Flat', description='Two bedrooms',
+                property_type='apartment', price=25000, location=location,
+            )
+
+    def test_broadcast_reaches_the_audience_in_chunks(self):
+        # One recipient already has a counter row, the other is seeded on first read
+        get_unread_counts(self.landlords[0].pk)
+        audience = audience_queryset(role='landlord', city='nairobi')
+        progress = []
+        with self.captureOnCommitCallbacks(execute=True):
+            summary = broadcast_notification(
+                audience, 'Policy update', 'New terms', chunk_size=1,
+                progress=lambda done, total: progress.append((done, total)),
+            )
+
+        self.assertEqual(summary, {'recipients': 2, 'queued': 2})
+        self.assertEqual(progress, [(1, 2), (2, 2)])
+        # Realtime events wait in the outbox for the worker
+        self.assertEqual(
+            {row.payload['group'] for row in OutboxMessage.objects.filter(channel='realtime')},
+            {f'user_{landlord.pk}' for landlord in self.landlords[:2]},
+        )
+        self.assertEqual(
+            set(Notification.objects.filter(title='Policy update').values_list('user_id', flat=True)),
+            {self.landlords[0].pk, self.landlords[1].pk},
+        )
+        for landlord in self.landlords[:2]:
+            self.assertEqual(get_unread_counts(landlord.pk)['notifications'], 1)
+
+    def test_api_is_admin_only_and_supports_dry_run(self):
+        client = APIClient()
+        client.force_authenticate(self.landlords[0])
+        payload = {'title': 'Hi', 'body': 'All landlords', 'role': 'landlord', 'dry_run': True}
+        self.assertEqual(client.post(reverse('notification-broadcast'), payload, format='json').status_code, 403)
+
+        client.force_authenticate(self.admin)
+        response = client.post(reverse('notification-broadcast'), payload, format='json')
+        self.assertEqual(response.data, {'recipients': 3, 'dry_run': True})
+        self.assertFalse(Notification.objects.filter(title='Hi').exists())
+
+        response = client.post(reverse('notification-broadcast'), {**payload, 'data': [1, 2]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('data', response.data)
+
+
+@override_settings(NOTIFICATION_RETENTION_DAYS={'default': 30, 'booking': None})
+class NotificationRetentionTests(TestCase):
+    """Expired notifications leave the hot table in batches"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='user', password='pass', role='tenant')
+        for i in range(5):
+            Notification.objects.create(user=self.user, title=f'old {i}', body='body', is_read=i % 2 == 0)
+        Notification.objects.create(user=self.user, title='old booking', body='body', notification_type='booking')
+        Notification.objects.filter(user=self.user).update(created_at=timezone.now() - datetime.timedelta(days=60))
+        Notification.objects.create(user=self.user, title='fresh', body='body')
+
+    def test_archive_moves_expired_rows_and_fixes_unread(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(get_unread_counts(self.user.pk)['notifications'], 4)
+            removed = purge_expired(mode='archive', batch_size=2)
+
+        self.assertEqual(removed, {'general': 5})
+        self.assertEqual(
+            set(Notification.objects.values_list('title', flat=True)), {'old booking', 'fresh'}
+        )
+        self.assertEqual(ArchivedNotification.objects.count(), 5)
+        self.assertEqual(ArchivedNotification.objects.filter(is_read=False).count(), 2)
+        self.assertEqual(get_unread_counts(self.user.pk)['notifications'], 2)
+
+    def test_jsonl_mode_writes_compressed_lines(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.assertEqual(purge_expired(mode='jsonl', max_rows=3, archive_dir=directory), {'general': 3})
+            [path] = list(Path(directory).iterdir())
+            with gzip.open(path, 'rt') as handle:
+                titles = [json.loads(line)['title'] for line in handle]
+        self.assertEqual(titles, ['old 0', 'old 1', 'old 2'])
+        self.assertFalse(ArchivedNotification.objects.exists())
+        self.assertEqual(Notification.objects.count(), 4)
+
+
+class NotificationCoalescingTests(TestCase):
+    """A burst of favorites is one notification, one push and one digest line"""
+
+    def setUp(self):
+        cache.clear()
+        self.landlord = User.objects.create_user(
+            username='landlord', password='pass', role='landlord', email='landlord@example.com'
+        )
+        self.property = Property.objects.create(
+            owner=self.landlord, title='Garden flat', description='Two bedrooms',
+            property_type='apartment', price=25000, location='Kilimani, Nairobi',
+        )
+        self.tenants = User.objects.bulk_create([User(username=f'tenant{i}', role='tenant') for i in range(5)])
+
+    def favorite(self, tenants):
+        for tenant in tenants:
+            Favorite.objects.create(tenant=tenant, property=self.property)
+
+    def test_burst_folds_into_one_notification(self):
+        self.favorite(self.tenants)
+
+        notification = Notification.objects.get(user=self.landlord)
+        self.assertEqual(notification.count, 5)
+        self.assertEqual(notification.body, '5 people favorited Garden flat')
+        self.assertEqual(get_unread_counts(self.landlord.pk)['notifications'], 1)
+        # One push now; the follow-ups fell inside the interval and share one deferred push
+        immediate, trailing = OutboxMessage.objects.filter(channel='realtime').order_by('id')
+        self.assertEqual(immediate.payload['event']['body'], 'tenant0 added Garden flat to their favorites')
+        self.assertEqual(trailing.payload, {'group': f'user_{self.landlord.pk}', 'notification_id': notification.pk})
+        self.assertGreater(trailing.available_at, timezone.now())
+
+    def test_trailing_push_carries_the_final_count(self):
+        self.favorite(self.tenants)
+        layer = InMemoryChannelLayer()
+        async_to_sync(layer.group_add)(f'user_{self.landlord.pk}', 'test.landlord')
+
+        OutboxMessage.objects.update(available_at=timezone.now())
+        with mock.patch('interactions.outbox.get_channel_layer', return_value=layer):
+            self.assertEqual(process_batch()['sent'], 2)
+        bodies = [async_to_sync(layer.receive)('test.landlord')['body'] for _ in range(2)]
+        self.assertEqual(bodies, ['tenant0 added Garden flat to their favorites', '5 people favorited Garden flat'])
+
+    def test_digest_reports_only_new_activity(self):
+        self.favorite(self.tenants[:3])
+        self.assertEqual(queue_notification_digests(), 1)
+        self.assertEqual(queue_notification_digests(), 0)
+
+        self.favorite(self.tenants[3:])
+        self.assertEqual(queue_notification_digests(), 1)
+        [first, second] = OutboxMessage.objects.filter(channel='email').order_by('id')
+        self.assertIn('3 people favorited', first.payload['body'])
+        self.assertIn('5 people favorited', second.payload['body'])
@@ -0,0 +1,165 @@
+"""
+Per-user unread counters for notifications and messages
+
+``UnreadCounter`` holds one row per user, adjusted with atomic
+``UPDATE ... SET n = GREATEST(n + delta, 0)`` whenever a notification or
+message is created or read. A row is seeded from a COUNT the first time a
+user is touched. Reads go through the cache; writes drop the cached copy
+after commit so readers never see a value the database rolled back.
+``reconcile_unread_counters`` repairs any drift with two GROUP BY queries.
+"""
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Value
+from django.db.models.functions import Greatest
+
+from .models import Message, Notification, UnreadCounter
+
+CACHE_KEY = 'unread:{user_id}'
+# Bounds how long a read that raced a write can serve a stale value
+CACHE_TIMEOUT = 300
+
+
+def _source_counts(user_id):
+    return {
+        'notifications': Notification.objects.filter(user_id=user_id, is_read=False).count(),
+        'messages': Message.objects.filter(receiver_id=user_id, is_read=False).exclude(sender_id=user_id).count(),
+    }
+
+
+def _ensure_counter(user_id):
+    """Seed the row from the source tables; returns (counter, created)"""
+    try:
+        with transaction.atomic():
+            return UnreadCounter.objects.create(user_id=user_id, **_source_counts(user_id)), True
+    except IntegrityError:
+        # A concurrent writer seeded it first
+        return UnreadCounter.objects.get(user_id=user_id), False
+
+
+def _apply(user_ids, seed_missing=True, **deltas):
+    """One UPDATE adding ``deltas`` to each row; seeds missing rows from the source tables"""
+    expressions = {field: Greatest(F(field) + delta, Value(0)) for field, delta in deltas.items()}
+    queryset = UnreadCounter.objects.filter(user_id__in=user_ids)
+    if queryset.update(**expressions) == len(user_ids) or not seed_missing:
+        return
+    existing = set(queryset.values_list('user_id', flat=True))
+    for user_id in user_ids:
+        if user_id in existing:
+            continue
+        _, created = _ensure_counter(user_id)
+        if not created:
+            # The concurrent seed may predate this change, so apply it on top
+            UnreadCounter.objects.filter(user_id=user_id).update(**expressions)
+
+
+def invalidate_after_commit(user_ids):
+    keys = [CACHE_KEY.format(user_id=user_id) for user_id in user_ids]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def adjust_unread(user_id, notifications=0, messages=0):
+    """Atomically add the deltas to ``user_id``'s counters, never going below zero"""
+    if not notifications and not messages:
+        return
+    # A freshly seeded row counts the source rows, which already include this change
+    _apply([user_id], notifications=notifications, messages=messages)
+    invalidate_after_commit([user_id])
+
+
+def adjust_unread_many(deltas, field='notifications', seed_missing=True):
+    """
+    Apply ``{user_id: delta}`` to one counter, one UPDATE per distinct delta
+
+    With ``seed_missing=False`` users without a row are left alone; their
+    row is seeded from the source tables (already including this change)
+    the first time it is needed, which keeps mass writes to one UPDATE.
+    """
+    by_delta = {}
+    for user_id, delta in deltas.items():
+        if delta:
+            by_delta.setdefault(delta, []).append(user_id)
+    for delta, user_ids in by_delta.items():
+        _apply(user_ids, seed_missing=seed_missing, **{field: delta})
+    invalidate_after_commit([user_id for user_ids in by_delta.values() for user_id in user_ids])
+
+
+def get_unread_counts(user_id):
+    """``{'notifications': n, 'messages': m}`` for ``user_id``, served from the cache when possible"""
+    key = CACHE_KEY.format(user_id=user_id)
+    counts = cache.get(key)
+    if counts is None:
+        row = UnreadCounter.objects.filter(user_id=user_id).values('notifications', 'messages').first()
+        if row is None:
+            counter, _ = _ensure_counter(user_id)
+            row = {'notifications': counter.notifications, 'messages': counter.messages}
+        counts = row
+        cache.set(key, counts, CACHE_TIMEOUT)
+    return counts
+
+
+def get_unread_notification_count(user_id):
+    return get_unread_counts(user_id)['notifications']
+
+
+def mark_notifications_read(user_id, notification_ids=None):
+    """Mark the user's (given or all) unread notifications read; returns how many flipped"""
+    with transaction.atomic():
+        queryset = Notification.objects.filter(user_id=user_id, is_read=False)
+        if notification_ids is not None:
+            queryset = queryset.filter(pk__in=notification_ids)
+        marked = queryset.update(is_read=True)
+        adjust_unread(user_id, notifications=-marked)
+    return marked
+
+
+def set_notification_read(notification, is_read):
+    """Set one notification's read flag, adjusting the counter only if it changed"""
+    with transaction.atomic():
+        changed = Notification.objects.filter(pk=notification.pk, is_read=not is_read).update(is_read=is_read)
+        if changed:
+            adjust_unread(notification.user_id, notifications=-1 if is_read else 1)
+    notification.is_read = is_read
+    return bool(changed)
+
+
+def reconcile_unread_counters(batch_size=1000, stdout=None):
+    """Recompute every counter from the source tables; returns how many rows were repaired"""
+    notifications = dict(
+        Notification.objects.filter(is_read=False).values('user_id')
+        .annotate(n=Count('id')).order_by().values_list('user_id', 'n')
+    )
+    messages = dict(
+        Message.objects.filter(is_read=False).exclude(sender_id=F('receiver_id')).values('receiver_id')
+        .annotate(n=Count('id')).order_by().values_list('receiver_id', 'n')
+    )
+
+    repaired = 0
+    last_id = 0
+    while True:
+        rows = list(
+            UnreadCounter.objects.filter(user_id__gt=last_id).order_by('user_id')
+            .values_list('user_id', 'notifications', 'messages')[:batch_size]
+        )
+        if not rows:
+            break
+        drifted = []
+        for user_id, stored_notifications, stored_messages in rows:
+            expected = (notifications.pop(user_id, 0), messages.pop(user_id, 0))
+            if expected != (stored_notifications, stored_messages):
+                drifted.append(user_id)
+                UnreadCounter.objects.filter(user_id=user_id).update(
+                    notifications=expected[0], messages=expected[1]
+                )
+        if drifted:
+            repaired += len(drifted)
+            cache.delete_many([CACHE_KEY.format(user_id=user_id) for user_id in drifted])
+        last_id = rows[-1][0]
+        if stdout:
+            stdout.write(f"  checked up to user {last_id}, repaired {repaired}", ending='\r')
+
+    # Users with unread items but no row yet are seeded lazily on first use
+    if stdout:
+        stdout.write('')
+    return repaired
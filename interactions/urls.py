@@ -1,16 +1,20 @@
 from django.urls import path
 from .views import (
-    MessageListCreateView, MessageDetailView, BookingRequestListCreateView, 
+    MessageListCreateView, MessageDetailView, ConversationListView, ConversationReadView,
+    BookingRequestListCreateView, 
     BookingRequestDetailView, BookingRequestApprovalView, BookingRequestCheckInView,
     BookingRequestCompleteView, BookingRequestCancelView, BookingRequestStatsView,
+    BookingBulkActionView,
     ReviewListCreateView, FavoriteListCreateView, 
     NotificationListView, NotificationDetailView, NotificationMarkAllReadView, 
-    NotificationStatsView, MaintenanceRequestListCreateView
+    NotificationStatsView, NotificationBroadcastView, MaintenanceRequestListCreateView
 )
 
 urlpatterns = [
     path('messages/', MessageListCreateView.as_view(), name='message-list-create'),
     path('messages/<int:pk>/', MessageDetailView.as_view(), name='message-detail'),
+    path('conversations/', ConversationListView.as_view(), name='conversation-list'),
+    path('conversations/<int:pk>/read/', ConversationReadView.as_view(), name='conversation-read'),
     path('bookings/', BookingRequestListCreateView.as_view(), name='booking-list-create'),
     path('bookings/<int:pk>/', BookingRequestDetailView.as_view(), name='booking-detail'),
     path('bookings/<int:pk>/approve/', BookingRequestApprovalView.as_view(), name='booking-approve'),
@@ -18,11 +22,13 @@ urlpatterns = [
     path('bookings/<int:pk>/complete/', BookingRequestCompleteView.as_view(), name='booking-complete'),
     path('bookings/<int:pk>/cancel/', BookingRequestCancelView.as_view(), name='booking-cancel'),
     path('bookings/stats/', BookingRequestStatsView.as_view(), name='booking-stats'),
+    path('bookings/bulk/', BookingBulkActionView.as_view(), name='booking-bulk-action'),
     path('reviews/', ReviewListCreateView.as_view(), name='review-list-create'),
     path('favorites/', FavoriteListCreateView.as_view(), name='favorite-list-create'),
     path('notifications/', NotificationListView.as_view(), name='notification-list'),
     path('notifications/<int:pk>/', NotificationDetailView.as_view(), name='notification-detail'),
     path('notifications/mark-all-read/', NotificationMarkAllReadView.as_view(), name='notification-mark-all-read'),
     path('notifications/stats/', NotificationStatsView.as_view(), name='notification-stats'),
+    path('notifications/broadcast/', NotificationBroadcastView.as_view(), name='notification-broadcast'),
     path('maintenance/', MaintenanceRequestListCreateView.as_view(), name='maintenance-list-create'),
 ]
@@ -1,11 +1,34 @@
 from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
 from django.core.serializers.json import DjangoJSONEncoder
+import asyncio
 import json
 import logging
 
 logger = logging.getLogger(__name__)
 
+def notification_payload(title, body, notification_type='general', data=None, notification_id=None):
+    """Channel-layer event for one notification (handled by the consumer's ``notify``)"""
+    payload = {
+        "type": "notify",
+        "title": title,
+        "body": body,
+        "notification_type": notification_type,
+        "timestamp": json.dumps({"timestamp": "now"}, cls=DjangoJSONEncoder),
+        "data": data or {}
+    }
+    
+    if notification_id:
+        payload["notification_id"] = notification_id
+    return payload
+
+def stored_notification_payload(notification):
+    """``notification_payload`` for a saved Notification row"""
+    return notification_payload(
+        notification.title, notification.body, notification.notification_type,
+        notification.data, notification.id
+    )
+
 def send_notification_to_user(user_id, title, body, notification_type='general', data=None, notification_id=None):
     """
     Send real-time notification to a specific user via WebSocket
@@ -24,17 +47,7 @@ def send_notification_to_user(user_id, title, body, notification_type='general',
             logger.warning("Channel layer not configured - real-time notifications disabled")
             return
             
-        payload = {
-            "type": "notify",
-            "title": title,
-            "body": body,
-            "notification_type": notification_type,
-            "timestamp": json.dumps({"timestamp": "now"}, cls=DjangoJSONEncoder),
-            "data": data or {}
-        }
-        
-        if notification_id:
-            payload["notification_id"] = notification_id
+        payload = notification_payload(title, body, notification_type, data, notification_id)
         
         async_to_sync(channel_layer.group_send)(
             f"user_{user_id}",
@@ -46,44 +59,96 @@ def send_notification_to_user(user_id, title, body, notification_type='general',
     except Exception as e:
         logger.error(f"Failed to send notification to user {user_id}: {str(e)}")
 
-def send_chat_message_to_participants(message_instance):
+# Upper bound on channel-layer sends in flight at once during a fan-out
+FANOUT_CONCURRENCY = 500
+
+async def group_send_many(channel_layer, messages, concurrency=FANOUT_CONCURRENCY):
     """
-    Send real-time chat message to all participants
+    Send (group_name, payload) pairs concurrently from one event loop
+    
+    Returns one result per message: None on success, else the exception.
+    With channels_redis the concurrent sends share its connection pool, so
+    their commands overlap on the wire instead of paying one round trip each.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def send(group, payload):
+        async with semaphore:
+            await channel_layer.group_send(group, payload)
+    
+    return await asyncio.gather(*(send(group, payload) for group, payload in messages), return_exceptions=True)
+
+def send_group_messages(messages, channel_layer=None):
+    """
+    Send many channel-layer events in one event-loop round trip
     
     Args:
-        message_instance: Message model instance
+        messages: Iterable of (group_name, payload) pairs
+        channel_layer: Layer to use (defaults to the configured one)
+    
+    Returns the number of events sent.
     """
+    messages = list(messages)
+    if not messages:
+        return 0
     try:
-        channel_layer = get_channel_layer()
+        channel_layer = channel_layer or get_channel_layer()
         if not channel_layer:
-            logger.warning("Channel layer not configured - real-time chat disabled")
-            return
-            
-        # Determine participants
-        participants = [message_instance.sender.id, message_instance.recipient.id]
-        
-        payload = {
-            "type": "chat_message",
-            "message_id": message_instance.id,
-            "sender_id": message_instance.sender.id,
-            "sender_name": message_instance.sender.username,
-            "recipient_id": message_instance.recipient.id,
-            "content": message_instance.content,
-            "timestamp": json.dumps({"timestamp": message_instance.created_at}, cls=DjangoJSONEncoder),
-            "property_id": message_instance.property.id if message_instance.property else None
-        }
+            logger.warning("Channel layer not configured - real-time notifications disabled")
+            return 0
         
-        # Send to both participants
-        for participant_id in participants:
-            async_to_sync(channel_layer.group_send)(
-                f"user_{participant_id}",
-                payload
-            )
-            
-        logger.info(f"Sent chat message {message_instance.id} to participants: {participants}")
+        results = async_to_sync(group_send_many)(channel_layer, messages)
+        sent = 0
+        for (group, _), result in zip(messages, results):
+            if isinstance(result, Exception):
+                logger.error(f"Failed to send to {group}: {str(result)}")
+            else:
+                sent += 1
+        logger.info(f"Sent {sent}/{len(messages)} realtime events")
+        return sent
         
     except Exception as e:
-        logger.error(f"Failed to send chat message {message_instance.id}: {str(e)}")
+        logger.error(f"Failed to send {len(messages)} realtime events: {str(e)}")
+        return 0
+
+def chat_message_messages(message_instance):
+    """(group, payload) pairs delivering a chat message to its sender and receiver"""
+    payload = {
+        "type": "chat_message",
+        "message_id": message_instance.id,
+        "sender_id": message_instance.sender_id,
+        "sender_name": message_instance.sender.username,
+        "recipient_id": message_instance.receiver_id,
+        "content": message_instance.content,
+        "timestamp": json.dumps({"timestamp": message_instance.timestamp}, cls=DjangoJSONEncoder),
+    }
+    participants = {message_instance.sender_id, message_instance.receiver_id}
+    return [(f"user_{participant_id}", payload) for participant_id in participants]
+
+def send_chat_message_to_participants(message_instance):
+    """
+    Send real-time chat message to all participants
+    
+    Args:
+        message_instance: Message model instance
+    """
+    send_group_messages(chat_message_messages(message_instance))
+
+def booking_update_messages(booking_instance, action):
+    """(group, payload) pairs announcing a booking update to its tenant and landlord"""
+    landlord = booking_instance.rental_property.owner
+    payload = {
+        "type": "booking_update",
+        "booking_id": booking_instance.id,
+        "action": action,
+        "status": booking_instance.status,
+        "property_id": booking_instance.rental_property.id,
+        "property_title": booking_instance.rental_property.title,
+        "tenant_id": booking_instance.tenant.id,
+        "landlord_id": landlord.id,
+        "timestamp": json.dumps({"timestamp": "now"}, cls=DjangoJSONEncoder)
+    }
+    return [(f"user_{participant_id}", payload) for participant_id in (booking_instance.tenant.id, landlord.id)]
 
 def broadcast_booking_update(booking_instance, action):
     """
@@ -93,41 +158,13 @@ def broadcast_booking_update(booking_instance, action):
         booking_instance: BookingRequest model instance
         action: The action performed (created, approved, declined, etc.)
     """
-    try:
-        channel_layer = get_channel_layer()
-        if not channel_layer:
-            return
-            
-        payload = {
-            "type": "booking_update",
-            "booking_id": booking_instance.id,
-            "action": action,
-            "status": booking_instance.status,
-            "property_id": booking_instance.property.id,
-            "property_title": booking_instance.property.title,
-            "tenant_id": booking_instance.tenant.id,
-            "landlord_id": booking_instance.property.owner.id,
-            "timestamp": json.dumps({"timestamp": "now"}, cls=DjangoJSONEncoder)
-        }
-        
-        # Send to tenant and landlord
-        participants = [booking_instance.tenant.id, booking_instance.property.owner.id]
-        for participant_id in participants:
-            async_to_sync(channel_layer.group_send)(
-                f"user_{participant_id}",
-                payload
-            )
-            
-        logger.info(f"Broadcast booking update {booking_instance.id} action '{action}' to participants: {participants}")
-        
-    except Exception as e:
-        logger.error(f"Failed to broadcast booking update {booking_instance.id}: {str(e)}")
+    send_group_messages(booking_update_messages(booking_instance, action))
 
 def get_user_unread_count(user_id):
     """Get unread notification count for a user"""
-    from .models import Notification
+    from .unread import get_unread_notification_count
     try:
-        return Notification.objects.filter(user_id=user_id, is_read=False).count()
+        return get_unread_notification_count(user_id)
     except Exception as e:
         logger.error(f"Failed to get unread count for user {user_id}: {str(e)}")
         return 0
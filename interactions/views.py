@@ -1,10 +1,11 @@
 from rest_framework import generics, permissions
 from rest_framework_simplejwt.authentication import JWTAuthentication
-from .models import Message, BookingRequest, Review, Favorite, Notification, MaintenanceRequest
+from .models import Message, Conversation, BookingRequest, Review, Favorite, Notification, MaintenanceRequest
 from .serializers import (
-    MessageSerializer, BookingRequestSerializer, BookingRequestCreateSerializer, 
-    BookingRequestUpdateSerializer, ReviewSerializer, FavoriteSerializer, 
-    NotificationSerializer, NotificationListSerializer, MaintenanceRequestSerializer
+    MessageSerializer, ConversationSerializer, BookingRequestSerializer, BookingRequestCreateSerializer, 
+    BookingRequestUpdateSerializer, BookingBulkActionSerializer, ReviewSerializer, FavoriteSerializer, 
+    NotificationSerializer, NotificationListSerializer, NotificationBroadcastSerializer,
+    MaintenanceRequestSerializer
 )
 from .filters import (
     MessageFilter, BookingRequestFilter, ReviewFilter, FavoriteFilter,
@@ -17,24 +18,28 @@ from users.permissions import (
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import status
-from utils.sms_utils import send_sms
-
-class BookingRequestCreateView(generics.CreateAPIView):
-    permission_classes = [permissions.IsAuthenticated]
-    serializer_class = BookingRequestSerializer
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from smarthunt.pagination import ConversationPagination, KeysetPagination, MessageTimelinePagination
+from rest_framework.exceptions import ValidationError
+from .booking_stats import get_booking_stats
+from .broadcasts import BROADCAST_API_MAX_RECIPIENTS, audience_queryset, broadcast_notification
+from .conversations import mark_conversation_read
+from .notification_stats import notification_stats
+from .outbox import enqueue_sms
+from .unread import mark_notifications_read, set_notification_read
+from .bookings import (
+    ACTIONS, BookingConflict, BookingOverlapError, bulk_transition_bookings, transition_booking
+)
 
-    def perform_create(self, serializer):
-        booking_request = serializer.save()
-        # Send SMS to user
-        phone_number = booking_request.user.phone_number
-        message = f"Your booking request for {booking_request.property.title} has been received."
-        send_sms(phone_number, message)
-        return Response(serializer.data)
 # ------------------- MESSAGES -------------------
 class MessageListCreateView(generics.ListCreateAPIView):
     serializer_class = MessageSerializer
     authentication_classes = [JWTAuthentication]
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = MessageTimelinePagination
     filterset_class = MessageFilter
     search_fields = ['content', 'sender__username', 'receiver__username']
     ordering_fields = ['timestamp', 'is_read']
@@ -43,10 +48,43 @@ class MessageListCreateView(generics.ListCreateAPIView):
     def get_queryset(self):
         user = self.request.user
         # Users can only see messages they sent or received
-        return Message.objects.filter(receiver=user) | Message.objects.filter(sender=user)
+        return Message.objects.filter(Q(receiver=user) | Q(sender=user)).select_related('sender', 'receiver')
+
+    def get_keyset_branches(self, queryset):
+        # Each branch is served by its own (receiver|sender, timestamp) index
+        user = self.request.user
+        return [
+            queryset.filter(receiver=user),
+            queryset.filter(sender=user).exclude(receiver=user),
+        ]
 
     def perform_create(self, serializer):
-        serializer.save(sender=self.request.user)
+        with transaction.atomic():
+            serializer.save(sender=self.request.user)
+
+class ConversationListView(generics.ListAPIView):
+    """Inbox: one row per counterpart, newest activity first, cursor paginated"""
+    serializer_class = ConversationSerializer
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = ConversationPagination
+    
+    def get_queryset(self):
+        return Conversation.objects.filter(user=self.request.user).select_related('counterpart', 'last_message')
+
+class ConversationReadView(generics.GenericAPIView):
+    """Mark a conversation's incoming messages as read"""
+    serializer_class = ConversationSerializer
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get_queryset(self):
+        return Conversation.objects.filter(user=self.request.user)
+    
+    def post(self, request, *args, **kwargs):
+        conversation = self.get_object()
+        marked = mark_conversation_read(conversation)
+        return Response({'id': conversation.pk, 'marked_read': marked, 'unread_count': 0})
 
 class MessageDetailView(generics.RetrieveAPIView):
     serializer_class = MessageSerializer
@@ -59,9 +97,10 @@ class MessageDetailView(generics.RetrieveAPIView):
 class BookingRequestListCreateView(generics.ListCreateAPIView):
     authentication_classes = [JWTAuthentication]
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
     filterset_class = BookingRequestFilter
-    search_fields = ['property__title', 'property__location', 'tenant__username', 'message']
-    ordering_fields = ['created_at', 'status', 'property__price', 'check_in_date']
+    search_fields = ['rental_property__title', 'rental_property__location', 'tenant__username', 'message']
+    ordering_fields = ['created_at', 'status', 'rental_property__price', 'check_in_date']
     ordering = ['-created_at']
 
     def get_serializer_class(self):
@@ -72,18 +111,25 @@ class BookingRequestListCreateView(generics.ListCreateAPIView):
     def get_queryset(self):
         user = self.request.user
         if user.role == 'admin':
-            return BookingRequest.objects.select_related('tenant', 'property', 'property__owner').all()
+            return BookingRequest.objects.select_related('tenant', 'rental_property__owner').all()
         elif user.role == 'landlord':
-            return BookingRequest.objects.select_related('tenant', 'property').filter(property__owner=user)
+            return BookingRequest.objects.select_related('tenant', 'rental_property__owner').filter(rental_property__owner=user)
         elif user.role == 'tenant':
-            return BookingRequest.objects.select_related('property', 'property__owner').filter(tenant=user)
+            return BookingRequest.objects.select_related('tenant', 'rental_property__owner').filter(tenant=user)
         return BookingRequest.objects.none()
 
     def perform_create(self, serializer):
         # Only tenants can create booking requests
         if self.request.user.role != 'tenant':
             raise permissions.PermissionDenied("Only tenants can create booking requests")
-        serializer.save(tenant=self.request.user)
+        # The booking, its notification and the queued SMS commit together
+        with transaction.atomic():
+            booking_request = serializer.save(tenant=self.request.user)
+            # Queue SMS to the tenant (User has no phone field yet, so this is opt-in)
+            phone_number = getattr(booking_request.tenant, 'phone_number', None)
+            if phone_number:
+                message = f"Your booking request for {booking_request.rental_property.title} has been received."
+                enqueue_sms(phone_number, message)
 
 class BookingRequestDetailView(generics.RetrieveAPIView):
     serializer_class = BookingRequestSerializer
@@ -91,121 +137,137 @@ class BookingRequestDetailView(generics.RetrieveAPIView):
     permission_classes = [permissions.IsAuthenticated, IsTenantOrLandlordOfProperty]
     
     def get_queryset(self):
-        return BookingRequest.objects.select_related('tenant', 'property', 'property__owner').all()
+        return BookingRequest.objects.select_related('tenant', 'rental_property__owner').all()
 
-class BookingRequestApprovalView(generics.UpdateAPIView):
-    """Dedicated endpoint for landlord approval/decline of booking requests"""
+class BookingTransitionView(generics.GenericAPIView):
+    """
+    Base for the booking status endpoints: one permission-scoped lookup, then
+    a single conditional UPDATE (see interactions.bookings.transition_booking)
+    """
     serializer_class = BookingRequestUpdateSerializer
     authentication_classes = [JWTAuthentication]
     permission_classes = [permissions.IsAuthenticated]
+    target_status = None
+    
+    def get_target_status(self, request):
+        return self.target_status
+    
+    def get_landlord_response(self, request):
+        return None
+    
+    def get_queryset(self):
+        return BookingRequest.objects.none()
+    
+    def update(self, request, *args, **kwargs):
+        booking = self.get_object()
+        target_status = self.get_target_status(request)
+        try:
+            transition_booking(booking, target_status, self.get_landlord_response(request))
+        except BookingOverlapError:
+            raise BookingConflict("These dates overlap another approved booking for this property.")
+        return Response(self.get_serializer(booking).data)
+    
+    def put(self, request, *args, **kwargs):
+        return self.update(request, *args, **kwargs)
+    
+    def patch(self, request, *args, **kwargs):
+        return self.update(request, *args, **kwargs)
+
+class BookingRequestApprovalView(BookingTransitionView):
+    """Dedicated endpoint for landlord approval/decline of booking requests"""
     
     def get_queryset(self):
         # Only landlords can access their property bookings
+        queryset = BookingRequest.objects.select_related('tenant', 'rental_property__owner')
         if self.request.user.role == 'landlord':
-            return BookingRequest.objects.filter(property__owner=self.request.user)
+            return queryset.filter(rental_property__owner=self.request.user)
         elif self.request.user.role == 'admin':
-            return BookingRequest.objects.all()
+            return queryset
         return BookingRequest.objects.none()
     
-    def perform_update(self, serializer):
-        booking = self.get_object()
-        
-        # Validate that only pending bookings can be approved/declined
-        if booking.status != 'pending':
-            raise permissions.PermissionDenied(
-                f"Cannot modify booking with status '{booking.status}'. Only pending bookings can be approved or declined."
-            )
-        
+    def get_target_status(self, request):
         # Only allow approved/declined status changes
-        new_status = serializer.validated_data.get('status')
+        new_status = request.data.get('status')
         if new_status not in ['approved', 'declined']:
-            raise permissions.PermissionDenied(
-                "This endpoint only allows approving or declining booking requests."
-            )
-        
-        serializer.save()
+            raise ValidationError({'status': "This endpoint only allows approving or declining booking requests."})
+        return new_status
+    
+    def get_landlord_response(self, request):
+        return request.data.get('landlord_response')
 
-class BookingRequestCheckInView(generics.UpdateAPIView):
+class BookingRequestCheckInView(BookingTransitionView):
     """Endpoint for tenant check-in"""
-    serializer_class = BookingRequestUpdateSerializer
-    authentication_classes = [JWTAuthentication]
-    permission_classes = [permissions.IsAuthenticated]
+    target_status = 'checked_in'
     
     def get_queryset(self):
         # Only tenants can check in to their own bookings
+        queryset = BookingRequest.objects.select_related('tenant', 'rental_property__owner')
         if self.request.user.role == 'tenant':
-            return BookingRequest.objects.filter(tenant=self.request.user)
+            return queryset.filter(tenant=self.request.user)
         elif self.request.user.role == 'admin':
-            return BookingRequest.objects.all()
+            return queryset
         return BookingRequest.objects.none()
-    
-    def perform_update(self, serializer):
-        booking = self.get_object()
-        
-        # Validate that only approved bookings can be checked in
-        if booking.status != 'approved':
-            raise permissions.PermissionDenied(
-                f"Cannot check in to booking with status '{booking.status}'. Only approved bookings can be checked in."
-            )
-        
-        # Force status to checked_in
-        serializer.save(status='checked_in')
 
-class BookingRequestCompleteView(generics.UpdateAPIView):
-    """Endpoint for completing bookings"""
-    serializer_class = BookingRequestUpdateSerializer
-    authentication_classes = [JWTAuthentication]
-    permission_classes = [permissions.IsAuthenticated]
+class BookingParticipantTransitionView(BookingTransitionView):
+    """Base for transitions open to the booking's tenant, its landlord or an admin"""
     
     def get_queryset(self):
-        # Both tenants and landlords can complete bookings
+        # Both tenants and landlords can act on their bookings
+        queryset = BookingRequest.objects.select_related('tenant', 'rental_property__owner')
         if self.request.user.role == 'tenant':
-            return BookingRequest.objects.filter(tenant=self.request.user)
+            return queryset.filter(tenant=self.request.user)
         elif self.request.user.role == 'landlord':
-            return BookingRequest.objects.filter(property__owner=self.request.user)
+            return queryset.filter(rental_property__owner=self.request.user)
         elif self.request.user.role == 'admin':
-            return BookingRequest.objects.all()
+            return queryset
         return BookingRequest.objects.none()
-    
-    def perform_update(self, serializer):
-        booking = self.get_object()
-        
-        # Validate that only checked-in bookings can be completed
-        if booking.status != 'checked_in':
-            raise permissions.PermissionDenied(
-                f"Cannot complete booking with status '{booking.status}'. Only checked-in bookings can be completed."
-            )
-        
-        # Force status to completed
-        serializer.save(status='completed')
 
-class BookingRequestCancelView(generics.UpdateAPIView):
+class BookingRequestCompleteView(BookingParticipantTransitionView):
+    """Endpoint for completing bookings"""
+    target_status = 'completed'
+
+class BookingRequestCancelView(BookingParticipantTransitionView):
     """Endpoint for cancelling bookings"""
-    serializer_class = BookingRequestUpdateSerializer
+    target_status = 'cancelled'
+
+class BookingBulkActionView(generics.GenericAPIView):
+    """Apply one action to many booking requests in a single transaction"""
+    serializer_class = BookingBulkActionSerializer
     authentication_classes = [JWTAuthentication]
     permission_classes = [permissions.IsAuthenticated]
     
-    def get_queryset(self):
-        # Both tenants and landlords can cancel bookings
-        if self.request.user.role == 'tenant':
-            return BookingRequest.objects.filter(tenant=self.request.user)
-        elif self.request.user.role == 'landlord':
-            return BookingRequest.objects.filter(property__owner=self.request.user)
-        elif self.request.user.role == 'admin':
+    def get_queryset(self, action=None):
+        # Same audiences as the single-booking endpoints
+        user = self.request.user
+        if user.role == 'admin':
             return BookingRequest.objects.all()
+        elif user.role == 'landlord' and action != 'check_in':
+            return BookingRequest.objects.filter(rental_property__owner=user)
+        elif user.role == 'tenant' and action in ['check_in', 'complete', 'cancel']:
+            return BookingRequest.objects.filter(tenant=user)
         return BookingRequest.objects.none()
     
-    def perform_update(self, serializer):
-        booking = self.get_object()
-        
-        # Validate that only active bookings can be cancelled
-        if booking.status in ['completed', 'declined', 'cancelled']:
-            raise permissions.PermissionDenied(
-                f"Cannot cancel booking with status '{booking.status}'."
-            )
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        action = serializer.validated_data['action']
+        landlord_response = serializer.validated_data.get('landlord_response')
+        if action not in ['approve', 'decline']:
+            landlord_response = None
         
-        # Force status to cancelled
-        serializer.save(status='cancelled')
+        results = bulk_transition_bookings(
+            self.get_queryset(action),
+            serializer.validated_data['ids'],
+            ACTIONS[action],
+            landlord_response,
+        )
+        succeeded = sum(1 for item in results if item['result'] == 'ok')
+        return Response({
+            'action': action,
+            'succeeded': succeeded,
+            'failed': len(results) - succeeded,
+            'results': results,
+        })
 
 class BookingRequestStatsView(generics.GenericAPIView):
     """Get booking statistics for the current user"""
@@ -213,36 +275,7 @@ class BookingRequestStatsView(generics.GenericAPIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get(self, request):
-        user = request.user
-        
-        if user.role == 'tenant':
-            bookings = BookingRequest.objects.filter(tenant=user)
-        elif user.role == 'landlord':
-            bookings = BookingRequest.objects.filter(property__owner=user)
-        elif user.role == 'admin':
-            bookings = BookingRequest.objects.all()
-        else:
-            bookings = BookingRequest.objects.none()
-        
-        stats = {
-            'total': bookings.count(),
-            'pending': bookings.filter(status='pending').count(),
-            'approved': bookings.filter(status='approved').count(),
-            'declined': bookings.filter(status='declined').count(),
-            'checked_in': bookings.filter(status='checked_in').count(),
-            'completed': bookings.filter(status='completed').count(),
-            'cancelled': bookings.filter(status='cancelled').count(),
-        }
-        
-        # Add role-specific stats
-        if user.role == 'landlord':
-            stats['properties_with_bookings'] = bookings.values('property').distinct().count()
-            stats['active_bookings'] = bookings.filter(status__in=['approved', 'checked_in']).count()
-        elif user.role == 'tenant':
-            stats['properties_booked'] = bookings.values('property').distinct().count()
-            stats['active_bookings'] = bookings.filter(status__in=['approved', 'checked_in']).count()
-        
-        return Response(stats)
+        return Response(get_booking_stats(request.user))
 
 
 # ------------------- REVIEWS -------------------
@@ -255,7 +288,8 @@ class ReviewListCreateView(generics.ListCreateAPIView):
         return Review.objects.all()
 
     def perform_create(self, serializer):
-        serializer.save(tenant=self.request.user)
+        with transaction.atomic():
+            serializer.save(tenant=self.request.user)
 
 
 # ------------------- FAVORITES -------------------
@@ -268,7 +302,8 @@ class FavoriteListCreateView(generics.ListCreateAPIView):
         return Favorite.objects.filter(tenant=self.request.user)
 
     def perform_create(self, serializer):
-        serializer.save(tenant=self.request.user)
+        with transaction.atomic():
+            serializer.save(tenant=self.request.user)
 
 
 # ------------------- NOTIFICATIONS -------------------
@@ -276,6 +311,7 @@ class NotificationListView(generics.ListAPIView):
     serializer_class = NotificationListSerializer
     authentication_classes = [JWTAuthentication]
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
     filterset_class = NotificationFilter
     search_fields = ['title', 'body']
     ordering_fields = ['created_at', 'is_read', 'notification_type']
@@ -298,7 +334,9 @@ class NotificationDetailView(generics.RetrieveUpdateAPIView):
         for field in serializer.validated_data:
             if field not in allowed_fields:
                 raise permissions.PermissionDenied(f"You can only update: {', '.join(allowed_fields)}")
-        serializer.save()
+        if 'is_read' in serializer.validated_data:
+            # Conditional UPDATE so the unread counter moves only on a real change
+            set_notification_read(serializer.instance, serializer.validated_data['is_read'])
 
 class NotificationMarkAllReadView(generics.GenericAPIView):
     authentication_classes = [JWTAuthentication]
@@ -306,37 +344,53 @@ class NotificationMarkAllReadView(generics.GenericAPIView):
 
     def post(self, request):
         """Mark all notifications as read for the current user"""
-        updated_count = Notification.objects.filter(
-            user=request.user,
-            is_read=False
-        ).update(is_read=True)
+        updated_count = mark_notifications_read(request.user.id)
         
         return Response({
             'message': f'Marked {updated_count} notifications as read',
             'updated_count': updated_count
         })
 
+class NotificationBroadcastView(generics.GenericAPIView):
+    """Admins notify a whole audience (role and/or city); huge audiences go through the command"""
+    serializer_class = NotificationBroadcastSerializer
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAdmin]
+    
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        audience = audience_queryset(role=params.get('role'), city=params.get('city'))
+        
+        recipients = audience.count()
+        if params['dry_run']:
+            return Response({'recipients': recipients, 'dry_run': True})
+        if recipients > BROADCAST_API_MAX_RECIPIENTS:
+            raise ValidationError(
+                f"{recipients} recipients is more than {BROADCAST_API_MAX_RECIPIENTS}; "
+                "use `python manage.py broadcast_notification` instead."
+            )
+        
+        summary = broadcast_notification(
+            audience, params['title'], params['body'], params['notification_type'], params.get('data')
+        )
+        return Response(summary, status=status.HTTP_201_CREATED)
+
+
 class NotificationStatsView(generics.GenericAPIView):
     authentication_classes = [JWTAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        """Get notification statistics for the current user"""
-        user_notifications = Notification.objects.filter(user=request.user)
-        
-        stats = {
-            'total': user_notifications.count(),
-            'unread': user_notifications.filter(is_read=False).count(),
-            'by_type': {}
-        }
-        
-        # Count by notification type
-        for notification_type, _ in Notification.NOTIFICATION_TYPES:
-            count = user_notifications.filter(notification_type=notification_type).count()
-            if count > 0:
-                stats['by_type'][notification_type] = count
-        
-        return Response(stats)
+        """Get notification statistics for the current user (``?since=<ISO datetime>`` for new ones only)"""
+        since = request.query_params.get('since')
+        if since:
+            parsed = parse_datetime(since)
+            if parsed is None:
+                raise ValidationError({'since': "Enter a valid ISO 8601 datetime."})
+            since = parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed)
+        return Response(notification_stats(request.user.id, since=since or None))
 
 
 # ------------------- MAINTENANCE REQUESTS -------------------
@@ -363,4 +417,5 @@ class MaintenanceRequestListCreateView(generics.ListCreateAPIView):
         # Only tenants can create maintenance requests
         if self.request.user.role != 'tenant':
             raise permissions.PermissionDenied("Only tenants can create maintenance requests")
-        serializer.save(tenant=self.request.user)
+        with transaction.atomic():
+            serializer.save(tenant=self.request.user)
@@ -0,0 +1,73 @@
+"""
+Normalized amenity vocabulary
+
+``Property.amenities`` (free-form JSON written by the API) is mirrored into
+indexed ``Amenity`` rows keyed by a normalized slug, so amenity filters
+are index probes instead of JSON scans.
+"""
+
+from django.utils.text import slugify
+
+# Common spellings that should land on the same slug
+AMENITY_ALIASES = {
+    'wi-fi': 'wifi',
+    'wireless': 'wifi',
+    'internet': 'wifi',
+    'car-park': 'parking',
+    'parking-space': 'parking',
+    'running-water': 'water',
+    'water-supply': 'water',
+    'swimming-pool': 'pool',
+    'guard': 'security',
+    'gym-access': 'gym',
+}
+
+
+def normalize_amenity(name):
+    """Canonical slug for an amenity name"""
+    slug = slugify(str(name))[:100]
+    return AMENITY_ALIASES.get(slug, slug)
+
+
+def amenity_names(value):
+    """Amenity names from the JSON field: a list of names or a {name: enabled} dict"""
+    if isinstance(value, dict):
+        return [name for name, enabled in value.items() if enabled]
+    if isinstance(value, (list, tuple)):
+        return [name for name in value if isinstance(name, str)]
+    if isinstance(value, str):
+        return value.split(',')
+    return []
+
+
+def amenity_slugs(value):
+    """{slug: display name} for the JSON field, dropping blanks and duplicates"""
+    slugs = {}
+    for name in amenity_names(value):
+        slug = normalize_amenity(name)
+        if slug and slug not in slugs:
+            slugs[slug] = str(name).strip()[:100]
+    return slugs
+
+
+def sync_amenities(prop, Amenity=None):
+    """
+    Make ``prop``'s synced Amenity rows match its amenities JSON
+
+    Rows added some other way (admin, legacy data) are never deleted; a
+    slug they already cover is not inserted again.
+    """
+    if Amenity is None:
+        from .models import Amenity
+
+    wanted = amenity_slugs(prop.amenities)
+    existing = dict(Amenity.objects.filter(property_id=prop.pk).values_list('slug', 'synced'))
+    stale = [slug for slug, synced in existing.items() if synced and slug not in wanted]
+    if stale:
+        Amenity.objects.filter(property_id=prop.pk, slug__in=stale, synced=True).delete()
+    missing = [
+        Amenity(property_id=prop.pk, name=name, slug=slug, synced=True)
+        for slug, name in wanted.items() if slug not in existing
+    ]
+    if missing:
+        Amenity.objects.bulk_create(missing, ignore_conflicts=True)
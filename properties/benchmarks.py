@@ -0,0 +1,95 @@
+"""
+Helpers shared by the property benchmark management commands
+
+The commands seed synthetic listings inside a transaction that is rolled
+back at the end, so they can be pointed at a scratch copy of any database.
+"""
+
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+
+from .geo import encode_geohash
+from .models import Property
+
+TOWNS = [
+    'Nairobi', 'Mombasa', 'Kisumu', 'Nakuru', 'Eldoret', 'Thika', 'Malindi',
+    'Kitale', 'Machakos', 'Nyeri', 'Naivasha', 'Kericho', 'Kakamega', 'Embu',
+]
+NEIGHBOURHOODS = [
+    'Westlands', 'Kilimani', 'Karen', 'Lavington', 'Runda', 'Parklands',
+    'Nyali', 'Milimani', 'South B', 'Kileleshwa', 'Ruaka', 'Syokimau',
+]
+WORDS = [
+    'spacious', 'modern', 'furnished', 'quiet', 'secure', 'sunny', 'garden',
+    'balcony', 'parking', 'borehole', 'gated', 'bedsitter', 'penthouse',
+    'cozy', 'renovated', 'airy', 'tiled', 'fibre', 'wifi', 'servant', 'quarter',
+    'backup', 'generator', 'pool', 'gym', 'lift', 'view', 'ocean', 'lake',
+]
+
+# Roughly Kenya: seeded listings get coordinates inside this box
+SEED_BOUNDS = (-4.7, 33.9, 5.0, 41.9)
+
+
+class BenchmarkRollback(Exception):
+    """Raised to roll back the seeded data once a benchmark is done"""
+
+
+def get_benchmark_landlord():
+    """Create a throwaway landlord to own seeded listings"""
+    User = get_user_model()
+    return User.objects.create(
+        username=f'bench_landlord_{random.randint(0, 10**9)}', role='landlord'
+    )
+
+
+def build_property(owner, rng):
+    """Build (but do not save) a random listing"""
+    town = rng.choice(TOWNS)
+    area = rng.choice(NEIGHBOURHOODS)
+    kind = rng.choice(Property.PROPERTY_TYPES)[0]
+    words = rng.sample(WORDS, 12)
+    latitude = rng.uniform(SEED_BOUNDS[0], SEED_BOUNDS[2])
+    longitude = rng.uniform(SEED_BOUNDS[1], SEED_BOUNDS[3])
+    return Property(
+        owner=owner,
+        title=f"{words[0].title()} {kind} in {area}",
+        description=' '.join(words),
+        property_type=kind,
+        price=Decimal(rng.randrange(5_000, 500_000, 500)),
+        location=f"{area}, {town}",
+        latitude=latitude,
+        longitude=longitude,
+        geohash=encode_geohash(latitude, longitude),  # bulk_create skips save()
+        status=rng.choices(['available', 'booked', 'unavailable'], weights=[8, 1, 1])[0],
+        amenities=rng.sample(['wifi', 'parking', 'water', 'security', 'gym', 'pool'], 3),
+    )
+
+
+def seed_properties(count, owner, batch_size=5000, seed=42, stdout=None):
+    """Insert ``count`` random listings with bulk_create"""
+    rng = random.Random(seed)
+    created = 0
+    while created < count:
+        batch = [build_property(owner, rng) for _ in range(min(batch_size, count - created))]
+        Property.objects.bulk_create(batch, batch_size=batch_size)
+        created += len(batch)
+        if stdout:
+            stdout.write(f"  seeded {created}/{count}", ending='\r')
+    if stdout:
+        stdout.write('')
+    return created
+
+
+def time_call(func, repeat=5):
+    """Return (median, best) wall-clock milliseconds for ``func()``"""
+    func()  # warm caches and query plans
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), min(samples)
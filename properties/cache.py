@@ -0,0 +1,94 @@
+"""
+Response caching for the public property endpoints
+
+Cached responses are keyed on a generation counter plus the normalized
+query string. Writes never delete entries; they bump the generation (see
+properties.signals), which makes every older key unreachable so it simply
+ages out of the cache.
+"""
+
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+LIST_GENERATION_KEY = 'properties:generation'
+# When the list generation was last bumped (the list's Last-Modified)
+LIST_MODIFIED_KEY = 'properties:modified'
+DETAIL_GENERATION_KEY = 'properties:generation:{pk}'
+# When one property's detail generation was last bumped (part of its Last-Modified)
+DETAIL_MODIFIED_KEY = 'properties:modified:{pk}'
+
+
+def cache_timeout():
+    return getattr(settings, 'PROPERTY_CACHE_TIMEOUT', 300)
+
+
+def get_generation(key):
+    """Current generation for ``key``, initialising it if the cache lost it"""
+    generation = cache.get(key)
+    if generation is None:
+        # Seed from the clock so a reset never reuses an older generation
+        cache.add(key, time.time_ns() // 1000, timeout=None)
+        generation = cache.get(key)
+    return generation
+
+
+def bump_generation(key):
+    """Invalidate everything cached under ``key``'s current generation"""
+    try:
+        cache.incr(key)
+    except ValueError:
+        get_generation(key)
+        cache.incr(key)
+
+
+def bump_property_generations(property_id=None):
+    """Invalidate cached lists and, if given, one property's detail"""
+    now = time.time()
+    bump_generation(LIST_GENERATION_KEY)
+    cache.set(LIST_MODIFIED_KEY, now, timeout=None)
+    if property_id is not None:
+        bump_generation(DETAIL_GENERATION_KEY.format(pk=property_id))
+        cache.set(DETAIL_MODIFIED_KEY.format(pk=property_id), now, timeout=None)
+
+
+def normalized_params(request):
+    """Stable representation of the query string: sorted keys and values, blanks dropped"""
+    items = []
+    for key in sorted(request.query_params.keys()):
+        values = sorted(value for value in request.query_params.getlist(key) if value != '')
+        if values:
+            items.append(f"{key}={','.join(values)}")
+    # Pagination links are absolute, so the host is part of the response
+    return f"{request.get_host()}?{'&'.join(items)}"
+
+
+class CachedResponseMixin:
+    """Serve GET responses from the cache, keyed by a generation counter and normalized params"""
+    cache_prefix = None
+
+    def get_generation_key(self):
+        return LIST_GENERATION_KEY
+
+    def get_cache_timeout(self):
+        return cache_timeout()
+
+    def get_cache_key(self, request):
+        digest = hashlib.md5(normalized_params(request).encode()).hexdigest()
+        generation_key = self.get_generation_key()
+        return f"{self.cache_prefix}:{generation_key}:{get_generation(generation_key)}:{digest}"
+
+    def get(self, request, *args, **kwargs):
+        key = self.get_cache_key(request)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data, headers={'X-Cache': 'HIT'})
+
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, self.get_cache_timeout())
+        response['X-Cache'] = 'MISS'
+        return response
@@ -0,0 +1,91 @@
+"""
+Conditional GET support for the public property endpoints
+
+Validators are never computed from the serialized body. The list's come
+from the response-cache generation alone, which every write that can change
+a listing bumps (see properties.signals), so a list 304 costs no query. A
+detail's come from one query over the property's timestamps and counters,
+plus the time its detail generation was last bumped: review edits and
+review/favorite deletes leave no newer timestamp in the tables, so only
+that watermark moves Last-Modified for them.
+"""
+
+import datetime
+import hashlib
+
+from django.core.cache import cache
+from django.db.models import OuterRef, Subquery
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from interactions.models import Favorite, Review
+from .cache import (
+    DETAIL_GENERATION_KEY, DETAIL_MODIFIED_KEY, LIST_GENERATION_KEY, LIST_MODIFIED_KEY, get_generation,
+    normalized_params
+)
+from .models import Property
+
+
+def bumped_at(key):
+    """When the generation behind ``key`` was last bumped, or None if the cache has no record"""
+    modified = cache.get(key)
+    return datetime.datetime.fromtimestamp(modified, datetime.timezone.utc) if modified else None
+
+
+def list_validators(request):
+    """(etag, last_modified) for the property list, read from the cache only"""
+    etag = make_etag([normalized_params(request), get_generation(LIST_GENERATION_KEY)])
+    # Without a recorded bump time the ETag alone validates
+    return etag, bumped_at(LIST_MODIFIED_KEY)
+
+
+def detail_validators(request, pk):
+    """(etag, last_modified) for one property, or (None, None) if it does not exist"""
+    latest_review = Review.objects.filter(property=OuterRef('pk')).order_by('-created_at').values('created_at')[:1]
+    latest_favorite = Favorite.objects.filter(property=OuterRef('pk')).order_by('-created_at').values('created_at')[:1]
+    row = (
+        Property.objects.filter(pk=pk)
+        .annotate(last_review_at=Subquery(latest_review), last_favorite_at=Subquery(latest_favorite))
+        .values('updated_at', 'avg_rating', 'review_count', 'favorite_count', 'last_review_at', 'last_favorite_at')
+        .first()
+    )
+    if row is None:
+        return None, None
+    last_modified = max(
+        value for value in (
+            row['updated_at'], row['last_review_at'], row['last_favorite_at'],
+            bumped_at(DETAIL_MODIFIED_KEY.format(pk=pk)),
+        ) if value
+    )
+    parts = [
+        normalized_params(request),
+        get_generation(DETAIL_GENERATION_KEY.format(pk=pk)),
+        *(value.isoformat() if hasattr(value, 'isoformat') else value for value in row.values()),
+    ]
+    return make_etag(parts), last_modified
+
+
+def make_etag(parts):
+    return quote_etag(hashlib.md5('|'.join(str(part) for part in parts).encode()).hexdigest())
+
+
+class ConditionalGetMixin:
+    """Answer GET with 304 when the client's validators still match"""
+
+    def get_validators(self, request):
+        return list_validators(request)
+
+    def get(self, request, *args, **kwargs):
+        etag, last_modified = self.get_validators(request)
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        if etag is not None:
+            not_modified = get_conditional_response(request, etag=etag, last_modified=timestamp)
+            if not_modified is not None:
+                return not_modified
+
+        response = super().get(request, *args, **kwargs)
+        if etag is not None and response.status_code == 200:
+            response['ETag'] = etag
+            if timestamp is not None:
+                response['Last-Modified'] = http_date(timestamp)
+        return response
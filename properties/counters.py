@@ -0,0 +1,76 @@
+"""
+Maintenance of the denormalized rating/review/favorite columns on Property
+
+The interactions signals call these helpers whenever a Review or Favorite
+is saved or deleted, and ``rebuild_property_counters`` uses
+``rebuild_counters`` to repair drift in bulk.
+"""
+
+from django.apps import apps as global_apps
+from django.db.models import Avg, Count, F, FloatField, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+
+def counter_expressions(apps=global_apps):
+    """UPDATE expressions that recompute all three counters from the source rows"""
+    Review = apps.get_model('interactions', 'Review')
+    Favorite = apps.get_model('interactions', 'Favorite')
+
+    reviews = Review.objects.filter(property=OuterRef('pk')).order_by().values('property')
+    favorites = Favorite.objects.filter(property=OuterRef('pk')).order_by().values('property')
+    return {
+        'avg_rating': Coalesce(
+            Subquery(reviews.annotate(value=Avg('rating')).values('value'), output_field=FloatField()),
+            Value(0.0),
+        ),
+        'review_count': Coalesce(
+            Subquery(reviews.annotate(value=Count('id')).values('value'), output_field=IntegerField()),
+            Value(0),
+        ),
+        'favorite_count': Coalesce(
+            Subquery(favorites.annotate(value=Count('id')).values('value'), output_field=IntegerField()),
+            Value(0),
+        ),
+    }
+
+
+def refresh_review_stats(property_id):
+    """Recompute avg_rating and review_count for one property in a single UPDATE"""
+    from .models import Property
+
+    expressions = counter_expressions()
+    Property.objects.filter(pk=property_id).update(
+        avg_rating=expressions['avg_rating'],
+        review_count=expressions['review_count'],
+    )
+
+
+def adjust_favorite_count(property_id, delta):
+    """Atomically add ``delta`` to favorite_count, never going below zero"""
+    from .models import Property
+
+    Property.objects.filter(pk=property_id).update(
+        favorite_count=Greatest(F('favorite_count') + delta, Value(0))
+    )
+
+
+def rebuild_counters(apps=global_apps, batch_size=1000, stdout=None):
+    """Recompute every property's counters in primary-key batches"""
+    Property = apps.get_model('properties', 'Property')
+    expressions = counter_expressions(apps)
+
+    last_id = 0
+    updated = 0
+    while True:
+        ids = list(
+            Property.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        updated += Property.objects.filter(pk__gte=ids[0], pk__lte=ids[-1]).update(**expressions)
+        last_id = ids[-1]
+        if stdout:
+            stdout.write(f"  rebuilt {updated} properties", ending='\r')
+    if stdout:
+        stdout.write('')
+    return updated
@@ -0,0 +1,133 @@
+"""
+Facet counts for the property search UI
+
+All facets come from rows of (property_type, status, price bucket, count),
+rolled up into per-facet counts in Python. Requests with no filters, or
+filtered only on the rollup's own columns (``ROLLUP_FILTERS``), read those
+rows from ``PropertyFacetCount``, which properties.signals adjusts on every
+listing save and delete, so they never scan the listings. Any other filter
+gets its rows from one GROUP BY over the matching listings.
+``rebuild_facet_counts`` recreates the rollup after bulk writes that skip
+the signals.
+"""
+
+from django.apps import apps as global_apps
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, IntegerField, Q, Value, When
+from django.db.models.functions import Greatest
+
+from .models import Property, PropertyFacetCount
+
+# (label, lower bound inclusive, upper bound exclusive)
+PRICE_BUCKETS = [
+    ('0-10000', 0, 10_000),
+    ('10000-25000', 10_000, 25_000),
+    ('25000-50000', 25_000, 50_000),
+    ('50000-100000', 50_000, 100_000),
+    ('100000-250000', 100_000, 250_000),
+    ('250000+', 250_000, None),
+]
+
+
+def price_bucket_expression():
+    """CASE expression mapping price to the index of its bucket"""
+    whens = []
+    for index, (_, lower, upper) in enumerate(PRICE_BUCKETS):
+        condition = Q(price__gte=lower)
+        if upper is not None:
+            condition &= Q(price__lt=upper)
+        whens.append(When(condition, then=Value(index)))
+    return Case(*whens, default=Value(0), output_field=IntegerField())
+
+
+def price_bucket(price):
+    """Index of the bucket ``price`` falls in (Python twin of ``price_bucket_expression``)"""
+    for index, (_, lower, upper) in enumerate(PRICE_BUCKETS):
+        if price >= lower and (upper is None or price < upper):
+            return index
+    return 0
+
+
+def grouped_rows(queryset):
+    """(property_type, status, price_bucket, count) rows for ``queryset`` in one GROUP BY"""
+    return (
+        queryset.order_by()
+        .annotate(price_bucket=price_bucket_expression())
+        .values('property_type', 'status', 'price_bucket')
+        .annotate(count=Count('id'))
+    )
+
+
+def compute_facets(queryset, listed_status='available'):
+    """
+    Facets for ``queryset``, which should span every status
+
+    ``total`` and the type and price facets count the ``listed_status`` rows
+    (what the list shows); the status facet counts all of them.
+    """
+    return rollup(grouped_rows(queryset), listed_status)
+
+
+# Filters the rollup rows can answer exactly
+ROLLUP_FILTERS = {
+    'property_type': {value for value, _ in Property.PROPERTY_TYPES},
+    'status': {value for value, _ in Property.STATUS_CHOICES},
+}
+
+
+def stored_facets(listed_status='available', **filters):
+    """``compute_facets`` for the listings matching ``filters`` (see ``ROLLUP_FILTERS``), from the rollup"""
+    rows = (
+        PropertyFacetCount.objects.filter(count__gt=0, **filters)
+        .values('property_type', 'status', 'price_bucket', 'count')
+    )
+    return rollup(rows, listed_status)
+
+
+def rollup(rows, listed_status):
+    facets = {
+        'total': 0,
+        'property_type': {value: 0 for value, _ in Property.PROPERTY_TYPES},
+        'status': {value: 0 for value, _ in Property.STATUS_CHOICES},
+        'price': {label: 0 for label, _, _ in PRICE_BUCKETS},
+    }
+    for row in rows:
+        facets['status'][row['status']] = facets['status'].get(row['status'], 0) + row['count']
+        if row['status'] != listed_status:
+            continue
+        facets['total'] += row['count']
+        facets['property_type'][row['property_type']] = facets['property_type'].get(row['property_type'], 0) + row['count']
+        facets['price'][PRICE_BUCKETS[row['price_bucket']][0]] += row['count']
+    return facets
+
+
+# ---- maintenance ----
+
+def facet_key(property_type, status, price):
+    price = Property._meta.get_field('price').to_python(price)
+    return {'property_type': property_type, 'status': status, 'price_bucket': price_bucket(price)}
+
+
+def adjust_facet_count(key, delta):
+    """Add ``delta`` to the rollup row for ``key``, creating it on first use"""
+    expression = Greatest(F('count') + delta, Value(0))
+    if PropertyFacetCount.objects.filter(**key).update(count=expression) or delta < 0:
+        return
+    try:
+        with transaction.atomic():
+            PropertyFacetCount.objects.create(count=delta, **key)
+    except IntegrityError:
+        # A concurrent writer created it first
+        PropertyFacetCount.objects.filter(**key).update(count=expression)
+
+
+def rebuild_facet_counts(apps=global_apps):
+    """Recreate the rollup from one GROUP BY over every listing; returns rows written"""
+    Property = apps.get_model('properties', 'Property')
+    PropertyFacetCount = apps.get_model('properties', 'PropertyFacetCount')
+
+    rows = [PropertyFacetCount(**row) for row in grouped_rows(Property.objects.all())]
+    with transaction.atomic():
+        PropertyFacetCount.objects.all().delete()
+        PropertyFacetCount.objects.bulk_create(rows)
+    return len(rows)
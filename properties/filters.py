@@ -1,11 +1,40 @@
 # properties/filters.py
 import django_filters
 from django.db import models
-from .models import Property
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import OrderingFilter
+from django.db.models import Exists, OuterRef
+from interactions.models import BookingRequest
+from .models import Amenity, Property
+from .amenities import normalize_amenity
+from .search import search_properties
+from .geo import within_box, within_radius
+
+DEFAULT_RADIUS_KM = 10
+MAX_RADIUS_KM = 500
+
+
+def parse_coordinates(value, count, name):
+    """Parse a comma-separated list of ``count`` floats or raise a 400"""
+    try:
+        numbers = [float(part) for part in value.split(',')]
+    except (AttributeError, ValueError):
+        numbers = []
+    if len(numbers) != count:
+        raise ValidationError({name: f"Expected {count} comma-separated numbers"})
+    return numbers
 
 class PropertyFilter(django_filters.FilterSet):
     """Comprehensive filter for properties with advanced search capabilities"""
     
+    # Full-text search (ranked, prefix-matched)
+    q = django_filters.CharFilter(method='filter_search')
+    
+    # Geospatial filters: ?near=lat,lng&radius_km=5 or ?bbox=min_lat,min_lng,max_lat,max_lng
+    near = django_filters.CharFilter(method='filter_near')
+    radius_km = django_filters.NumberFilter(method='filter_radius_km')
+    bbox = django_filters.CharFilter(method='filter_bbox')
+    
     # Basic filters
     title = django_filters.CharFilter(lookup_expr='icontains')
     location = django_filters.CharFilter(lookup_expr='icontains')
@@ -27,13 +56,19 @@ class PropertyFilter(django_filters.FilterSet):
     updated_after = django_filters.DateTimeFilter(field_name='updated_at', lookup_expr='gte')
     updated_before = django_filters.DateTimeFilter(field_name='updated_at', lookup_expr='lte')
     
+    # Amenity filter: ?amenities=wifi,parking,water matches properties having all of them
+    amenities = django_filters.CharFilter(method='filter_amenities')
+    
     # Availability filter
+    check_in = django_filters.DateFilter(method='filter_dates')
+    check_out = django_filters.DateFilter(method='filter_dates')
     available_only = django_filters.BooleanFilter(method='filter_available_only')
     
     # Advanced filters
     has_image = django_filters.BooleanFilter(method='filter_has_image')
     min_reviews = django_filters.NumberFilter(method='filter_min_reviews')
     min_rating = django_filters.NumberFilter(method='filter_min_rating')
+    min_favorites = django_filters.NumberFilter(method='filter_min_favorites')
     
     class Meta:
         model = Property
@@ -42,6 +77,65 @@ class PropertyFilter(django_filters.FilterSet):
             'owner_username', 'available_only', 'has_image'
         ]
     
+    def filter_search(self, queryset, name, value):
+        """Full-text search over title, location and description"""
+        if value:
+            return search_properties(queryset, value)
+        return queryset
+    
+    def filter_near(self, queryset, name, value):
+        """Filter to properties within radius_km of a point, annotating distance_km"""
+        latitude, longitude = parse_coordinates(value, 2, name)
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            raise ValidationError({name: "Latitude must be within ±90 and longitude within ±180"})
+        radius = self.form.cleaned_data.get('radius_km')
+        if radius is None:
+            radius = DEFAULT_RADIUS_KM
+        elif radius <= 0:
+            raise ValidationError({'radius_km': "radius_km must be greater than 0"})
+        radius = min(float(radius), MAX_RADIUS_KM)
+        return within_radius(queryset, latitude, longitude, radius)
+    
+    def filter_radius_km(self, queryset, name, value):
+        """Consumed by filter_near"""
+        return queryset
+    
+    def filter_bbox(self, queryset, name, value):
+        """Filter to properties inside a map viewport"""
+        min_lat, min_lng, max_lat, max_lng = parse_coordinates(value, 4, name)
+        if min_lat > max_lat or min_lng > max_lng:
+            raise ValidationError({name: "Expected min_lat,min_lng,max_lat,max_lng"})
+        return within_box(queryset, min_lat, min_lng, max_lat, max_lng)
+    
+    def filter_amenities(self, queryset, name, value):
+        """Require every listed amenity, one (property, slug) index probe each"""
+        slugs = {normalize_amenity(part) for part in value.split(',')} - {''}
+        for slug in sorted(slugs):
+            queryset = queryset.filter(
+                Exists(Amenity.objects.filter(property=OuterRef('pk'), slug=slug))
+            )
+        return queryset
+    
+    def filter_dates(self, queryset, name, value):
+        """Exclude properties with an approved/checked-in booking overlapping [check_in, check_out)"""
+        if name == 'check_out':
+            if self.form.cleaned_data.get('check_in') is None:
+                raise ValidationError({'check_in': "check_in is required with check_out"})
+            return queryset  # both dates are applied when check_in is processed
+        check_in = value
+        check_out = self.form.cleaned_data.get('check_out')
+        if check_out is None:
+            raise ValidationError({'check_out': "check_out is required with check_in"})
+        if check_out <= check_in:
+            raise ValidationError({'check_out': "check_out must be after check_in"})
+        overlapping = BookingRequest.objects.filter(
+            rental_property=OuterRef('pk'),
+            status__in=BookingRequest.BLOCKING_STATUSES,
+            check_in_date__lt=check_out,
+            check_out_date__gt=check_in,
+        )
+        return queryset.filter(~Exists(overlapping))
+    
     def filter_available_only(self, queryset, name, value):
         """Filter to show only available properties"""
         if value:
@@ -57,15 +151,40 @@ class PropertyFilter(django_filters.FilterSet):
     def filter_min_reviews(self, queryset, name, value):
         """Filter properties with minimum number of reviews"""
         if value is not None:
-            return queryset.annotate(
-                review_count=models.Count('property_reviews')
-            ).filter(review_count__gte=value)
+            return queryset.filter(review_count__gte=value)
         return queryset
     
     def filter_min_rating(self, queryset, name, value):
         """Filter properties with minimum average rating"""
         if value is not None:
-            return queryset.annotate(
-                avg_rating=models.Avg('property_reviews__rating')
-            ).filter(avg_rating__gte=value)
+            return queryset.filter(avg_rating__gte=value)
         return queryset
+    
+    def filter_min_favorites(self, queryset, name, value):
+        """Filter properties favorited at least this many times"""
+        if value is not None:
+            return queryset.filter(favorite_count__gte=value)
+        return queryset
+
+
+class PropertyOrderingFilter(OrderingFilter):
+    """
+    Ordering filter that, when no ordering is requested, sorts ?near= results
+    by distance and ranks full-text matches first
+    """
+    
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        # distance_km only exists when a ?near= filter annotated it
+        if 'distance_km' not in queryset.query.annotations and any(
+            field.lstrip('-') == 'distance_km' for field in ordering or []
+        ):
+            raise ValidationError({self.ordering_param: "Ordering by distance_km requires ?near=lat,lng"})
+        if request.query_params.get(self.ordering_param):
+            return ordering
+        if request.query_params.get('near'):
+            return ['distance_km', *(ordering or [])]
+        # search_rank is only annotated when ?q= has at least one word token
+        if 'search_rank' in queryset.query.annotations:
+            return ['-search_rank', *(ordering or [])]
+        return ordering
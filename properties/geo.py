@@ -0,0 +1,140 @@
+"""
+Geospatial helpers for property search without PostGIS
+
+Each property stores a 12-character geohash next to its latitude and
+longitude. Nearby points share geohash prefixes, so a map region can be
+covered by a handful of prefixes and each prefix becomes a B-tree range
+scan on the ``(status, geohash)`` index, on SQLite and PostgreSQL alike.
+Candidates are then trimmed with an exact bounding-box or haversine check.
+"""
+
+import math
+
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import ASin, Cos, Power, Radians, Sin, Sqrt
+
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_PRECISION = 12
+EARTH_RADIUS_KM = 6371.0088
+
+# Upper bound on prefixes per query; more means tighter cover but more scans
+MAX_COVER_CELLS = 16
+
+
+def encode_geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    """Encode a coordinate pair as a geohash string"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        if even:
+            mid = (lon_range[0] + lon_range[1]) / 2
+            if longitude >= mid:
+                bits = (bits << 1) | 1
+                lon_range[0] = mid
+            else:
+                bits <<= 1
+                lon_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if latitude >= mid:
+                bits = (bits << 1) | 1
+                lat_range[0] = mid
+            else:
+                bits <<= 1
+                lat_range[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(GEOHASH_ALPHABET[bits])
+            bits = 0
+            bit_count = 0
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """(lat_degrees, lon_degrees) covered by one geohash cell"""
+    lon_bits = math.ceil(precision * 5 / 2)
+    lat_bits = precision * 5 // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lon_bits)
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """(min_lat, min_lon, max_lat, max_lon) enclosing a circle"""
+    lat_delta = math.degrees(radius_km / EARTH_RADIUS_KM)
+    cos_lat = max(math.cos(math.radians(latitude)), 1e-6)
+    lon_delta = min(math.degrees(radius_km / (EARTH_RADIUS_KM * cos_lat)), 180.0)
+    return (
+        max(latitude - lat_delta, -90.0),
+        max(longitude - lon_delta, -180.0),
+        min(latitude + lat_delta, 90.0),
+        min(longitude + lon_delta, 180.0),
+    )
+
+
+def covering_prefixes(min_lat, min_lon, max_lat, max_lon, max_cells=MAX_COVER_CELLS):
+    """The finest set of at most ``max_cells`` geohash prefixes covering a box"""
+    best = ['']
+    for precision in range(1, GEOHASH_PRECISION + 1):
+        lat_step, lon_step = cell_size(precision)
+        rows = math.floor(max_lat / lat_step) - math.floor(min_lat / lat_step) + 1
+        cols = math.floor(max_lon / lon_step) - math.floor(min_lon / lon_step) + 1
+        if rows * cols > max_cells:
+            break
+        cells = set()
+        for row in range(rows):
+            lat = min(min_lat + row * lat_step, max_lat)
+            for col in range(cols):
+                lon = min(min_lon + col * lon_step, max_lon)
+                cells.add(encode_geohash(lat, lon, precision))
+            cells.add(encode_geohash(lat, max_lon, precision))
+        for col in range(cols):
+            cells.add(encode_geohash(max_lat, min(min_lon + col * lon_step, max_lon), precision))
+        cells.add(encode_geohash(max_lat, max_lon, precision))
+        best = sorted(cells)
+    return best
+
+
+def geohash_condition(prefixes):
+    """OR of index-friendly range predicates, one per prefix"""
+    condition = Q()
+    for prefix in prefixes:
+        padding = GEOHASH_PRECISION - len(prefix)
+        condition |= Q(
+            geohash__gte=prefix + GEOHASH_ALPHABET[0] * padding,
+            geohash__lte=prefix + GEOHASH_ALPHABET[-1] * padding,
+        )
+    return condition
+
+
+def within_box(queryset, min_lat, min_lon, max_lat, max_lon):
+    """Properties whose coordinates fall inside the box"""
+    prefixes = covering_prefixes(min_lat, min_lon, max_lat, max_lon)
+    if prefixes != ['']:
+        queryset = queryset.filter(geohash_condition(prefixes))
+    return queryset.filter(
+        latitude__gte=min_lat, latitude__lte=max_lat,
+        longitude__gte=min_lon, longitude__lte=max_lon,
+    )
+
+
+def distance_expression(latitude, longitude):
+    """Haversine distance in km from a point to each row's coordinates"""
+    half_dlat = Radians(F('latitude') - Value(latitude)) / 2
+    half_dlon = Radians(F('longitude') - Value(longitude)) / 2
+    a = (
+        Power(Sin(half_dlat), 2)
+        + Value(math.cos(math.radians(latitude))) * Cos(Radians(F('latitude'))) * Power(Sin(half_dlon), 2)
+    )
+    return Value(2 * EARTH_RADIUS_KM) * ASin(Sqrt(a), output_field=FloatField())
+
+
+def within_radius(queryset, latitude, longitude, radius_km):
+    """Properties within ``radius_km`` of a point, annotated with ``distance_km``"""
+    queryset = within_box(queryset, *bounding_box(latitude, longitude, radius_km))
+    return queryset.annotate(distance_km=distance_expression(latitude, longitude)).filter(
+        distance_km__lte=radius_km
+    )
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from properties.benchmarks import (
+    BenchmarkRollback, get_benchmark_landlord, seed_properties, time_call,
+)
+from properties.facets import compute_facets, rebuild_facet_counts, stored_facets
+from properties.models import Property
+
+# Budget the facets endpoint is expected to meet at the largest size
+TARGET_MS = 50
+
+
+class Command(BaseCommand):
+    help = "Benchmark the facet counts (rollup and filtered GROUP BY) at increasing table sizes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[100_000, 500_000])
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        # What PropertyFacetsView runs: the rollup for type/status filters, else one GROUP BY
+        listings = Property.objects.all()
+        cases = {
+            'no filters': stored_facets,
+            'no filters (GROUP BY)': lambda: compute_facets(listings),
+            'type=villa': lambda: stored_facets(property_type='villa'),
+            'type=villa (GROUP BY)': lambda: compute_facets(listings.filter(property_type='villa')),
+            'price 20k-60k': lambda: compute_facets(listings.filter(price__gte=20_000, price__lte=60_000)),
+            'location=Nairobi': lambda: compute_facets(listings.filter(location__icontains='Nairobi')),
+        }
+
+        self.stdout.write(f"Backend: {connection.vendor}, target {TARGET_MS} ms")
+        try:
+            with transaction.atomic():
+                owner = get_benchmark_landlord()
+                seeded = 0
+                for size in sorted(options['sizes']):
+                    self.stdout.write(f"Seeding up to {size} listings...")
+                    seeded += seed_properties(size - seeded, owner, seed=size, stdout=self.stdout)
+                    # bulk_create skips the signals that maintain the rollup
+                    rebuild_facet_counts()
+                    if connection.vendor in ('sqlite', 'postgresql'):
+                        with connection.cursor() as cursor:
+                            cursor.execute('ANALYZE')
+                    self.stdout.write(f"{'listings':>10} {'filters':<22} {'median ms':>10} {'best ms':>8}")
+                    for label, func in cases.items():
+                        median_ms, best_ms = time_call(func, options['repeat'])
+                        verdict = '' if median_ms <= TARGET_MS else '  over target'
+                        self.stdout.write(f"{size:>10} {label:<22} {median_ms:>10.1f} {best_ms:>8.1f}{verdict}")
+                raise BenchmarkRollback
+        except BenchmarkRollback:
+            self.stdout.write(self.style.SUCCESS("Benchmark finished, seeded data rolled back"))
@@ -0,0 +1,66 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from properties.benchmarks import (
+    BenchmarkRollback, get_benchmark_landlord, seed_properties, time_call,
+)
+from properties.geo import distance_expression, within_box, within_radius
+from properties.models import Property
+
+# (label, latitude, longitude) of typical "near me" searches
+POINTS = [
+    ('Nairobi CBD', -1.2864, 36.8172),
+    ('Mombasa', -4.0435, 39.6682),
+    ('Kisumu', -0.0917, 34.7680),
+]
+
+
+class Command(BaseCommand):
+    help = "Benchmark geohash radius/viewport search against a full-scan distance filter"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[100_000, 1_000_000])
+        parser.add_argument('--radius', type=float, default=5.0)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--page-size', type=int, default=20)
+
+    def handle(self, *args, **options):
+        radius = options['radius']
+        page_size = options['page_size']
+        available = Property.objects.filter(status='available')
+
+        def full_scan(lat, lng):
+            qs = available.exclude(latitude=None).annotate(
+                distance_km=distance_expression(lat, lng)
+            ).filter(distance_km__lte=radius).order_by('distance_km')
+            return lambda: list(qs[:page_size])
+
+        def indexed(lat, lng):
+            qs = within_radius(available, lat, lng, radius).order_by('distance_km')
+            return lambda: list(qs[:page_size])
+
+        def viewport(lat, lng):
+            qs = within_box(available, lat - 0.05, lng - 0.08, lat + 0.05, lng + 0.08).order_by('-created_at')
+            return lambda: list(qs[:page_size])
+
+        self.stdout.write(f"Backend: {connection.vendor}, radius {radius} km")
+        try:
+            with transaction.atomic():
+                owner = get_benchmark_landlord()
+                seeded = 0
+                for size in sorted(options['sizes']):
+                    self.stdout.write(f"Seeding up to {size} listings...")
+                    seeded += seed_properties(size - seeded, owner, seed=size, stdout=self.stdout)
+                    self.stdout.write(
+                        f"{'listings':>10} {'point':<12} {'full scan ms':>13} {'radius ms':>10} {'viewport ms':>12}"
+                    )
+                    for label, lat, lng in POINTS:
+                        scan_ms, _ = time_call(full_scan(lat, lng), options['repeat'])
+                        radius_ms, _ = time_call(indexed(lat, lng), options['repeat'])
+                        box_ms, _ = time_call(viewport(lat, lng), options['repeat'])
+                        self.stdout.write(
+                            f"{size:>10} {label:<12} {scan_ms:>13.1f} {radius_ms:>10.1f} {box_ms:>12.1f}"
+                        )
+                raise BenchmarkRollback
+        except BenchmarkRollback:
+            self.stdout.write(self.style.SUCCESS("Benchmark finished, seeded data rolled back"))
@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+
+from properties.benchmarks import (
+    BenchmarkRollback, get_benchmark_landlord, seed_properties, time_call,
+)
+from properties.models import Property
+from properties.search import search_properties
+
+
+class Command(BaseCommand):
+    help = "Compare full-text property search against the legacy icontains scan"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[100_000, 1_000_000])
+        parser.add_argument('--queries', nargs='+', default=['kilimani', 'furnished apart', 'ocean view'])
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--page-size', type=int, default=10)
+
+    def handle(self, *args, **options):
+        page_size = options['page_size']
+
+        def legacy(query):
+            condition = Q()
+            for term in query.split():
+                condition &= (
+                    Q(title__icontains=term)
+                    | Q(location__icontains=term)
+                    | Q(description__icontains=term)
+                )
+            qs = Property.objects.filter(status='available').filter(condition)
+            return lambda: (qs.count(), list(qs.order_by('-created_at')[:page_size]))
+
+        def fulltext(query):
+            qs = search_properties(Property.objects.filter(status='available'), query)
+            return lambda: (qs.count(), list(qs.order_by('-search_rank', '-created_at')[:page_size]))
+
+        self.stdout.write(f"Backend: {connection.vendor}")
+        try:
+            with transaction.atomic():
+                owner = get_benchmark_landlord()
+                seeded = 0
+                for size in sorted(options['sizes']):
+                    self.stdout.write(f"Seeding up to {size} listings...")
+                    seeded += seed_properties(size - seeded, owner, seed=size, stdout=self.stdout)
+                    self.stdout.write(f"{'listings':>10} {'query':<18} {'icontains ms':>14} {'fulltext ms':>13} {'speedup':>8}")
+                    for query in options['queries']:
+                        old_ms, _ = time_call(legacy(query), options['repeat'])
+                        new_ms, _ = time_call(fulltext(query), options['repeat'])
+                        self.stdout.write(
+                            f"{size:>10} {query:<18} {old_ms:>14.1f} {new_ms:>13.1f} {old_ms / max(new_ms, 0.001):>7.1f}x"
+                        )
+                raise BenchmarkRollback
+        except BenchmarkRollback:
+            self.stdout.write(self.style.SUCCESS("Benchmark finished, seeded data rolled back"))
@@ -0,0 +1,59 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from properties.benchmarks import BenchmarkRollback, get_benchmark_landlord, seed_properties
+from properties.similarity import SimilarityIndex, VECTOR_FIELDS
+from properties.models import Property
+
+
+class Command(BaseCommand):
+    help = "Benchmark building and querying the similar-properties vector index"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=200_000)
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--limit', type=int, default=10)
+        parser.add_argument('--updates', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Backend: {connection.vendor}")
+        try:
+            with transaction.atomic():
+                seed_properties(options['size'], get_benchmark_landlord(), stdout=self.stdout)
+                index = SimilarityIndex()
+
+                start = time.perf_counter()
+                index.build()
+                build_s = time.perf_counter() - start
+                self.stdout.write(
+                    f"Built {len(index.ids)} x {index.matrix.shape[1]} matrix in {build_s:.1f}s "
+                    f"({index.matrix.nbytes / 2**20:.1f} MiB)"
+                )
+
+                index.ensure_fresh()
+                ids = random.Random(1).sample(list(index.ids), min(options['queries'], len(index.ids)))
+                samples = []
+                for pk in ids:
+                    start = time.perf_counter()
+                    index.similar_ids(pk, options['limit'])
+                    samples.append((time.perf_counter() - start) * 1000)
+                samples.sort()
+                self.stdout.write(
+                    f"Top-{options['limit']} query: p50 {statistics.median(samples):.2f} ms, "
+                    f"p95 {samples[int(len(samples) * 0.95) - 1]:.2f} ms"
+                )
+
+                rows = list(Property.objects.values(*VECTOR_FIELDS)[:options['updates']])
+                start = time.perf_counter()
+                index.upsert(rows)
+                self.stdout.write(
+                    f"Incremental refresh of {len(rows)} listings: "
+                    f"{(time.perf_counter() - start) * 1000:.1f} ms"
+                )
+                raise BenchmarkRollback
+        except BenchmarkRollback:
+            self.stdout.write(self.style.SUCCESS("Benchmark finished, seeded data rolled back"))
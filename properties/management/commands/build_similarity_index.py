@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from properties.similarity import similarity_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the similar-properties vector snapshot that web processes load on startup"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help="Snapshot path (defaults to SIMILARITY_INDEX_PATH)")
+
+    def handle(self, *args, **options):
+        similarity_index.build()
+        path = similarity_index.save(options['output'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {len(similarity_index.ids)} properties into {path}"
+        ))
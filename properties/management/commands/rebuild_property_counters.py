@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from properties.counters import rebuild_counters
+
+
+class Command(BaseCommand):
+    help = "Recompute Property.avg_rating, review_count and favorite_count from reviews and favorites"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        updated = rebuild_counters(batch_size=options['batch_size'], stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt counters for {updated} properties"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from properties.facets import rebuild_facet_counts
+
+
+class Command(BaseCommand):
+    help = "Recreate the PropertyFacetCount rollup from the listings (after bulk writes that skip signals)"
+
+    def handle(self, *args, **options):
+        rows = rebuild_facet_counts()
+        self.stdout.write(self.style.SUCCESS(f"Wrote {rows} facet rollup rows"))
@@ -0,0 +1,51 @@
+from django.db import migrations, models
+
+
+def backfill(apps, schema_editor):
+    from properties.counters import rebuild_counters
+    rebuild_counters(apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("properties", "0003_property_search_index"),
+        ("interactions", "0003_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="property",
+            name="avg_rating",
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name="property",
+            name="review_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="property",
+            name="favorite_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name="property",
+            index=models.Index(
+                fields=["status", "avg_rating"], name="properties__status_2aeed3_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="property",
+            index=models.Index(
+                fields=["status", "review_count"], name="properties__status_ac4ee8_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="property",
+            index=models.Index(
+                fields=["status", "favorite_count"], name="properties__status_3bde42_idx"
+            ),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
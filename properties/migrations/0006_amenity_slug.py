@@ -0,0 +1,69 @@
+from django.db import migrations, models
+
+
+def backfill(apps, schema_editor):
+    from collections import defaultdict
+    from properties.amenities import amenity_slugs, normalize_amenity
+
+    Property = apps.get_model("properties", "Property")
+    Amenity = apps.get_model("properties", "Amenity")
+
+    # Normalize existing rows, dropping duplicates that would violate uniqueness
+    existing = defaultdict(set)
+    for amenity in Amenity.objects.order_by("id").iterator():
+        slug = normalize_amenity(amenity.name)
+        if not slug or slug in existing[amenity.property_id]:
+            amenity.delete()
+            continue
+        existing[amenity.property_id].add(slug)
+        Amenity.objects.filter(pk=amenity.pk).update(slug=slug)
+
+    # Mirror the JSON field. Rows the JSON accounts for are owned by the sync;
+    # anything else was added by hand (admin, legacy data) and must survive
+    # later syncs
+    batch = []
+    for prop in Property.objects.exclude(amenities=None).only("id", "amenities").iterator():
+        slugs = amenity_slugs(prop.amenities)
+        Amenity.objects.filter(property_id=prop.pk, slug__in=list(slugs)).update(synced=True)
+        for slug, name in slugs.items():
+            if slug not in existing[prop.pk]:
+                batch.append(Amenity(property_id=prop.pk, name=name, slug=slug, synced=True))
+        if len(batch) >= 5000:
+            Amenity.objects.bulk_create(batch)
+            batch = []
+    Amenity.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+    # PostgreSQL refuses ALTER TABLE while the backfill's inserts still have
+    # pending FK trigger events, so the backfill commits on its own first
+    atomic = False
+
+    dependencies = [
+        ("properties", "0005_property_coordinates"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="amenity",
+            name="slug",
+            field=models.SlugField(db_index=False, default="", max_length=100),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="amenity",
+            name="synced",
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop, atomic=True),
+        migrations.AlterUniqueTogether(
+            name="amenity",
+            unique_together={("property", "slug")},
+        ),
+        migrations.AddIndex(
+            model_name="amenity",
+            index=models.Index(
+                fields=["slug", "property"], name="properties__slug_f8cb08_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,34 @@
+from django.db import migrations, models
+
+
+def backfill(apps, schema_editor):
+    from properties.facets import rebuild_facet_counts
+    rebuild_facet_counts(apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("properties", "0007_property_listing_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PropertyFacetCount",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("property_type", models.CharField(max_length=50)),
+                ("status", models.CharField(max_length=20)),
+                ("price_bucket", models.PositiveSmallIntegerField()),
+                ("count", models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("property_type", "status", "price_bucket"), name="property_facet_count_uniq"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
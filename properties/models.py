@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from .geo import encode_geohash
 
 class Property(models.Model):
     PROPERTY_TYPES = [
@@ -27,19 +28,88 @@ class Property(models.Model):
     property_type = models.CharField(max_length=50, choices=PROPERTY_TYPES)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     location = models.CharField(max_length=255)
+    latitude = models.FloatField(blank=True, null=True)
+    longitude = models.FloatField(blank=True, null=True)
+    geohash = models.CharField(max_length=12, blank=True, default='', editable=False)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='available')
     amenities = models.JSONField(blank=True, null=True)  # Store as list or dict
     image = models.ImageField(upload_to='property_images/', blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Denormalized counters maintained by interactions signals (see properties.counters)
+    avg_rating = models.FloatField(default=0)
+    review_count = models.PositiveIntegerField(default=0)
+    favorite_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # Public listing hot path: status filter + default/price/updated ordering
+            # (id rides along on created_at for keyset pagination)
+            models.Index(fields=['status', 'created_at', 'id']),
+            models.Index(fields=['status', 'price']),
+            models.Index(fields=['status', 'updated_at']),
+            models.Index(fields=['owner', 'status']),
+            models.Index(fields=['property_type', 'status', 'price']),
+            models.Index(fields=['status', 'avg_rating']),
+            models.Index(fields=['status', 'review_count']),
+            models.Index(fields=['status', 'favorite_count']),
+            models.Index(fields=['status', 'geohash']),
+        ]
+
+    def save(self, *args, **kwargs):
+        # Keep the spatial index column in step with the coordinates
+        if self.latitude is not None and self.longitude is not None:
+            self.geohash = encode_geohash(self.latitude, self.longitude)
+        else:
+            self.geohash = ''
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'geohash'}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.title} - {self.owner.username}"
+
+
+class PropertyFacetCount(models.Model):
+    """Listings per (property_type, status, price bucket), maintained for the facets endpoint"""
+    property_type = models.CharField(max_length=50)
+    status = models.CharField(max_length=20)
+    price_bucket = models.PositiveSmallIntegerField()  # index into properties.facets.PRICE_BUCKETS
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['property_type', 'status', 'price_bucket'], name='property_facet_count_uniq'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.property_type}/{self.status}/{self.price_bucket}: {self.count}"
+
 class Amenity(models.Model):
     property = models.ForeignKey(
         Property, on_delete=models.CASCADE, related_name="amenity_list"
     )
     name = models.CharField(max_length=100)
+    slug = models.SlugField(max_length=100, db_index=False)  # normalized, see properties.amenities
+    # Mirrored from Property.amenities; only these rows are removed when the JSON drops them
+    synced = models.BooleanField(default=False, editable=False)
+
+    class Meta:
+        unique_together = ('property', 'slug')
+        indexes = [
+            models.Index(fields=['slug', 'property']),
+        ]
+
+    def save(self, *args, **kwargs):
+        # Rows added outside the JSON sync (admin, shell) still need a slug to be filterable
+        if not self.slug:
+            from .amenities import normalize_amenity
+            self.slug = normalize_amenity(self.name)
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.name
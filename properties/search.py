@@ -0,0 +1,169 @@
+"""
+Full-text search backend for properties
+
+PostgreSQL keeps a weighted ``search_vector`` tsvector column (a stored
+generated column, so it is always in sync on save) behind a GIN index.
+SQLite keeps an external-content FTS5 table maintained by triggers.
+Any other backend falls back to the old ``icontains`` scan.
+"""
+
+import re
+
+from django.db import connection
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+PROPERTY_TABLE = 'properties_property'
+FTS_TABLE = 'properties_property_fts'
+SEARCH_INDEX = 'properties_property_search_idx'
+
+# Title matches outrank location matches, which outrank description matches
+POSTGRES_VECTOR = (
+    "setweight(to_tsvector('english'::regconfig, coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english'::regconfig, coalesce(location, '')), 'B') || "
+    "setweight(to_tsvector('english'::regconfig, coalesce(description, '')), 'C')"
+)
+
+SQLITE_TRIGGERS = {
+    f'{FTS_TABLE}_ai': f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {PROPERTY_TABLE} BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, title, location, description)
+            VALUES (new.id, new.title, new.location, new.description);
+        END
+    """,
+    f'{FTS_TABLE}_ad': f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {PROPERTY_TABLE} BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, location, description)
+            VALUES ('delete', old.id, old.title, old.location, old.description);
+        END
+    """,
+    f'{FTS_TABLE}_au': f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au
+        AFTER UPDATE OF title, location, description ON {PROPERTY_TABLE} BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, location, description)
+            VALUES ('delete', old.id, old.title, old.location, old.description);
+            INSERT INTO {FTS_TABLE}(rowid, title, location, description)
+            VALUES (new.id, new.title, new.location, new.description);
+        END
+    """,
+}
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(query):
+    """Split a raw search string into lowercase word tokens"""
+    return [token.lower() for token in TOKEN_RE.findall(query or '')]
+
+
+def install_search_index(conn=None):
+    """Create the vendor-specific search structures (idempotent)"""
+    conn = conn or connection
+    with conn.cursor() as cursor:
+        if conn.vendor == 'postgresql':
+            cursor.execute(
+                f"ALTER TABLE {PROPERTY_TABLE} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+                f"GENERATED ALWAYS AS ({POSTGRES_VECTOR}) STORED"
+            )
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {SEARCH_INDEX} "
+                f"ON {PROPERTY_TABLE} USING GIN (search_vector)"
+            )
+        elif conn.vendor == 'sqlite':
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                f"title, location, description, content='{PROPERTY_TABLE}', "
+                f"content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+            )
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = %s",
+                [PROPERTY_TABLE],
+            )
+            existing = {row[0] for row in cursor.fetchall()}
+            missing = [name for name in SQLITE_TRIGGERS if name not in existing]
+            for name in missing:
+                cursor.execute(SQLITE_TRIGGERS[name])
+            # SQLite drops triggers whenever Django remakes the table during a
+            # migration, so the index may be stale; rebuild it from the table.
+            if missing:
+                cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def uninstall_search_index(conn=None):
+    """Drop the vendor-specific search structures"""
+    conn = conn or connection
+    with conn.cursor() as cursor:
+        if conn.vendor == 'postgresql':
+            cursor.execute(f"DROP INDEX IF EXISTS {SEARCH_INDEX}")
+            cursor.execute(f"ALTER TABLE {PROPERTY_TABLE} DROP COLUMN IF EXISTS search_vector")
+        elif conn.vendor == 'sqlite':
+            for name in SQLITE_TRIGGERS:
+                cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+            cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+def ensure_search_index(sender, using='default', **kwargs):
+    """post_migrate hook that restores SQLite triggers lost to table remakes"""
+    from django.db import connections
+
+    conn = connections[using]
+    if conn.vendor != 'sqlite' or PROPERTY_TABLE not in conn.introspection.table_names():
+        return
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = %s", [FTS_TABLE])
+        if cursor.fetchone() is None:
+            return
+    install_search_index(conn)
+
+
+def search_properties(queryset, query):
+    """
+    Filter ``queryset`` to properties matching ``query`` and annotate
+    ``search_rank`` (higher is better). Every term must match and is
+    matched as a prefix, so results update as the user types.
+    """
+    tokens = tokenize(query)
+    if not tokens:
+        return queryset
+
+    vendor = connection.vendor
+    if vendor == 'postgresql':
+        tsquery = ' & '.join(f'{token}:*' for token in tokens)
+        return queryset.extra(
+            where=[f"{PROPERTY_TABLE}.search_vector @@ to_tsquery('english', %s)"],
+            params=[tsquery],
+        ).annotate(
+            search_rank=RawSQL(
+                f"ts_rank({PROPERTY_TABLE}.search_vector, to_tsquery('english', %s))",
+                [tsquery],
+                output_field=FloatField(),
+            )
+        )
+
+    if vendor == 'sqlite':
+        match = ' '.join(f'"{token}"*' for token in tokens)
+        matches = queryset.extra(
+            where=[
+                f"{PROPERTY_TABLE}.id IN "
+                f"(SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s)"
+            ],
+            params=[match],
+        )
+        # bm25() is lower-is-better, weights follow the column order
+        return matches.annotate(
+            search_rank=RawSQL(
+                f"(SELECT -bm25({FTS_TABLE}, 10.0, 5.0, 1.0) FROM {FTS_TABLE} "
+                f"WHERE {FTS_TABLE} MATCH %s AND rowid = {PROPERTY_TABLE}.id)",
+                [match],
+                output_field=FloatField(),
+            )
+        )
+
+    condition = Q()
+    for token in tokens:
+        condition &= (
+            Q(title__icontains=token)
+            | Q(location__icontains=token)
+            | Q(description__icontains=token)
+        )
+    return queryset.filter(condition).annotate(search_rank=Value(0.0, output_field=FloatField()))
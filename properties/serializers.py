@@ -1,32 +1,68 @@
 from rest_framework import serializers
 from .models import Property
 
+# Reviews embedded in the property detail payload are paginated
+REVIEWS_PAGE_SIZE = 10
+MAX_REVIEWS_PAGE_SIZE = 50
+
 class PropertyListSerializer(serializers.ModelSerializer):
-    landlord_name = serializers.CharField(source="landlord.username", read_only=True)
+    landlord_name = serializers.CharField(source="owner.username", read_only=True)
+    # Only present when the list was filtered with ?near=
+    distance_km = serializers.FloatField(read_only=True, required=False)
 
     class Meta:
         model = Property
         fields = [
             "id", "title", "price", "location", "property_type",
-            "image", "landlord_name"
+            "image", "landlord_name", "avg_rating", "review_count", "favorite_count",
+            "latitude", "longitude", "distance_km"
         ]
 
 
 class PropertyDetailSerializer(serializers.ModelSerializer):
-    landlord_name = serializers.CharField(source="landlord.username", read_only=True)
-    landlord_email = serializers.EmailField(source="landlord.email", read_only=True)
+    """
+    Property detail with its owner, counters and one page of reviews.
+    Expects the owner to be select_related; the review page costs exactly
+    one query however many reviews the property has.
+    """
+    landlord_name = serializers.CharField(source="owner.username", read_only=True)
+    landlord_email = serializers.EmailField(source="owner.email", read_only=True)
     reviews = serializers.SerializerMethodField()
-    favorites_count = serializers.SerializerMethodField()
+    reviews_page = serializers.SerializerMethodField()
+    favorites_count = serializers.IntegerField(source="favorite_count", read_only=True)
 
     class Meta:
         model = Property
         fields = [
-            "id", "title", "description", "price", "location", "property_type",
-            "bedrooms", "bathrooms", "amenities", "availability", "image",
-            "landlord_name", "landlord_email", "reviews", "favorites_count"
+            "id", "title", "description", "price", "location", "latitude", "longitude",
+            "property_type", "status", "amenities", "image",
+            "landlord_name", "landlord_email", "reviews", "reviews_page", "favorites_count",
+            "avg_rating", "review_count"
         ]
+        read_only_fields = ["avg_rating", "review_count"]
+
+    def _reviews_window(self):
+        """(page, page_size) from ?reviews_page= and ?reviews_page_size="""
+        request = self.context.get("request")
+        params = request.query_params if request else {}
+        try:
+            page = max(int(params.get("reviews_page", 1)), 1)
+        except (TypeError, ValueError):
+            page = 1
+        try:
+            page_size = int(params.get("reviews_page_size", REVIEWS_PAGE_SIZE))
+        except (TypeError, ValueError):
+            page_size = REVIEWS_PAGE_SIZE
+        return page, min(max(page_size, 1), MAX_REVIEWS_PAGE_SIZE)
 
     def get_reviews(self, obj):
+        page, page_size = self._reviews_window()
+        start = (page - 1) * page_size
+        reviews = (
+            obj.property_reviews
+            .select_related("tenant")
+            .order_by("-created_at", "-id")[start:start + page_size]
+        )
         return [
             {
                 "tenant": review.tenant.username,
@@ -34,11 +70,17 @@ class PropertyDetailSerializer(serializers.ModelSerializer):
                 "comment": review.comment,
                 "created_at": review.created_at
             }
-            for review in obj.reviews.all()
+            for review in reviews
         ]
 
-    def get_favorites_count(self, obj):
-        return obj.favorites.count()
+    def get_reviews_page(self, obj):
+        page, page_size = self._reviews_window()
+        return {
+            "page": page,
+            "page_size": page_size,
+            "total": obj.review_count,
+            "has_next": page * page_size < obj.review_count,
+        }
 
 
 class PropertyCreateUpdateSerializer(serializers.ModelSerializer):
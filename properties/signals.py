@@ -0,0 +1,85 @@
+# properties/signals.py
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from interactions.bookings import bookings_transitioned
+from .amenities import sync_amenities
+from .cache import bump_property_generations
+from .facets import adjust_facet_count, facet_key
+from .models import Property
+
+
+def invalidate_after_commit(property_id):
+    """Bump cache generations once the write is visible to other readers"""
+    transaction.on_commit(lambda: bump_property_generations(property_id))
+
+
+@receiver(post_save, sender=Property)
+@receiver(post_delete, sender=Property)
+def property_changed(sender, instance, **kwargs):
+    """Invalidate cached listings when a landlord edits or removes a property"""
+    invalidate_after_commit(instance.pk)
+
+
+FACET_FIELDS = ('property_type', 'status', 'price')
+
+
+@receiver(pre_save, sender=Property)
+def property_facets_before_save(sender, instance, update_fields=None, raw=False, **kwargs):
+    """Remember which facet rollup row the stored listing counts towards"""
+    instance._stored_facet_key = None
+    if raw or instance.pk is None or (update_fields is not None and not set(FACET_FIELDS) & set(update_fields)):
+        return
+    stored = Property.objects.filter(pk=instance.pk).values_list(*FACET_FIELDS).first()
+    if stored is not None:
+        instance._stored_facet_key = facet_key(*stored)
+
+
+@receiver(post_save, sender=Property)
+def property_facets_saved(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    """Move the listing between facet rollup rows when its type, status or price changes"""
+    if raw or (update_fields is not None and not set(FACET_FIELDS) & set(update_fields)):
+        return
+    key = facet_key(*(getattr(instance, field) for field in FACET_FIELDS))
+    stored_key = getattr(instance, '_stored_facet_key', None)
+    if stored_key == key:
+        return
+    if stored_key is not None:
+        adjust_facet_count(stored_key, -1)
+    adjust_facet_count(key, 1)
+
+
+@receiver(post_delete, sender=Property)
+def property_facets_deleted(sender, instance, **kwargs):
+    adjust_facet_count(facet_key(*(getattr(instance, field) for field in FACET_FIELDS)), -1)
+
+
+@receiver(post_save, sender=Property)
+def property_amenities_changed(sender, instance, update_fields=None, **kwargs):
+    """Mirror the amenities JSON into indexed Amenity rows"""
+    if update_fields is None or 'amenities' in update_fields:
+        sync_amenities(instance)
+
+
+@receiver(post_save, sender='interactions.Review')
+@receiver(post_delete, sender='interactions.Review')
+@receiver(post_save, sender='interactions.Favorite')
+@receiver(post_delete, sender='interactions.Favorite')
+def property_interaction_changed(sender, instance, **kwargs):
+    """Reviews and favorites change the ratings and counters shown in listings"""
+    invalidate_after_commit(instance.property_id)
+
+
+@receiver(post_save, sender='interactions.BookingRequest')
+@receiver(post_delete, sender='interactions.BookingRequest')
+def property_booking_changed(sender, instance, **kwargs):
+    """Booking approvals and cancellations change date-range availability"""
+    invalidate_after_commit(instance.rental_property_id)
+
+
+@receiver(bookings_transitioned)
+def property_bookings_transitioned(sender, bookings, **kwargs):
+    """Status transitions use queryset.update(), so post_save never sees them"""
+    for property_id in {booking.rental_property_id for booking in bookings}:
+        invalidate_after_commit(property_id)
@@ -0,0 +1,265 @@
+"""
+"Similar properties" recommendations
+
+Every listing is embedded as a fixed-size float32 vector built from its
+property_type, price, location words, amenities and description terms
+(words are feature-hashed into fixed buckets). Rows are L2-normalized and
+stacked into one NumPy matrix, so "most similar" is a single matrix-vector
+product plus ``argpartition``, never an ORM scan.
+
+Each process keeps its own ``SimilarityIndex``. It loads the snapshot
+written by ``build_similarity_index``; without one it builds (and saves)
+the index in a background thread and answers with no recommendations
+until that finishes, so no request pays for a full build. Whenever the
+property cache generation changes it folds in listings whose
+``updated_at`` is past its watermark, minus an overlap window that catches
+rows committed after later-stamped ones.
+"""
+
+import datetime
+import logging
+import math
+import threading
+import zlib
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.db import connections
+
+from .amenities import amenity_slugs
+from .cache import LIST_GENERATION_KEY, get_generation
+from .models import Property
+from .search import tokenize
+
+logger = logging.getLogger(__name__)
+
+TYPE_DIMS = len(Property.PROPERTY_TYPES)
+PRICE_DIMS = 4
+LOCATION_DIMS = 24
+AMENITY_DIMS = 16
+DESCRIPTION_DIMS = 48
+VECTOR_DIMS = TYPE_DIMS + PRICE_DIMS + LOCATION_DIMS + AMENITY_DIMS + DESCRIPTION_DIMS
+
+# Relative importance of each feature block
+TYPE_WEIGHT = 1.0
+PRICE_WEIGHT = 1.0
+LOCATION_WEIGHT = 1.2
+AMENITY_WEIGHT = 0.6
+DESCRIPTION_WEIGHT = 0.8
+
+# Log-price centres (KES) for the soft price buckets
+PRICE_CENTRES = np.log([10_000, 30_000, 90_000, 270_000])
+
+STOPWORDS = frozenset('a an and are at for from in is of on or the to with this that near'.split())
+
+VECTOR_FIELDS = ('id', 'property_type', 'price', 'location', 'amenities', 'description', 'updated_at')
+
+TYPE_OFFSETS = {value: index for index, (value, _) in enumerate(Property.PROPERTY_TYPES)}
+
+# updated_at is stamped before commit, so a slow transaction can land behind
+# the watermark; each refresh re-reads this much history (seconds)
+DEFAULT_REFRESH_OVERLAP = 300
+
+
+def _bucket(token, dims):
+    return zlib.crc32(token.encode()) % dims
+
+
+def _hashed_block(tokens, dims, weight):
+    block = np.zeros(dims, dtype=np.float32)
+    for token in tokens:
+        if token not in STOPWORDS:
+            block[_bucket(token, dims)] += 1.0
+    norm = np.linalg.norm(block)
+    if norm:
+        block *= weight / norm
+    return block
+
+
+def vectorize(row):
+    """Embed one ``values(*VECTOR_FIELDS)`` row as an L2-normalized vector"""
+    type_block = np.zeros(TYPE_DIMS, dtype=np.float32)
+    if row['property_type'] in TYPE_OFFSETS:
+        type_block[TYPE_OFFSETS[row['property_type']]] = TYPE_WEIGHT
+
+    # Neighbouring price levels overlap, so close prices score as similar
+    log_price = math.log(max(float(row['price'] or 0), 1.0))
+    price_block = np.exp(-((PRICE_CENTRES - log_price) ** 2)).astype(np.float32)
+    price_norm = np.linalg.norm(price_block)
+    if price_norm:
+        price_block *= PRICE_WEIGHT / price_norm
+
+    vector = np.concatenate([
+        type_block,
+        price_block,
+        _hashed_block(tokenize(row['location']), LOCATION_DIMS, LOCATION_WEIGHT),
+        _hashed_block(amenity_slugs(row['amenities']).keys(), AMENITY_DIMS, AMENITY_WEIGHT),
+        _hashed_block(tokenize(row['description']), DESCRIPTION_DIMS, DESCRIPTION_WEIGHT),
+    ])
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def index_path():
+    return Path(getattr(settings, 'SIMILARITY_INDEX_PATH', Path(settings.BASE_DIR) / 'var' / 'similarity.npz'))
+
+
+def refresh_overlap():
+    return datetime.timedelta(seconds=getattr(settings, 'SIMILARITY_REFRESH_OVERLAP', DEFAULT_REFRESH_OVERLAP))
+
+
+class SimilarityIndex:
+    """In-memory matrix of listing vectors with incremental refresh"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.matrix = np.zeros((0, VECTOR_DIMS), dtype=np.float32)
+        self.rows = {}
+        self.watermark = None
+        self.generation = None
+        self.loaded = False
+        self.building = False
+
+    # ---- building ----
+
+    def build(self, chunk_size=5000):
+        """Vectorize every listing from the database"""
+        ids, vectors, watermark = [], [], None
+        queryset = Property.objects.order_by('pk').values(*VECTOR_FIELDS)
+        for row in queryset.iterator(chunk_size=chunk_size):
+            ids.append(row['id'])
+            vectors.append(vectorize(row))
+            if watermark is None or row['updated_at'] > watermark:
+                watermark = row['updated_at']
+        matrix = np.vstack(vectors) if vectors else np.zeros((0, VECTOR_DIMS), dtype=np.float32)
+        self._replace(np.asarray(ids, dtype=np.int64), matrix.astype(np.float32), watermark)
+        logger.info(f"Built similarity index for {len(ids)} properties")
+
+    def save(self, path=None):
+        path = Path(path or index_path())
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self.lock:
+            np.savez(
+                path, ids=self.ids, matrix=self.matrix,
+                watermark=np.array([self.watermark.isoformat() if self.watermark else '']),
+            )
+        return path
+
+    def load(self, path=None):
+        """Load a snapshot; returns False if there is none"""
+        from django.utils.dateparse import parse_datetime
+
+        path = Path(path or index_path())
+        if not path.exists():
+            return False
+        with np.load(path) as data:
+            watermark = parse_datetime(str(data['watermark'][0])) if data['watermark'][0] else None
+            self._replace(data['ids'], data['matrix'], watermark)
+        return True
+
+    def _replace(self, ids, matrix, watermark):
+        with self.lock:
+            self.ids = ids
+            self.matrix = matrix
+            self.rows = {int(pk): index for index, pk in enumerate(ids)}
+            self.watermark = watermark
+            self.loaded = True
+
+    def build_in_background(self):
+        """Build and snapshot the index in a daemon thread (at most one at a time)"""
+        with self.lock:
+            if self.building:
+                return
+            self.building = True
+        threading.Thread(target=self._background_build, name='similarity-index-build', daemon=True).start()
+
+    def _background_build(self):
+        try:
+            self.build()
+            self.save()
+        except Exception:
+            logger.exception("Background similarity index build failed")
+        finally:
+            self.building = False
+            # This thread's connections would otherwise stay open
+            connections.close_all()
+
+    # ---- incremental refresh ----
+
+    def ensure_fresh(self):
+        """
+        Load on first use, then fold in listings changed since the watermark.
+        Returns False while there is no index yet (a build runs in the background).
+        """
+        if not self.loaded:
+            if not self.load():
+                self.build_in_background()
+                return False
+        generation = get_generation(LIST_GENERATION_KEY)
+        if generation != self.generation:
+            self.refresh()
+            self.generation = generation
+        return True
+
+    def refresh(self):
+        queryset = Property.objects.values(*VECTOR_FIELDS)
+        if self.watermark is not None:
+            # Re-upserting a row already seen is harmless
+            queryset = queryset.filter(updated_at__gt=self.watermark - refresh_overlap())
+        changed = list(queryset)
+        if changed:
+            self.upsert(changed)
+
+    def upsert(self, rows):
+        with self.lock:
+            new_ids, new_vectors = [], []
+            for row in rows:
+                vector = vectorize(row)
+                index = self.rows.get(row['id'])
+                if index is None:
+                    new_ids.append(row['id'])
+                    new_vectors.append(vector)
+                else:
+                    self.matrix[index] = vector
+                if self.watermark is None or row['updated_at'] > self.watermark:
+                    self.watermark = row['updated_at']
+            if new_ids:
+                start = len(self.ids)
+                self.ids = np.concatenate([self.ids, np.asarray(new_ids, dtype=np.int64)])
+                self.matrix = np.vstack([self.matrix, np.vstack(new_vectors)])
+                for offset, pk in enumerate(new_ids):
+                    self.rows[pk] = start + offset
+
+    # ---- querying ----
+
+    def similar_ids(self, property_id, limit):
+        """Ids of the ``limit`` nearest listings, best first (may include removed ones)"""
+        if not self.ensure_fresh():
+            return []
+        with self.lock:
+            index = self.rows.get(int(property_id))
+            if index is None or len(self.ids) < 2:
+                return []
+            scores = self.matrix @ self.matrix[index]
+            scores[index] = -np.inf
+            count = min(limit, len(scores) - 1)
+            top = np.argpartition(-scores, count - 1)[:count]
+            top = top[np.argsort(-scores[top])]
+            return [int(pk) for pk in self.ids[top]]
+
+
+similarity_index = SimilarityIndex()
+
+
+def similar_properties(prop, limit=10):
+    """Up to ``limit`` available listings most similar to ``prop``"""
+    # Over-fetch so listings that were booked or deleted can be dropped
+    candidate_ids = similarity_index.similar_ids(prop.pk, limit * 3)
+    if not candidate_ids:
+        return []
+    by_id = Property.objects.select_related('owner').filter(
+        pk__in=candidate_ids, status='available'
+    ).in_bulk()
+    return [by_id[pk] for pk in candidate_ids if pk in by_id][:limit]
@@ -1,3 +1,661 @@
-from django.test import TestCase
+import datetime
+import importlib
+import re
+import tempfile
+import time
+import unittest
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Q, Sum
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient, APIRequestFactory
+
+from interactions.bookings import transition_booking
+from interactions.models import BLOCKING_STATUSES, BookingRequest, Favorite, Review
+from properties.benchmarks import get_benchmark_landlord, seed_properties
+from properties.counters import adjust_favorite_count, rebuild_counters, refresh_review_stats
+from properties.cache import bump_property_generations
+from properties.facets import compute_facets, rebuild_facet_counts
+from properties.search import search_properties
+from properties.similarity import SimilarityIndex
+from .models import Amenity, Property, PropertyFacetCount
+from .views import PropertyListView, PropertyPagination
+
+User = get_user_model()
+
+
+class PropertyDetailQueryBudgetTests(TestCase):
+    """The detail endpoint must cost the same number of queries for any review count"""
+
+    # ETag watermark, property + owner (joined), one page of reviews + tenants (joined)
+    QUERY_BUDGET = 3
+
+    def setUp(self):
+        self.client = APIClient()
+        self.landlord = User.objects.create_user(username='landlord', password='pass', role='landlord')
+        self.property = Property.objects.create(
+            owner=self.landlord,
+            title='Garden flat',
+            description='Two bedrooms near the park',
+            property_type='apartment',
+            price=25000,
+            location='Kilimani, Nairobi',
+        )
+
+    def add_reviews(self, count):
+        offset = User.objects.filter(role='tenant').count()
+        tenants = User.objects.bulk_create([
+            User(username=f'tenant{offset + i}', role='tenant') for i in range(count)
+        ])
+        Review.objects.bulk_create([
+            Review(tenant=tenant, property=self.property, rating=(i % 5) + 1, comment='ok')
+            for i, tenant in enumerate(tenants)
+        ])
+        refresh_review_stats(self.property.pk)
+        # bulk_create skips the signals that invalidate cached responses
+        cache.clear()
+
+    def get_detail(self, **params):
+        return self.client.get(reverse('property-detail', args=[self.property.pk]), params)
+
+    def test_query_count_is_constant(self):
+        for new_reviews in (1, 299):
+            self.add_reviews(new_reviews)
+            with self.assertNumQueries(self.QUERY_BUDGET):
+                response = self.get_detail()
+            self.assertEqual(response.status_code, 200)
+
+    def test_reviews_are_capped_and_paginated(self):
+        self.add_reviews(25)
+
+        response = self.get_detail(reviews_page=3, reviews_page_size=10)
+
+        self.assertEqual(len(response.data['reviews']), 5)
+        self.assertEqual(response.data['reviews_page']['total'], 25)
+        self.assertFalse(response.data['reviews_page']['has_next'])
+        self.assertEqual(response.data['landlord_name'], 'landlord')
+
+    def test_unchanged_property_returns_304(self):
+        etag = self.get_detail()['ETag']
+
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                reverse('property-detail', args=[self.property.pk]), HTTP_IF_NONE_MATCH=etag
+            )
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_review_edits_and_deletes_move_last_modified(self):
+        tenant = User.objects.create_user(username='tenant', password='pass', role='tenant')
+        with self.captureOnCommitCallbacks(execute=True):
+            review = Review.objects.create(tenant=tenant, property=self.property, rating=5)
+        url = reverse('property-detail', args=[self.property.pk])
+        clock = time.time()
+
+        for step, change in (('edit', lambda: Review.objects.get(pk=review.pk).save()), ('delete', review.delete)):
+            with self.subTest(step):
+                last_modified = self.get_detail()['Last-Modified']
+                self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+                # Bumps land in a later second than the validator the client holds
+                clock += 60
+                with mock.patch('properties.cache.time.time', return_value=clock), \
+                        self.captureOnCommitCallbacks(execute=True):
+                    change()
+
+                response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response['Last-Modified'], last_modified)
+
+
+class PropertyCounterTests(TestCase):
+    """avg_rating, review_count and favorite_count follow the review/favorite rows"""
+
+    def setUp(self):
+        cache.clear()
+        landlord = User.objects.create_user(username='landlord', password='pass', role='landlord')
+        self.property = Property.objects.create(
+            owner=landlord, title='Garden flat', description='Two bedrooms', property_type='apartment',
+            price=25000, location='Kilimani, Nairobi',
+        )
+        self.alice, self.bob = User.objects.bulk_create([
+            User(username=name, role='tenant') for name in ('alice', 'bob')
+        ])
+
+    def counters(self):
+        return Property.objects.values_list('avg_rating', 'review_count', 'favorite_count').get(pk=self.property.pk)
+
+    def test_reviews_recompute_rating_and_count(self):
+        review = Review.objects.create(tenant=self.alice, property=self.property, rating=5)
+        Review.objects.create(tenant=self.bob, property=self.property, rating=2)
+        self.assertEqual(self.counters(), (3.5, 2, 0))
+
+        review.rating = 3
+        review.save()
+        self.assertEqual(self.counters(), (2.5, 2, 0))
+
+        Review.objects.filter(property=self.property).delete()
+        self.assertEqual(self.counters(), (0.0, 0, 0))
+
+    def test_favorites_adjust_the_count(self):
+        favorite = Favorite.objects.create(tenant=self.alice, property=self.property)
+        Favorite.objects.create(tenant=self.bob, property=self.property)
+        self.assertEqual(self.counters()[2], 2)
+
+        favorite.delete()
+        self.assertEqual(self.counters()[2], 1)
+
+    def test_favorite_count_never_goes_negative(self):
+        adjust_favorite_count(self.property.pk, -1)
+        self.assertEqual(self.counters()[2], 0)
+
+    def test_rebuild_repairs_drift(self):
+        Review.objects.create(tenant=self.alice, property=self.property, rating=4)
+        Favorite.objects.create(tenant=self.alice, property=self.property)
+        Property.objects.filter(pk=self.property.pk).update(avg_rating=1, review_count=9, favorite_count=7)
+
+        self.assertEqual(rebuild_counters(batch_size=1), 1)
+        self.assertEqual(self.counters(), (4.0, 1, 1))
+
+    def test_list_filters_on_the_counters(self):
+        Review.objects.create(tenant=self.alice, property=self.property, rating=4)
+        Favorite.objects.create(tenant=self.alice, property=self.property)
+        url = reverse('property-list')
+        for params, expected in (
+            ({'min_rating': 4, 'min_favorites': 1}, 1),
+            ({'min_rating': 4.5}, 0),
+            ({'min_favorites': 2}, 0),
+        ):
+            self.assertEqual(APIClient().get(url, params).data['count'], expected, params)
+
+
+class PropertyListConditionalGetTests(TestCase):
+    """List validators come from the cache generation, so a 304 costs no query"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        landlord = User.objects.create_user(username='landlord', password='pass', role='landlord')
+        self.tenant = User.objects.create_user(username='tenant', password='pass', role='tenant')
+        self.property = Property.objects.create(
+            owner=landlord, title='Garden flat', description='Two bedrooms', property_type='apartment',
+            price=25000, location='Kilimani, Nairobi',
+        )
+
+    def get_list(self, **headers):
+        return self.client.get(reverse('property-list'), **headers)
+
+    def test_unchanged_list_returns_304_without_queries(self):
+        etag = self.get_list()['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.get_list(HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_favorite_changes_the_list_etag(self):
+        etag = self.get_list()['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Favorite.objects.create(tenant=self.tenant, property=self.property)
+        response = self.get_list(HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn('Last-Modified', response)
+
+
+class PropertyFacetsTests(TestCase):
+    """Facet counts cover the rows the list would return; the status facet covers every status"""
+
+    def setUp(self):
+        cache.clear()
+        landlord = User.objects.create_user(username='landlord', password='pass', role='landlord')
+        self.garden, self.loft, self.villa, self.let = [
+            Property.objects.create(owner=landlord, title=title, description='Flat', property_type=kind, price=price,
+                                    location='Kilimani, Nairobi', status=status)
+            for title, kind, price, status in (
+                ('Garden flat', 'apartment', 25000, 'available'),
+                ('Loft', 'apartment', 60000, 'available'),
+                ('Beach villa', 'villa', 300000, 'available'),
+                ('Let flat', 'apartment', 25000, 'booked'),
+            )
+        ]
+        self.client = APIClient()
+
+    def facets(self, params=None):
+        cache.clear()
+        return self.client.get(reverse('property-facets'), params or {}).data
+
+    def test_facets_match_the_list(self):
+        for params in ({}, {'property_type': 'apartment'}, {'search': 'villa'}):
+            with self.subTest(params):
+                listed = self.client.get(reverse('property-list'), params).data['count']
+                self.assertEqual(self.facets(params)['total'], listed)
+
+    def test_rollup_answers_type_and_status_filters(self):
+        for params in ({'property_type': 'apartment'}, {'property_type': 'villa', 'status': 'available'}):
+            with self.subTest(params):
+                with self.assertNumQueries(1):
+                    facets = self.facets(params)
+                self.assertEqual(facets, compute_facets(Property.objects.filter(**params)))
+        self.assertEqual(self.client.get(reverse('property-facets'), {'property_type': 'castle'}).status_code, 400)
+
+    def test_status_facet_counts_every_status(self):
+        for params in ({}, {'property_type': 'apartment'}):
+            with self.subTest(params):
+                status = self.facets(params)['status']
+                self.assertEqual((status['booked'], status['unavailable']), (1, 0))
+
+    def test_rollup_follows_saves_and_deletes(self):
+        self.loft.price = 20000
+        self.loft.save()
+        self.let.status = 'available'
+        self.let.save(update_fields=['status'])
+        self.villa.delete()
+        self.garden.title = 'Garden flat with a view'
+        self.garden.save()
+
+        unfiltered = self.facets()
+        self.assertEqual(unfiltered, compute_facets(Property.objects.all()))
+        self.assertEqual(unfiltered['price']['10000-25000'], 1)
+        self.assertEqual(unfiltered['total'], 3)
+
+    def test_rebuild_repairs_bulk_writes(self):
+        Property.objects.filter(pk=self.loft.pk).update(status='unavailable')
+        rebuild_facet_counts()
+        self.assertEqual(self.facets(), compute_facets(Property.objects.all()))
+        self.assertEqual(PropertyFacetCount.objects.aggregate(total=Sum('count'))['total'], 4)
+
+
+class PropertyAvailabilityFilterTests(TestCase):
+    """?check_in=&check_out= hides listings with a blocking booking over those nights"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        landlord = User.objects.create_user(username='landlord', password='pass', role='landlord')
+        self.tenant = User.objects.create_user(username='tenant', password='pass', role='tenant')
+        self.approved, self.pending, self.checked_in, self.free = [
+            Property.objects.create(
+                owner=landlord, title=title, description='Two bedrooms', property_type='apartment',
+                price=25000, location='Kilimani, Nairobi',
+            )
+            for title in ('Approved', 'Pending', 'Checked in', 'Free')
+        ]
+        self.booking = self.book(self.approved, 'approved', (3, 1), (3, 5))
+        self.book(self.pending, 'pending', (3, 1), (3, 5))
+        self.book(self.checked_in, 'checked_in', (3, 4), (3, 10))
+
+    def book(self, rental_property, status, check_in, check_out):
+        return BookingRequest.objects.create(
+            tenant=self.tenant, rental_property=rental_property, status=status,
+            check_in_date=datetime.date(2025, *check_in), check_out_date=datetime.date(2025, *check_out),
+        )
+
+    def available(self, check_in, check_out):
+        response = self.client.get(reverse('property-list'), {'check_in': check_in, 'check_out': check_out})
+        self.assertEqual(response.status_code, 200, response.data)
+        return {row['id'] for row in response.data['results']}
+
+    def test_overlapping_blocking_bookings_hide_the_listing(self):
+        self.assertEqual(self.available('2025-03-02', '2025-03-05'), {self.pending.pk, self.free.pk})
+
+    def test_stays_are_half_open(self):
+        # Checking in on the day the approved stay checks out does not clash
+        self.assertEqual(
+            self.available('2025-03-10', '2025-03-12'),
+            {self.approved.pk, self.pending.pk, self.checked_in.pk, self.free.pk},
+        )
+        self.assertNotIn(self.approved.pk, self.available('2025-02-27', '2025-03-02'))
+
+    def test_cancelling_frees_the_dates(self):
+        self.assertNotIn(self.approved.pk, self.available('2025-03-02', '2025-03-03'))
+        with self.captureOnCommitCallbacks(execute=True):
+            transition_booking(self.booking, 'cancelled')
+        self.assertIn(self.approved.pk, self.available('2025-03-02', '2025-03-03'))
+
+    def test_both_dates_are_required_and_ordered(self):
+        url = reverse('property-list')
+        for params, field in (
+            ({'check_in': '2025-03-02'}, 'check_out'),
+            ({'check_out': '2025-03-02'}, 'check_in'),
+            ({'check_in': '2025-03-02', 'check_out': '2025-03-02'}, 'check_out'),
+        ):
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn(field, response.data)
+
+    def test_partial_index_covers_the_blocking_statuses(self):
+        index = next(
+            index for index in BookingRequest._meta.indexes if index.name == 'booking_blocking_range_idx'
+        )
+        self.assertEqual(index.condition, Q(status__in=BLOCKING_STATUSES))
+
+    def test_mysql_gets_an_unconditional_index(self):
+        migration = importlib.import_module('interactions.migrations.0004_booking_blocking_range_index')
+        schema_editor = mock.Mock(connection=mock.Mock(vendor='mysql'))
+        migration.add_mysql_index(apps, schema_editor)
+        sql = schema_editor.execute.call_args.args[0]
+        self.assertIn('(rental_property_id, status, check_in_date, check_out_date)', sql)
+
+        schema_editor = mock.Mock(connection=mock.Mock(vendor='postgresql'))
+        migration.add_mysql_index(apps, schema_editor)
+        schema_editor.execute.assert_not_called()
+
+
+class PropertyCursorPaginationTests(TestCase):
+    """?cursor= pages on (created_at, id) and refuses orderings it cannot keep"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        landlord = User.objects.create_user(username='landlord', password='pass', role='landlord')
+        Property.objects.bulk_create([
+            Property(owner=landlord, title=f'Garden flat {i}', description='Two bedrooms',
+                     property_type='apartment', price=20000 + i, location='Kilimani, Nairobi')
+            for i in range(7)
+        ])
+        # Most rows share one created_at, so paging relies on the id tie-breaker
+        first = Property.objects.order_by('id').first()
+        Property.objects.exclude(pk=first.pk).update(created_at=first.created_at + datetime.timedelta(minutes=1))
+
+    def test_cursor_pages_cover_the_list_in_order(self):
+        expected = list(Property.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        seen, url = [], reverse('property-list') + '?cursor=&page_size=2'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            seen.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+
+        self.assertEqual(seen, expected)
+
+    def test_default_ordering_is_accepted(self):
+        response = self.client.get(reverse('property-list'), {'cursor': '', 'ordering': '-created_at'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_conflicting_orderings_are_rejected(self):
+        for params in ({'ordering': 'price'}, {'q': 'garden'}, {'near': '-1.29,36.78'}):
+            response = self.client.get(reverse('property-list'), {'cursor': '', **params})
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn('cursor', response.data)
+
+    def test_invalid_cursor_is_not_found(self):
+        response = self.client.get(reverse('property-list'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+
+class PropertySearchTests(TestCase):
+    """?q= ranks title matches first and tolerates queries without word tokens"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        landlord = User.objects.create_user(username='landlord', password='pass', role='landlord')
+        self.title_match, self.description_match, _ = Property.objects.bulk_create([
+            Property(owner=landlord, title=title, description=description, property_type='apartment',
+                     price=25000, location=location)
+            for title, description, location in (
+                ('Garden flat', 'Two bedrooms', 'Kilimani, Nairobi'),
+                ('Studio', 'Opens onto a shared garden', 'Westlands, Nairobi'),
+                ('Villa', 'Sea view', 'Nyali, Mombasa'),
+            )
+        ])
+
+    def search(self, query):
+        response = self.client.get(reverse('property-list'), {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.data['results']]
+
+    @unittest.skipUnless(connection.vendor == 'sqlite', 'exercises the FTS5 index')
+    def test_fts_prefix_match_ranks_title_first(self):
+        self.assertEqual(self.search('gard'), [self.title_match.pk, self.description_match.pk])
+        self.assertEqual(self.search('gard kilim'), [self.title_match.pk])
+
+    def test_query_without_tokens_is_ignored(self):
+        self.assertEqual(len(self.search('!!!')), 3)
+
+    def test_fallback_scan_requires_every_term(self):
+        with mock.patch('properties.search.connection', mock.Mock(vendor='mysql')):
+            matches = search_properties(Property.objects.all(), 'GARDEN nairobi')
+        self.assertEqual(
+            set(matches.values_list('pk', flat=True)), {self.title_match.pk, self.description_match.pk}
+        )
+        self.assertIn('search_rank', matches.query.annotations)
+
+
+class PropertyGeoFilterTests(TestCase):
+    """?near= / ?bbox= filter by position and reject inputs they cannot honor"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        landlord = User.objects.create_user(username='landlord', password='pass', role='landlord')
+        self.cbd, self.westlands, self.mombasa = [
+            Property.objects.create(
+                owner=landlord, title=title, description='Near town', property_type='apartment',
+                price=25000, location=title, latitude=latitude, longitude=longitude,
+            )
+            for title, latitude, longitude in (
+                ('Nairobi CBD', -1.2864, 36.8172),
+                ('Westlands', -1.2676, 36.8108),
+                ('Mombasa', -4.0435, 39.6682),
+            )
+        ]
+
+    def get(self, params):
+        return self.client.get(reverse('property-list'), params)
+
+    def ids(self, params):
+        response = self.get(params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return [row['id'] for row in response.data['results']]
+
+    def test_near_orders_by_distance_within_radius(self):
+        self.assertEqual(self.ids({'near': '-1.2700,36.8110', 'radius_km': 5}), [self.westlands.pk, self.cbd.pk])
+        self.assertEqual(
+            self.ids({'near': '-1.2700,36.8110', 'radius_km': 5, 'ordering': '-distance_km'}),
+            [self.cbd.pk, self.westlands.pk],
+        )
+
+    def test_near_defaults_to_ten_km(self):
+        self.assertEqual(self.ids({'near': '-1.2864,36.8172'}), [self.cbd.pk, self.westlands.pk])
+
+    def test_non_positive_radius_is_rejected(self):
+        for radius in (0, -3):
+            response = self.get({'near': '-1.2864,36.8172', 'radius_km': radius})
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('radius_km', response.data)
+
+    def test_out_of_range_coordinates_are_rejected(self):
+        self.assertEqual(self.get({'near': '91,36.8'}).status_code, 400)
+
+    def test_bbox_keeps_listings_inside(self):
+        self.assertEqual(set(self.ids({'bbox': '-1.30,36.80,-1.26,36.82'})), {self.cbd.pk, self.westlands.pk})
+        self.assertEqual(self.get({'bbox': '-1.26,36.80,-1.30,36.82'}).status_code, 400)
+
+    def test_distance_ordering_requires_near(self):
+        response = self.get({'ordering': 'distance_km'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ordering', response.data)
+
+
+class SimilarityIndexTests(TestCase):
+    """Nearest listings come from the vector index, which never builds inside a request"""
+
+    def setUp(self):
+        cache.clear()
+        self.landlord = User.objects.create_user(username='landlord', password='pass', role='landlord')
+        self.flat, self.neighbour, self.villa = [
+            self.add_property(*spec) for spec in (
+                ('apartment', 25000, 'Kilimani, Nairobi', ['wifi', 'parking']),
+                ('apartment', 27000, 'Kilimani, Nairobi', ['wifi']),
+                ('villa', 250000, 'Nyali, Mombasa', ['pool']),
+            )
+        ]
+        self.index = SimilarityIndex()
+
+    def add_property(self, property_type, price, location, amenities):
+        return Property.objects.create(
+            owner=self.landlord, title=location, description='Quiet street', property_type=property_type,
+            price=price, location=location, amenities=amenities,
+        )
+
+    def test_closest_listing_ranks_first(self):
+        self.index.build()
+        self.assertEqual(self.index.similar_ids(self.flat.pk, 2), [self.neighbour.pk, self.villa.pk])
+
+    def test_refresh_catches_rows_committed_behind_the_watermark(self):
+        self.index.build()
+        self.index.similar_ids(self.flat.pk, 1)
+        # Stamped before the watermark, but only visible now
+        late = self.add_property('apartment', 26000, 'Kilimani, Nairobi', ['wifi', 'parking'])
+        Property.objects.filter(pk=late.pk).update(
+            updated_at=self.index.watermark - datetime.timedelta(seconds=30)
+        )
+        bump_property_generations(late.pk)
+
+        self.assertEqual(self.index.similar_ids(self.flat.pk, 1), [late.pk])
+
+    def test_missing_snapshot_builds_in_the_background(self):
+        with tempfile.TemporaryDirectory() as directory, \
+                override_settings(SIMILARITY_INDEX_PATH=f'{directory}/similarity.npz'), \
+                mock.patch.object(self.index, 'build_in_background') as build_in_background:
+            self.assertEqual(self.index.similar_ids(self.flat.pk, 2), [])
+        build_in_background.assert_called_once_with()
+        self.assertFalse(self.index.loaded)
+
+    def test_empty_answer_is_not_cached_while_building(self):
+        url = reverse('property-similar', args=[self.flat.pk])
+        with mock.patch('properties.views.similarity_index', self.index), \
+                mock.patch('properties.similarity.similarity_index', self.index), \
+                mock.patch.object(self.index, 'load', return_value=False), \
+                mock.patch.object(self.index, 'build_in_background'):
+            self.assertEqual(APIClient().get(url).data, [])
+            self.index.build()
+            response = APIClient().get(url)
+
+        self.assertEqual([row['id'] for row in response.data][:1], [self.neighbour.pk])
+
+    def test_cached_answer_drops_listings_booked_later(self):
+        self.index.build()
+        url = reverse('property-similar', args=[self.flat.pk])
+        with mock.patch('properties.views.similarity_index', self.index), \
+                mock.patch('properties.similarity.similarity_index', self.index):
+            self.assertEqual(APIClient().get(url).data[0]['id'], self.neighbour.pk)
+            self.neighbour.status = 'booked'
+            with self.captureOnCommitCallbacks(execute=True):
+                self.neighbour.save()
+            response = APIClient().get(url)
+
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertNotIn(self.neighbour.pk, [row['id'] for row in response.data])
+
+
+class AmenitySyncTests(TestCase):
+    """Amenity rows mirror the JSON field without destroying rows added by hand"""
+
+    def setUp(self):
+        landlord = User.objects.create_user(username='landlord', password='pass', role='landlord')
+        self.property = Property.objects.create(
+            owner=landlord, title='Garden flat', description='Two bedrooms', property_type='apartment',
+            price=25000, location='Kilimani, Nairobi', amenities=['Wi-Fi', 'Parking'],
+        )
+
+    def slugs(self, **filters):
+        return set(Amenity.objects.filter(property=self.property, **filters).values_list('slug', flat=True))
+
+    def test_backfill_normalizes_legacy_rows_and_mirrors_json(self):
+        Amenity.objects.all().delete()
+        # Rows from before the slug column, as bulk_create leaves them unnormalized
+        Amenity.objects.bulk_create([
+            Amenity(property=self.property, name=name, slug=f'legacy-{i}')
+            for i, name in enumerate(['Wireless', 'Balcony', 'balcony', '!!!'])
+        ])
+
+        importlib.import_module('properties.migrations.0006_amenity_slug').backfill(apps, None)
+
+        self.assertEqual(self.slugs(), {'wifi', 'balcony', 'parking'})
+        self.assertEqual(Amenity.objects.get(property=self.property, slug='wifi').name, 'Wireless')
+        self.assertEqual(self.slugs(synced=True), {'wifi', 'parking'})
+
+    def test_sync_keeps_rows_it_did_not_create(self):
+        Amenity.objects.create(property=self.property, name='Rooftop Terrace')
+        self.assertEqual(self.slugs(synced=False), {'rooftop-terrace'})
+
+        self.property.amenities = {'Swimming pool': True, 'Parking': False}
+        self.property.save()
+
+        self.assertEqual(self.slugs(), {'pool', 'rooftop-terrace'})
+        self.assertEqual(self.slugs(synced=True), {'pool'})
+
+
+@unittest.skipUnless(connection.vendor in ('sqlite', 'postgresql'), 'plan assertions are vendor specific')
+class PropertyListingQueryPlanTests(TestCase):
+    """The querysets the public list view builds for its hot paths must stay on indexes"""
+
+    SEED_SIZE = 300
+
+    # Full table scans, as reported by EXPLAIN on each backend
+    SEQ_SCAN_PATTERNS = {
+        'sqlite': re.compile(r'\bSCAN properties_property\b(?! USING (COVERING )?INDEX)'),
+        'postgresql': re.compile(r'Seq Scan on properties_property\b'),
+    }
+    # Sorting the matches instead of reading them in index order
+    SORT_PATTERNS = {
+        'sqlite': re.compile(r'USE TEMP B-TREE FOR ORDER BY'),
+        'postgresql': re.compile(r'^\s*(->\s*)?(Incremental )?Sort\b', re.MULTILINE),
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        # No ANALYZE: without statistics SQLite plans as if the table were large
+        seed_properties(cls.SEED_SIZE, get_benchmark_landlord())
+
+    def setUp(self):
+        if connection.vendor == 'postgresql':
+            # A small table is cheaper to scan; only fall back to one when no index applies
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def list_queryset(self, params):
+        """First page of PropertyListView for ``params``, as the view would query it"""
+        view = PropertyListView()
+        view.request = view.initialize_request(APIRequestFactory().get(reverse('property-list'), params))
+        view.format_kwarg = None
+        queryset = view.filter_queryset(view.get_queryset())
+        if 'cursor' in params:
+            queryset = queryset.order_by(*PropertyPagination.keyset_ordering)
+        return queryset[:PropertyPagination.page_size]
+
+    def assertUsesIndex(self, queryset):
+        plan = queryset.explain()
+        self.assertIsNone(
+            self.SEQ_SCAN_PATTERNS[connection.vendor].search(plan),
+            f"Sequential scan in plan for {queryset.query}:\n{plan}",
+        )
+        self.assertIsNone(
+            self.SORT_PATTERNS[connection.vendor].search(plan),
+            f"Sort step in plan for {queryset.query}:\n{plan}",
+        )
+
+    def test_listing_hot_paths_use_indexes(self):
+        hot_paths = {
+            'default ordering': {},
+            'cursor pages': {'cursor': ''},
+            'price ordering': {'ordering': 'price'},
+            'recently updated': {'ordering': '-updated_at'},
+            'price range': {'price_min': 20_000, 'price_max': 21_000, 'ordering': 'price'},
+            'type and price': {'property_type': 'villa', 'price_max': 50_000, 'ordering': 'price'},
+        }
+        for name, params in hot_paths.items():
+            with self.subTest(name):
+                self.assertUsesIndex(self.list_queryset(params))
@@ -1,12 +1,19 @@
 from django.urls import path
-from .views import PropertyListView, PropertyDetailView, PropertyCreateView, PropertyUpdateView, PropertyDeleteView
+from .views import (
+    PropertyListView, PropertyFacetsView, PropertyDetailView, SimilarPropertiesView,
+    PropertyCreateView, PropertyUpdateView, PropertyDeleteView
+)
 
 urlpatterns = [
     # GET: list with pagination, search, and ordering
     path('', PropertyListView.as_view(), name='property-list'),
 
+    # GET: facet counts for the same filters as the list
+    path('facets/', PropertyFacetsView.as_view(), name='property-facets'),
+
     # GET single property
     path('<int:pk>/', PropertyDetailView.as_view(), name='property-detail'),
+    path('<int:pk>/similar/', SimilarPropertiesView.as_view(), name='property-similar'),
     path('create/', PropertyCreateView.as_view(), name='property-create'),
     path('<int:pk>/update/', PropertyUpdateView.as_view(), name='property-update'),
     path('<int:pk>/delete/', PropertyDeleteView.as_view(), name='property-delete'),
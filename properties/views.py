@@ -1,37 +1,125 @@
 # properties/views.py
+from django.conf import settings
 from rest_framework import generics, permissions, filters
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from django_filters.rest_framework import DjangoFilterBackend
 from .models import Property
 from .serializers import PropertyListSerializer, PropertyDetailSerializer
-from .filters import PropertyFilter
+from .filters import PropertyFilter, PropertyOrderingFilter
 from users.permissions import IsLandlord, IsAdmin, IsOwnerOrReadOnly
+from smarthunt.pagination import KeysetPagination
+from .cache import CachedResponseMixin, DETAIL_GENERATION_KEY, LIST_GENERATION_KEY, get_generation
+from .conditional import ConditionalGetMixin, detail_validators
+from .facets import ROLLUP_FILTERS, compute_facets, stored_facets
+from .similarity import similar_properties, similarity_index
 
-# Custom pagination
-class PropertyPagination(PageNumberPagination):
+# Custom pagination (add ?cursor= for count-free keyset paging on (created_at, id))
+class PropertyPagination(KeysetPagination):
     page_size = 10  # default items per page
     page_size_query_param = 'page_size'
     max_page_size = 100
 
-class PropertyListView(generics.ListAPIView):
+class PublicPropertyListMixin:
+    """Rows and filters of the public listing, shared by the list and its facet counts"""
+    filterset_class = PropertyFilter
+    # ?q= uses the full-text index, ?search= the legacy scan
+    search_fields = ['title', 'location', 'description']
+    listed_status = 'available'
+
+    def get_queryset(self):
+        # Return only available properties for public listing
+        return Property.objects.filter(status=self.listed_status).select_related('owner')
+
+class PropertyListView(PublicPropertyListMixin, ConditionalGetMixin, CachedResponseMixin, generics.ListAPIView):
+    cache_prefix = 'properties:list'
     serializer_class = PropertyListSerializer
     permission_classes = [permissions.AllowAny]
     pagination_class = PropertyPagination
-    filterset_class = PropertyFilter
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, PropertyOrderingFilter]
     
-    # Add search and ordering
-    search_fields = ['title', 'location', 'description']
-    ordering_fields = ['price', 'created_at', 'updated_at', 'title']
+    # Add ordering
+    ordering_fields = [
+        'price', 'created_at', 'updated_at', 'title',
+        'avg_rating', 'review_count', 'favorite_count', 'distance_km'
+    ]
     ordering = ['-created_at']
 
+class PropertyFacetsView(PublicPropertyListMixin, CachedResponseMixin, generics.GenericAPIView):
+    """
+    Facet counts (type, status, price bucket) under the list's filters
+
+    Type and price counts cover the rows the list shows; the status facet
+    covers every status. Requests filtered only by type and/or status read
+    the maintained rollup instead of counting listings.
+    """
+    cache_prefix = 'properties:facets'
+    permission_classes = [permissions.AllowAny]
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
+
+    def get_cache_timeout(self):
+        return getattr(settings, 'PROPERTY_FACETS_CACHE_TIMEOUT', 30)
+
     def get_queryset(self):
-        # Return only available properties for public listing
-        return Property.objects.filter(status='available')
+        # Every status: the status facet counts them all, the others only listed_status
+        return Property.objects.all()
 
-class PropertyDetailView(generics.RetrieveAPIView):
-    queryset = Property.objects.all()
+    def rollup_filters(self, request):
+        """The request's filters if the rollup can answer them, else None"""
+        names = set(self.filterset_class.base_filters) | {filters.SearchFilter.search_param}
+        active = {name: request.query_params[name] for name in names if request.query_params.get(name)}
+        if all(value in ROLLUP_FILTERS.get(name, ()) for name, value in active.items()):
+            return active
+        return None
+
+    def get(self, request):
+        rollup_filters = self.rollup_filters(request)
+        if rollup_filters is not None:
+            return Response(stored_facets(self.listed_status, **rollup_filters))
+        return Response(compute_facets(self.filter_queryset(self.get_queryset()), self.listed_status))
+
+class PropertyDetailView(ConditionalGetMixin, CachedResponseMixin, generics.RetrieveAPIView):
+    cache_prefix = 'properties:detail'
+    # Owner is joined here; counters are columns and reviews one paginated query
+    queryset = Property.objects.select_related('owner')
     serializer_class = PropertyDetailSerializer
     permission_classes = [permissions.AllowAny]
 
+    def get_generation_key(self):
+        return DETAIL_GENERATION_KEY.format(pk=self.kwargs['pk'])
+
+    def get_validators(self, request):
+        return detail_validators(request, self.kwargs['pk'])
+
+class SimilarPropertiesView(CachedResponseMixin, generics.ListAPIView):
+    """Top-N available listings most similar to a property (?limit=, max 50)"""
+    cache_prefix = 'properties:similar'
+    serializer_class = PropertyListSerializer
+    permission_classes = [permissions.AllowAny]
+    pagination_class = None
+    filter_backends = []
+
+    def get_generation_key(self):
+        return DETAIL_GENERATION_KEY.format(pk=self.kwargs['pk'])
+
+    def get_cache_key(self, request):
+        # Candidates that get booked or deleted only bump the list generation
+        return f"{super().get_cache_key(request)}:{get_generation(LIST_GENERATION_KEY)}"
+
+    def get_cache_timeout(self):
+        # Don't pin the empty answer served while the index is still being built
+        if not getattr(self, 'index_ready', True):
+            return 0
+        return getattr(settings, 'SIMILAR_PROPERTIES_CACHE_TIMEOUT', 600)
+
+    def get_queryset(self):
+        prop = generics.get_object_or_404(Property, pk=self.kwargs['pk'])
+        try:
+            limit = min(max(int(self.request.query_params.get('limit', 10)), 1), 50)
+        except ValueError:
+            limit = 10
+        self.index_ready = similarity_index.ensure_fresh()
+        return similar_properties(prop, limit) if self.index_ready else []
+
 class PropertyCreateView(generics.CreateAPIView):
     serializer_class = PropertyDetailSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -0,0 +1,178 @@
+"""
+Shared pagination classes
+
+``KeysetPagination`` behaves exactly like DRF's ``PageNumberPagination``
+unless the request carries a ``cursor`` parameter (``?cursor=`` starts at
+the first page) or the class sets ``cursor_only``. In cursor mode results are ordered on a stable
+``(<timestamp>, id)`` key, each page is fetched with a ``WHERE`` on that key
+instead of an ``OFFSET``, and no ``COUNT(*)`` query is issued. Any other
+ordering the view applied (``?ordering=``, search rank, distance) cannot be
+paged this way, so a cursor request carrying one is rejected with a 400.
+"""
+
+import base64
+import heapq
+import json
+from collections import OrderedDict
+from functools import reduce
+from operator import attrgetter, or_
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError as RequestValidationError
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(PageNumberPagination):
+    """Page-number pagination with an opt-in keyset (cursor) mode"""
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+    conflicting_ordering_message = 'Cursor pages are ordered by {ordering}; use page numbers for any other ordering'
+    # Always page by cursor, even without ``?cursor=``
+    cursor_only = False
+
+    # Must end with a unique tie-breaker; direction is shared by both fields
+    keyset_ordering = ('-created_at', '-id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.cursor_mode = self.cursor_only or self.cursor_query_param in request.query_params
+        if not self.cursor_mode:
+            return super().paginate_queryset(queryset, request, view)
+
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        self.check_ordering(queryset)
+        queryset = queryset.order_by(*self.keyset_ordering)
+        position = self.decode_cursor(request, queryset.model)
+        if position is not None:
+            queryset = queryset.filter(self.keyset_filter(*position))
+
+        # Fetch one extra row to learn whether another page exists
+        results = list(queryset[:page_size + 1])
+        self.has_next = len(results) > page_size
+        self.page = results[:page_size]
+        return self.page
+
+    def get_paginated_response(self, data):
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+    def get_next_link(self):
+        if not getattr(self, 'cursor_mode', False):
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_previous_link(self):
+        if not getattr(self, 'cursor_mode', False):
+            return super().get_previous_link()
+        return None
+
+    # ---- cursor helpers ----
+
+    def _keyset_fields(self):
+        return [field.lstrip('-') for field in self.keyset_ordering]
+
+    def check_ordering(self, queryset):
+        """Reject a queryset already ordered on something other than a prefix of the keyset"""
+        ordering = tuple(queryset.query.order_by)
+        if ordering != tuple(self.keyset_ordering[:len(ordering)]):
+            raise RequestValidationError({
+                self.cursor_query_param: self.conflicting_ordering_message.format(
+                    ordering=', '.join(self.keyset_ordering)
+                ),
+            })
+
+    def keyset_filter(self, value, pk):
+        """Rows strictly after ``(value, pk)`` in keyset order"""
+        field, pk_field = self._keyset_fields()
+        op = 'lt' if self.keyset_ordering[0].startswith('-') else 'gt'
+        return Q(**{f'{field}__{op}': value}) | Q(**{field: value, f'{pk_field}__{op}': pk})
+
+    def encode_cursor(self, obj):
+        field, pk_field = self._keyset_fields()
+        value = getattr(obj, field)
+        payload = [value.isoformat() if hasattr(value, 'isoformat') else value, getattr(obj, pk_field)]
+        return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+    def decode_cursor(self, request, model):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        field, pk_field = self._keyset_fields()
+        try:
+            padded = token + '=' * (-len(token) % 4)
+            value, pk = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+            return (
+                model._meta.get_field(field).to_python(value),
+                model._meta.get_field(pk_field).to_python(pk),
+            )
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+
+class TimestampKeysetPagination(KeysetPagination):
+    """Keyset pagination for models ordered by ``timestamp`` (messages)"""
+    keyset_ordering = ('-timestamp', '-id')
+
+
+class MergedKeysetPagination(KeysetPagination):
+    """
+    Keyset pagination over a union of disjoint querysets ("branches")
+
+    The view's ``get_keyset_branches(queryset)`` splits the filtered queryset
+    into branches that each have a matching index (e.g. received vs sent
+    messages). In cursor mode every branch is read in keyset order with the
+    page limit and the streams are merged, so an OR across two indexed
+    columns never becomes a scan. Page-number mode ORs the branches back
+    together.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        branches = view.get_keyset_branches(queryset)
+        self.request = request
+        self.cursor_mode = self.cursor_only or self.cursor_query_param in request.query_params
+        if not self.cursor_mode:
+            return super().paginate_queryset(reduce(or_, branches), request, view)
+
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        self.check_ordering(queryset)
+        position = self.decode_cursor(request, queryset.model)
+        streams = []
+        for branch in branches:
+            branch = branch.order_by(*self.keyset_ordering)
+            if position is not None:
+                branch = branch.filter(self.keyset_filter(*position))
+            streams.append(list(branch[:page_size + 1]))
+
+        descending = self.keyset_ordering[0].startswith('-')
+        merged = heapq.merge(*streams, key=attrgetter(*self._keyset_fields()), reverse=descending)
+        results = [row for _, row in zip(range(page_size + 1), merged)]
+        self.has_next = len(results) > page_size
+        self.page = results[:page_size]
+        return self.page
+
+
+class MessageTimelinePagination(MergedKeysetPagination):
+    """Received and sent messages merged on ``(timestamp, id)``"""
+    keyset_ordering = ('-timestamp', '-id')
+
+
+class ConversationPagination(KeysetPagination):
+    """Cursor-only pagination for the inbox, newest activity first"""
+    keyset_ordering = ('-last_activity', '-id')
+    cursor_only = True
@@ -200,6 +200,60 @@ CHANNEL_LAYERS = {
     },
 }
 
+# Cache (production overrides this with Redis)
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+}
+
+# Seconds a cached public property list/detail response may be served
+PROPERTY_CACHE_TIMEOUT = 300
+
+# Facet counts are cheap to recompute, so keep them only briefly
+PROPERTY_FACETS_CACHE_TIMEOUT = 30
+
+# "Similar properties": vector snapshot written by build_similarity_index, result cache TTL,
+# and how far behind its watermark (seconds) each refresh re-reads late-committed listings
+SIMILARITY_INDEX_PATH = BASE_DIR / 'var' / 'similarity.npz'
+SIMILAR_PROPERTIES_CACHE_TIMEOUT = 600
+SIMILARITY_REFRESH_OVERLAP = 300
+
+# Booking dashboard stats: cached until a booking changes; the optional rollup
+# table makes them O(1) per user (backfill with rebuild_booking_stats)
+BOOKING_STATS_CACHE_TIMEOUT = 300
+BOOKING_STATS_ROLLUP = False
+
+# Outbox: emails, SMS and realtime events are queued with the triggering write
+# and delivered by `python manage.py process_outbox`
+OUTBOX_BATCH_SIZE = 100
+OUTBOX_MAX_ATTEMPTS = 8
+OUTBOX_BACKOFF_SECONDS = 30
+OUTBOX_BACKOFF_MAX_SECONDS = 3600
+OUTBOX_LEASE_SECONDS = 300
+OUTBOX_SENT_RETENTION_DAYS = 7
+
+# Notification retention: days to keep each type (None = forever); expired rows
+# are moved out by `python manage.py purge_notifications`
+NOTIFICATION_RETENTION_DAYS = {
+    'default': 180,
+    'general': 90,
+    'message': 90,
+    'property': 90,
+    'booking': 365,
+    'maintenance': 365,
+    'review': 365,
+}
+NOTIFICATION_RETENTION_MODE = 'archive'  # 'archive' (cold table), 'jsonl' (gzip files) or 'delete'
+NOTIFICATION_ARCHIVE_DIR = BASE_DIR / 'var' / 'archive' / 'notifications'
+# Days to keep archived notifications (None = forever)
+NOTIFICATION_ARCHIVE_RETENTION_DAYS = None
+
+# Favorites/reviews for one listing within this many seconds fold into one
+# notification; its realtime updates are pushed at most once per interval
+NOTIFICATION_COALESCE_WINDOW = 3600
+NOTIFICATION_COALESCE_PUSH_INTERVAL = 60
+
 # CORS settings for frontend integration
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",  # React dev server
@@ -1,5 +1,5 @@
 # users/email_utils.py
-from django.core.mail import send_mail, EmailMultiAlternatives
+from django.core.mail import send_mail, get_connection, EmailMessage, EmailMultiAlternatives
 from django.template.loader import render_to_string
 from django.conf import settings
 from django.contrib.auth import get_user_model
@@ -255,130 +255,192 @@ def send_welcome_email(user):
         logger.error(f"Failed to send welcome email to {user.email}: {str(e)}")
         return False
 
+def build_booking_notification_email(booking_request, notification_type='created'):
+    """EmailMessage for a booking event, or None if the event does not send email"""
+    if notification_type == 'created':
+        # Notify landlord of new booking request
+        recipient = booking_request.rental_property.owner
+        subject = f'{settings.EMAIL_SUBJECT_PREFIX}New Booking Request for {booking_request.rental_property.title}'
+        
+        text_content = f"""
+        Hello {recipient.first_name or recipient.username},
+        
+        You have received a new booking request for your property "{booking_request.rental_property.title}".
+        
+        Tenant: {booking_request.tenant.username}
+        Property: {booking_request.rental_property.title}
+        Location: {booking_request.rental_property.location}
+        Message: {booking_request.message or 'No message provided'}
+        
+        Please log in to your dashboard to review and respond to this request.
+        
+        Best regards,
+        The SmartHunt Team
+        """
+        
+    elif notification_type in ['approved', 'declined']:
+        # Notify tenant of booking status update
+        recipient = booking_request.tenant
+        status_text = 'approved' if notification_type == 'approved' else 'declined'
+        subject = f'{settings.EMAIL_SUBJECT_PREFIX}Booking Request {status_text.title()}'
+        
+        text_content = f"""
+        Hello {recipient.first_name or recipient.username},
+        
+        Your booking request for "{booking_request.rental_property.title}" has been {status_text}.
+        
+        Property: {booking_request.rental_property.title}
+        Location: {booking_request.rental_property.location}
+        Status: {status_text.title()}
+        
+        {'Congratulations! Please contact the landlord to arrange next steps.' if notification_type == 'approved' else 'Thank you for your interest. Feel free to explore other properties.'}
+        
+        Best regards,
+        The SmartHunt Team
+        """
+    else:
+        return None
+    
+    return EmailMessage(
+        subject=subject,
+        body=text_content,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[recipient.email],
+    )
+
 def send_booking_notification_email(booking_request, notification_type='created'):
     """Send email notifications for booking requests"""
     try:
-        if notification_type == 'created':
-            # Notify landlord of new booking request
-            recipient = booking_request.property.owner
-            subject = f'{settings.EMAIL_SUBJECT_PREFIX}New Booking Request for {booking_request.property.title}'
-            
-            text_content = f"""
-            Hello {recipient.first_name or recipient.username},
-            
-            You have received a new booking request for your property "{booking_request.property.title}".
-            
-            Tenant: {booking_request.tenant.username}
-            Property: {booking_request.property.title}
-            Location: {booking_request.property.location}
-            Message: {booking_request.message or 'No message provided'}
-            
-            Please log in to your dashboard to review and respond to this request.
-            
-            Best regards,
-            The SmartHunt Team
-            """
-            
-        elif notification_type in ['approved', 'declined']:
-            # Notify tenant of booking status update
-            recipient = booking_request.tenant
-            status_text = 'approved' if notification_type == 'approved' else 'declined'
-            subject = f'{settings.EMAIL_SUBJECT_PREFIX}Booking Request {status_text.title()}'
-            
-            text_content = f"""
-            Hello {recipient.first_name or recipient.username},
-            
-            Your booking request for "{booking_request.property.title}" has been {status_text}.
-            
-            Property: {booking_request.property.title}
-            Location: {booking_request.property.location}
-            Status: {status_text.title()}
-            
-            {'Congratulations! Please contact the landlord to arrange next steps.' if notification_type == 'approved' else 'Thank you for your interest. Feel free to explore other properties.'}
-            
-            Best regards,
-            The SmartHunt Team
-            """
-        else:
+        message = build_booking_notification_email(booking_request, notification_type)
+        if message is None:
             return False
         
-        send_mail(
-            subject=subject,
-            message=text_content,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[recipient.email],
-            fail_silently=False,
-        )
+        message.send(fail_silently=False)
         
-        logger.info(f"Booking notification email sent to {recipient.email}")
+        logger.info(f"Booking notification email sent to {message.to[0]}")
         return True
         
     except Exception as e:
         logger.error(f"Failed to send booking notification email: {str(e)}")
         return False
 
+def send_booking_notification_emails(events):
+    """Send emails for many (booking_request, notification_type) pairs over one connection"""
+    try:
+        messages = [
+            message for message in (
+                build_booking_notification_email(booking_request, notification_type)
+                for booking_request, notification_type in events
+            )
+            if message is not None
+        ]
+        if not messages:
+            return 0
+        
+        sent = get_connection(fail_silently=False).send_messages(messages)
+        logger.info(f"Sent {sent} booking notification emails")
+        return sent
+        
+    except Exception as e:
+        logger.error(f"Failed to send booking notification emails: {str(e)}")
+        return 0
+
+def build_maintenance_notification_email(maintenance_request, notification_type='created'):
+    """EmailMessage for a maintenance event, or None if the event does not send email"""
+    if notification_type == 'created':
+        # Notify landlord of new maintenance request
+        recipient = maintenance_request.property.owner
+        subject = f'{settings.EMAIL_SUBJECT_PREFIX}New Maintenance Request for {maintenance_request.property.title}'
+        
+        text_content = f"""
+        Hello {recipient.first_name or recipient.username},
+        
+        A maintenance request has been submitted for your property "{maintenance_request.property.title}".
+        
+        Tenant: {maintenance_request.tenant.username}
+        Property: {maintenance_request.property.title}
+        Description: {maintenance_request.description}
+        Status: {maintenance_request.status}
+        
+        Please log in to your dashboard to review and respond to this request.
+        
+        Best regards,
+        The SmartHunt Team
+        """
+        
+    elif notification_type in ['in_progress', 'resolved']:
+        # Notify tenant of maintenance status update
+        recipient = maintenance_request.tenant
+        status_text = maintenance_request.get_status_display()
+        subject = f'{settings.EMAIL_SUBJECT_PREFIX}Maintenance Request Update'
+        
+        text_content = f"""
+        Hello {recipient.first_name or recipient.username},
+        
+        Your maintenance request for "{maintenance_request.property.title}" has been updated.
+        
+        Property: {maintenance_request.property.title}
+        Description: {maintenance_request.description}
+        New Status: {status_text}
+        
+        Thank you for your patience.
+        
+        Best regards,
+        The SmartHunt Team
+        """
+    else:
+        return None
+    
+    return EmailMessage(
+        subject=subject,
+        body=text_content,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[recipient.email],
+    )
+
 def send_maintenance_notification_email(maintenance_request, notification_type='created'):
     """Send email notifications for maintenance requests"""
     try:
-        if notification_type == 'created':
-            # Notify landlord of new maintenance request
-            recipient = maintenance_request.property.owner
-            subject = f'{settings.EMAIL_SUBJECT_PREFIX}New Maintenance Request for {maintenance_request.property.title}'
-            
-            text_content = f"""
-            Hello {recipient.first_name or recipient.username},
-            
-            A maintenance request has been submitted for your property "{maintenance_request.property.title}".
-            
-            Tenant: {maintenance_request.tenant.username}
-            Property: {maintenance_request.property.title}
-            Description: {maintenance_request.description}
-            Status: {maintenance_request.status}
-            
-            Please log in to your dashboard to review and respond to this request.
-            
-            Best regards,
-            The SmartHunt Team
-            """
-            
-        elif notification_type in ['in_progress', 'resolved']:
-            # Notify tenant of maintenance status update
-            recipient = maintenance_request.tenant
-            status_text = maintenance_request.get_status_display()
-            subject = f'{settings.EMAIL_SUBJECT_PREFIX}Maintenance Request Update'
-            
-            text_content = f"""
-            Hello {recipient.first_name or recipient.username},
-            
-            Your maintenance request for "{maintenance_request.property.title}" has been updated.
-            
-            Property: {maintenance_request.property.title}
-            Description: {maintenance_request.description}
-            New Status: {status_text}
-            
-            Thank you for your patience.
-            
-            Best regards,
-            The SmartHunt Team
-            """
-        else:
+        message = build_maintenance_notification_email(maintenance_request, notification_type)
+        if message is None:
             return False
         
-        send_mail(
-            subject=subject,
-            message=text_content,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[recipient.email],
-            fail_silently=False,
-        )
+        message.send(fail_silently=False)
         
-        logger.info(f"Maintenance notification email sent to {recipient.email}")
+        logger.info(f"Maintenance notification email sent to {message.to[0]}")
         return True
         
     except Exception as e:
         logger.error(f"Failed to send maintenance notification email: {str(e)}")
         return False
 
+def build_notification_digest_email(user, notifications, max_items=20):
+    """EmailMessage summarizing unread notifications (dicts with title, body), newest first"""
+    lines = [f"- {notification['title']}: {notification['body']}" for notification in notifications[:max_items]]
+    if len(notifications) > max_items:
+        lines.append(f"- ...and {len(notifications) - max_items} more")
+    subject = f'{settings.EMAIL_SUBJECT_PREFIX}You have {len(notifications)} new notifications'
+    
+    text_content = f"""
+    Hello {user.first_name or user.username},
+    
+    Here is what happened since your last digest:
+    
+    {chr(10).join('    ' + line for line in lines).lstrip()}
+    
+    Log in to SmartHunt to see the details.
+    
+    Best regards,
+    The SmartHunt Team
+    """
+    
+    return EmailMessage(
+        subject=subject,
+        body=text_content,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[user.email],
+    )
+
 def send_password_reset_email(user, reset_link):
     """Send password reset email"""
     try:
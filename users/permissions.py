@@ -61,7 +61,9 @@ class IsTenantOrLandlordOfProperty(BasePermission):
             return True
             
         # If object has a property field, check if user owns that property
-        if hasattr(obj, 'property') and obj.property.owner == request.user:
+        # (bookings call it rental_property)
+        rental_property = getattr(obj, 'rental_property', None) or getattr(obj, 'property', None)
+        if rental_property is not None and rental_property.owner == request.user:
             return True
             
         return False